@@ -0,0 +1,20 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    indexes = [idx['name'] for idx in inspector.get_indexes('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'ix_scheduled_wishes_user_status_time' not in indexes:
+            conn.execute(text("CREATE INDEX ix_scheduled_wishes_user_status_time ON scheduled_wishes (user_id, status, scheduled_time, id)"))
+            print("Added ix_scheduled_wishes_user_status_time index")
+            
+        # auto_send=0 wishes used to sit in "pending"; move them to the approval inbox
+        result = conn.execute(text("UPDATE scheduled_wishes SET status = 'awaiting_approval' WHERE status = 'pending' AND auto_send = 0"))
+        print(f"Moved {result.rowcount} wishes to awaiting_approval")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
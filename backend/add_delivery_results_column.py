@@ -0,0 +1,16 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'delivery_results' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN delivery_results TEXT"))
+            print("Added delivery_results column")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,25 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    indexes = [idx['name'] for idx in inspector.get_indexes('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'claimed_by' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN claimed_by VARCHAR(100)"))
+            print("Added claimed_by column")
+            
+        if 'claimed_at' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN claimed_at DATETIME"))
+            print("Added claimed_at column")
+            
+        if 'ix_scheduled_wishes_status_time' not in indexes:
+            conn.execute(text("CREATE INDEX ix_scheduled_wishes_status_time ON scheduled_wishes (status, scheduled_time)"))
+            print("Added ix_scheduled_wishes_status_time index")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
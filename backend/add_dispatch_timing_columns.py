@@ -0,0 +1,20 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'dispatch_at' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN dispatch_at DATETIME"))
+            print("Added dispatch_at column")
+            
+        if 'dispatched_at' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN dispatched_at DATETIME"))
+            print("Added dispatched_at column")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,33 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'recurrence_rule' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN recurrence_rule VARCHAR(255)"))
+            print("Added recurrence_rule column")
+            
+        if 'recurrence_anchor' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN recurrence_anchor DATETIME"))
+            print("Added recurrence_anchor column")
+            
+        if 'next_occurrence_at' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN next_occurrence_at DATETIME"))
+            conn.execute(text("CREATE INDEX ix_scheduled_wishes_next_occurrence_at ON scheduled_wishes (next_occurrence_at)"))
+            print("Added next_occurrence_at column")
+            
+        # Older /schedule requests stored weekly/monthly/yearly as 7/30/365
+        result = conn.execute(text(
+            "UPDATE scheduled_wishes SET is_recurring = CASE is_recurring "
+            "WHEN 7 THEN 2 WHEN 30 THEN 3 WHEN 365 THEN 4 ELSE is_recurring END "
+            "WHERE is_recurring IN (7, 30, 365)"
+        ))
+        print(f"Normalized {result.rowcount} legacy is_recurring values")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,24 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'attempts' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN attempts INTEGER DEFAULT 0"))
+            print("Added attempts column")
+            
+        if 'last_error' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN last_error TEXT"))
+            print("Added last_error column")
+            
+        if 'delivered_at' not in columns:
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN delivered_at DATETIME"))
+            print("Added delivered_at column")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,17 @@
+from app.db.database import engine
+from sqlalchemy import text, inspect
+
+def migrate():
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('scheduled_wishes')]
+    
+    with engine.connect() as conn:
+        if 'timezone' not in columns:
+            # Existing rows were scheduled as UTC
+            conn.execute(text("ALTER TABLE scheduled_wishes ADD COLUMN timezone VARCHAR(50) DEFAULT 'UTC'"))
+            print("Added timezone column")
+            
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
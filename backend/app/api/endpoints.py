@@ -1,6 +1,8 @@
 
 from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi.responses import StreamingResponse
 from cachetools import TTLCache
+import asyncio
 import csv
 import io
 import json
@@ -10,20 +12,25 @@ import uuid
 import shutil
 import os
 from app.services.llm import generate_wish_text, generate_wish_from_words
-from app.db.database import get_db
-from app.db.models import ScheduledWish, Contact, User, SubscriptionPlan
+from app.db.database import get_db, SessionLocal
+from app.db.models import ScheduledWish, Contact, User, SubscriptionPlan, DeadLetterWish
 from app.db import models
-from app.services.scheduler import scheduler, process_scheduled_wish
-from app.services.llm import generate_wish_text, generate_wish_from_words, LATENCY_HISTORY
+from app.services.scheduler import scheduler, enqueue_wish, enqueue_wishes, continue_series, remove_wish_job, spread_dispatch_time, wish_engine, leader_elector, reconcile_wish_jobs, DISPATCH_LAG_HISTORY
+from app.services.llm import generate_wish_text, generate_wish_from_words, stream_wish_text, LATENCY_HISTORY, wish_cache, wish_flight, BATCH_METRICS
 import psutil
+from apscheduler.schedulers.base import STATE_RUNNING, STATE_PAUSED
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract
+from sqlalchemy import func, desc, extract, or_, and_, case
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 from app.auth import get_password_hash, verify_password, create_access_token, get_current_user, get_current_admin, verify_google_token
 from app.services.email_service import send_password_reset_email
-
-from app.services.email_service import send_password_reset_email
+from app.services.smtp_pool import smtp_pool
+from app.services.rate_limiter import outbound_limiter
+from app.services.metrics import pipeline_metrics, queue_depth, due_by_timezone
+from app.services.recurrence import parse_recurrence, is_recurring_code
+from app.services.timezones import is_valid_timezone, to_utc, to_local
+from app.services.channels import normalize_platform
 
 # Helper for Activity Logging
 def log_activity(db: Session, user_id: int, action: str, details: str):
@@ -379,10 +386,69 @@ async def get_admin_feed(
             "status": w.status,
             "generated_wish": w.generated_wish,
             "sender": user_email,
-            "created_at": w.created_at
+            "created_at": w.created_at,
+            "scheduled_time": w.scheduled_time,
+            "dispatched_at": w.dispatched_at,
+            "lag_seconds": round((w.dispatched_at - w.scheduled_time).total_seconds(), 1) if w.dispatched_at and w.scheduled_time else None
         })
     return result
 
+class DeadLetterRequeue(BaseModel):
+    ids: Optional[List[int]] = None # Dead-letter ids; omit to requeue every open entry
+
+@router.get("/admin/dead-letters")
+async def get_dead_letters(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    letters = db.query(DeadLetterWish).filter(
+        DeadLetterWish.requeued_at == None
+    ).order_by(DeadLetterWish.failed_at.desc()).limit(limit).all()
+    return [{
+        "id": l.id,
+        "wish_id": l.wish_id,
+        "user_id": l.user_id,
+        "attempts": l.attempts,
+        "last_error": l.last_error,
+        "failed_at": l.failed_at
+    } for l in letters]
+
+@router.post("/admin/dead-letters/requeue")
+async def requeue_dead_letters(
+    payload: DeadLetterRequeue,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    query = db.query(DeadLetterWish).filter(DeadLetterWish.requeued_at == None)
+    if payload.ids is not None:
+        query = query.filter(DeadLetterWish.id.in_(payload.ids))
+    letters = query.all()
+    if not letters:
+        return {"requeued": 0}
+
+    now = datetime.utcnow()
+    wish_ids = list({l.wish_id for l in letters})
+    # One bulk update instead of a round trip per wish
+    requeued = db.query(ScheduledWish).filter(
+        ScheduledWish.id.in_(wish_ids),
+        ScheduledWish.status == "failed"
+    ).update({
+        "status": "pending",
+        "attempts": 0,
+        "last_error": None,
+        "dispatch_at": now,
+        "claimed_by": None
+    }, synchronize_session=False)
+    db.query(DeadLetterWish).filter(
+        DeadLetterWish.id.in_([l.id for l in letters])
+    ).update({"requeued_at": now}, synchronize_session=False)
+    db.commit()
+
+    for wish_id in wish_ids:
+        enqueue_wish(wish_id, now)
+    return {"requeued": requeued}
+
 @router.get("/admin/analytics")
 async def get_admin_analytics(
     db: Session = Depends(get_db),
@@ -453,10 +519,20 @@ async def get_system_health(
     next_job = None
     if jobs:
         # Sort by run_time and get the earliest one
-        pending_jobs = sorted([j for j in jobs if j.next_run_time], key=lambda x: x.next_run_time)
+        # Jobs added before scheduler.start() have no next_run_time yet
+        pending_jobs = sorted([j for j in jobs if getattr(j, 'next_run_time', None)], key=lambda x: x.next_run_time)
         if pending_jobs:
             next_job = pending_jobs[0].next_run_time.isoformat()
             
+    # Dispatch Lag (actual start - scheduled time)
+    lags = sorted(DISPATCH_LAG_HISTORY)
+    dispatch_lag = {
+        "samples": len(lags),
+        "avg_seconds": round(sum(lags) / len(lags), 2) if lags else 0,
+        "p95_seconds": round(lags[int(len(lags) * 0.95) - 1], 2) if lags else 0,
+        "max_seconds": round(lags[-1], 2) if lags else 0
+    }
+
     # Latency Metrics
     avg_latency = 0
     if LATENCY_HISTORY:
@@ -470,14 +546,24 @@ async def get_system_health(
             "ram_total": round(ram.total / (1024 * 1024 * 1024), 2), # GB
         },
         "scheduler": {
-            "status": "running" if scheduler.running else "stopped",
+            "status": "running" if scheduler.state == STATE_RUNNING else ("paused" if scheduler.state == STATE_PAUSED else "stopped"),
+            "leader": leader_elector.stats(),
             "active_jobs": len(jobs),
             "next_job": next_job,
         },
+        "engine": wish_engine.stats(),
+        "queue_depth": queue_depth(db),
+        "dispatch_lag": dispatch_lag,
+        "stages": pipeline_metrics.snapshot(),
+        "smtp_pool": smtp_pool.stats(),
+        "rate_limits": outbound_limiter.stats(),
         "performance": {
             "avg_latency_ms": round(avg_latency, 2),
             "request_count": len(LATENCY_HISTORY)
         },
+        "llm_cache": wish_cache.stats(),
+        "llm_single_flight": wish_flight.stats(),
+        "llm_batches": dict(BATCH_METRICS),
         "latency_history": [
             {"time": datetime.fromtimestamp(x["timestamp"]).strftime("%H:%M:%S"), "ms": round(x["latency"])}
             for x in LATENCY_HISTORY[-20:] # Return last 20 points for chart
@@ -487,6 +573,28 @@ async def get_system_health(
 
 
 
+@router.post("/admin/scheduler/reconcile")
+async def reconcile_scheduler_jobs(
+    current_user: User = Depends(get_current_admin)
+):
+    """Cancel wish jobs whose row was deleted or is no longer pending, and re-add missing ones."""
+    return reconcile_wish_jobs()
+
+@router.get("/admin/metrics")
+async def get_pipeline_metrics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Wish pipeline metrics: queue depth by status, engine state and per-stage timing histograms."""
+    return {
+        "queue_depth": queue_depth(db),
+        "due_by_timezone": due_by_timezone(db),
+        "engine": wish_engine.stats(),
+        "stages": pipeline_metrics.snapshot(),
+        "smtp_pool": smtp_pool.stats(),
+        "rate_limits": outbound_limiter.stats()
+    }
+
 # --- Wish Models ---
 class WishRequest(BaseModel):
     occasion: str
@@ -494,6 +602,7 @@ class WishRequest(BaseModel):
     tone: str = "warm"
     extra_details: Optional[str] = None
     length: str = "short"
+    fresh: bool = False # Skip the wish cache and generate a new variant
 
 class ScheduleRequest(BaseModel):
     recipient_name: str
@@ -501,11 +610,12 @@ class ScheduleRequest(BaseModel):
     occasion: str
     tone: str
     extra_details: Optional[str] = None
-    scheduled_time: str # Mandatory for scheduling
+    scheduled_time: str # Mandatory for scheduling; local time in `timezone` unless it carries an offset
+    timezone: Optional[str] = None # IANA name, e.g. "Asia/Kolkata"; defaults to the user's timezone
     platform: Optional[str] = "email"
     phone_number: Optional[str] = None
     telegram_chat_id: Optional[str] = None
-    recurrence: str = "none" # none, yearly, custom
+    recurrence: str = "none" # none, daily, weekly, monthly, yearly, an RRULE (FREQ=...) or cron:<expr>
     
     # Event Fields
     event_name: str # Mandatory
@@ -541,6 +651,91 @@ class ScheduleRequest(BaseModel):
                 raise ValueError('Invalid email format')
         return v
 
+    @validator('recurrence')
+    def recurrence_must_be_valid(cls, v):
+        try:
+            parse_recurrence(v)
+        except Exception:
+            raise ValueError('Invalid recurrence. Use none, daily, weekly, monthly, yearly, an RRULE or cron:<expr>')
+        return v
+
+    @validator('timezone')
+    def timezone_must_be_valid(cls, v):
+        if v is not None and not is_valid_timezone(v):
+            raise ValueError('Unknown timezone. Use an IANA name such as Europe/London')
+        return v
+
+    @validator('platform')
+    def platform_must_be_valid(cls, v):
+        return normalize_platform(v) if v is not None else v
+
+class ScheduleUpdateRequest(BaseModel):
+    # Every field is optional; only the ones sent are changed
+    recipient_name: Optional[str] = None
+    recipient_email: Optional[str] = None
+    occasion: Optional[str] = None
+    tone: Optional[str] = None
+    extra_details: Optional[str] = None
+    scheduled_time: Optional[str] = None
+    timezone: Optional[str] = None
+    platform: Optional[str] = None
+    phone_number: Optional[str] = None
+    telegram_chat_id: Optional[str] = None
+    recurrence: Optional[str] = None
+    event_name: Optional[str] = None
+    event_type: Optional[str] = None
+    reminder_days_before: Optional[int] = None
+    auto_send: Optional[int] = None
+    media_url: Optional[str] = None
+    template_id: Optional[str] = None
+    generated_wish: Optional[str] = None
+
+    @validator('recipient_name', 'event_name', 'occasion', 'tone')
+    def field_must_not_be_empty(cls, v):
+        # Only runs for fields that were sent, so an explicit null is rejected too
+        if v is None or not v.strip():
+            raise ValueError('Field cannot be empty')
+        return v
+
+    @validator('scheduled_time')
+    def time_must_be_valid_iso(cls, v):
+        if v is not None:
+            try:
+                datetime.fromisoformat(v)
+            except ValueError:
+                raise ValueError('Invalid ISO date format for scheduled_time')
+        return v
+
+    @validator('recipient_email')
+    def email_must_be_valid(cls, v):
+        if v:
+            import re
+            email_regex = r"^[^\s@]+@[^\s@.]+(\.[^\s@.]+)+$"
+            if not re.match(email_regex, v):
+                raise ValueError('Invalid email format')
+        return v
+
+    @validator('recurrence')
+    def recurrence_must_be_valid(cls, v):
+        if v is not None:
+            try:
+                parse_recurrence(v)
+            except Exception:
+                raise ValueError('Invalid recurrence. Use none, daily, weekly, monthly, yearly, an RRULE or cron:<expr>')
+        return v
+
+    @validator('timezone')
+    def timezone_must_be_valid(cls, v):
+        if v is not None and not is_valid_timezone(v):
+            raise ValueError('Unknown timezone. Use an IANA name such as Europe/London')
+        return v
+
+    @validator('platform')
+    def platform_must_be_valid(cls, v):
+        if v is None:
+            raise ValueError('Field cannot be empty')
+        return normalize_platform(v)
+
 class ContactBase(BaseModel):
     name: str
     email: str
@@ -790,9 +985,8 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
     db.commit()
     
     # Send email
-    # Note: In a real production app, this should be a background task (using BackgroundTasks or Celery)
-    # to avoid blocking the request if SMTP is slow.
-    success = send_password_reset_email(user.email, reset_token)
+    # SMTP and rate-limit waits block, so run them off the event loop
+    success = await asyncio.to_thread(send_password_reset_email, user.email, reset_token)
     
     if not success:
          # Log error but don't tell user to avoid enumeration (or maybe tell them generic error)
@@ -853,11 +1047,41 @@ async def get_recent_activity(
 @router.post("/generate")
 async def generate_wish(request: WishRequest):
     try:
-        wish = await generate_wish_text(request)
+        wish = await generate_wish_text(request, use_cache=not request.fresh)
         return {"wish": wish}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Streaming Generation (Server-Sent Events) ---
+# Clients read these with fetch() and a stream reader (EventSource can't POST).
+# Events: "data: {"token": ...}" per chunk, then "event: done" with the full wish, or "event: error".
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Stop proxies buffering the stream
+
+def sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def stream_wish_events(request: WishRequest, on_complete=None):
+    parts = []
+    try:
+        async for token in stream_wish_text(request, use_cache=not request.fresh):
+            parts.append(token)
+            yield sse_event({"token": token})
+        done = {"wish": "".join(parts).strip()}
+        if not done["wish"]:
+            raise RuntimeError("The model returned an empty wish")
+        if on_complete:
+            done.update(await on_complete(done["wish"]))
+        yield sse_event(done, "done")
+    except Exception as e:
+        print(f"Wish stream failed: {e}")
+        yield sse_event({"detail": str(e)}, "error")
+
+@router.post("/generate/stream")
+async def generate_wish_stream(request: WishRequest):
+    return StreamingResponse(stream_wish_events(request), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/wish-from-words")
 async def wish_from_words(request: WordListRequest):
     try:
@@ -868,6 +1092,11 @@ async def wish_from_words(request: WordListRequest):
 
 # --- Protected Endpoints ---
 
+def user_timezone(requested: Optional[str], user: User) -> str:
+    if requested:
+        return requested
+    return user.timezone if is_valid_timezone(user.timezone) else "UTC"
+
 @router.post("/schedule")
 async def schedule_wish(
     request: ScheduleRequest, 
@@ -901,15 +1130,11 @@ async def schedule_wish(
         raise HTTPException(status_code=400, detail="Scheduled time is required")
 
     try:
-        scheduled_time = datetime.fromisoformat(request.scheduled_time)
-
-        recurrence_map = {
-            "none": 0,
-            "daily": 1,
-            "weekly": 7,
-            "monthly": 30, # Approx
-            "yearly": 365 # Approx
-        }
+        # Converted to UTC once, here; everything downstream compares naive UTC
+        tz_name = user_timezone(request.timezone, current_user)
+        scheduled_time = to_utc(datetime.fromisoformat(request.scheduled_time), tz_name)
+
+        recurrence_rule = parse_recurrence(request.recurrence)
 
         new_wish = models.ScheduledWish(
             recipient_name=request.recipient_name,
@@ -918,11 +1143,15 @@ async def schedule_wish(
             tone=request.tone,
             extra_details=request.extra_details,
             scheduled_time=scheduled_time,
-            status="pending",
+            timezone=tz_name,
+            dispatch_at=spread_dispatch_time(scheduled_time, request.auto_send),
+            status="pending" if request.auto_send != 0 else "awaiting_approval",
             platform=request.platform,
             phone_number=request.phone_number,
             telegram_chat_id=request.telegram_chat_id,
-            is_recurring=recurrence_map.get(request.recurrence, 0),
+            is_recurring=is_recurring_code(recurrence_rule),
+            recurrence_rule=recurrence_rule,
+            recurrence_anchor=scheduled_time if recurrence_rule else None,
             event_name=request.event_name,
             event_type=request.event_type,
             reminder_days_before=request.reminder_days_before,
@@ -942,20 +1171,20 @@ async def schedule_wish(
         # If scheduled for now (or near now), we might want to trigger scheduler or check imediately
         # For now, just rely on scheduler loop
         
-        # Schedule the job
-        scheduler.add_job(
-            process_scheduled_wish, 
-            'date', 
-            run_date=request.scheduled_time, 
-            args=[new_wish.id]
-        )
+        # Queue for delivery (APScheduler job or dispatcher row depending on SCHEDULER_MODE)
+        # auto_send=0 wishes wait in the approval inbox until the user approves them
+        if new_wish.status == "pending":
+            enqueue_wish(new_wish.id, new_wish.dispatch_at)
 
         return {
             "message": "Wish scheduled successfully", 
             "id": new_wish.id,
+            "status": new_wish.status,
             "generated_wish": new_wish.generated_wish,
             "recipient_name": new_wish.recipient_name,
-            "scheduled_time": new_wish.scheduled_time.isoformat() if new_wish.scheduled_time else None
+            "scheduled_time": new_wish.scheduled_time.isoformat() if new_wish.scheduled_time else None,
+            "timezone": new_wish.timezone,
+            "local_time": to_local(new_wish.scheduled_time, new_wish.timezone).isoformat() if new_wish.scheduled_time else None
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -969,6 +1198,205 @@ async def get_scheduled_wishes(
     wishes = db.query(ScheduledWish).filter(ScheduledWish.user_id == current_user.id).all()
     return wishes
 
+# Fields whose change makes pre-generated text stale
+PROMPT_FIELDS = ("recipient_name", "occasion", "tone", "extra_details")
+
+# Wishes that will still go out: queued for sending or waiting in the approval inbox
+OPEN_STATUSES = ("pending", "awaiting_approval")
+
+def get_pending_wish_for_user(db: Session, wish_id: int, user_id: int) -> ScheduledWish:
+    wish = db.query(ScheduledWish).filter(
+        ScheduledWish.id == wish_id,
+        ScheduledWish.user_id == user_id # Ensure ownership
+    ).first()
+    if not wish:
+        raise HTTPException(status_code=404, detail="Scheduled wish not found")
+    if wish.status not in OPEN_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Only pending wishes can be changed (this one is {wish.status})")
+    return wish
+
+@router.patch("/scheduled-wishes/{wish_id}")
+async def update_scheduled_wish(
+    wish_id: int,
+    request: ScheduleUpdateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    wish = get_pending_wish_for_user(db, wish_id, current_user.id)
+    changes = request.dict(exclude_unset=True)
+
+    recurrence = changes.pop("recurrence", None)
+    scheduled_time = changes.pop("scheduled_time", None)
+    tz_name = changes.pop("timezone", None)
+    for field, value in changes.items():
+        setattr(wish, field, value)
+
+    if tz_name and tz_name != wish.timezone and not scheduled_time and wish.scheduled_time:
+        # Keep the same local wall-clock time in the new timezone
+        scheduled_time = to_local(wish.scheduled_time, wish.timezone).isoformat()
+    if tz_name:
+        wish.timezone = tz_name
+
+    if "generated_wish" not in changes and any(field in changes for field in PROMPT_FIELDS):
+        wish.generated_wish = None # Regenerate for the new prompt
+
+    if scheduled_time:
+        wish.scheduled_time = to_utc(datetime.fromisoformat(scheduled_time), wish.timezone)
+        wish.recurrence_anchor = wish.scheduled_time if wish.recurrence_rule else None
+        wish.attempts = 0
+        wish.reminder_sent_at = None # The new date gets its own reminder digest
+    if recurrence is not None:
+        wish.recurrence_rule = parse_recurrence(recurrence)
+        wish.is_recurring = is_recurring_code(wish.recurrence_rule)
+        wish.recurrence_anchor = wish.scheduled_time if wish.recurrence_rule else None
+    if scheduled_time or "auto_send" in changes:
+        wish.dispatch_at = spread_dispatch_time(wish.scheduled_time, wish.auto_send)
+        wish.claimed_by = None
+    if "auto_send" in changes:
+        # Turning auto_send off moves the wish to the approval inbox; turning it on approves it
+        wish.status = "pending" if wish.auto_send != 0 else "awaiting_approval"
+
+    db.commit()
+    db.refresh(wish)
+
+    if wish.status == "pending":
+        # Same deterministic job id, so this replaces the existing job in place
+        enqueue_wish(wish.id, wish.dispatch_at or wish.scheduled_time)
+    else:
+        remove_wish_job(wish.id)
+    log_activity(db, current_user.id, "wish_updated", f"Updated {wish.occasion} wish for {wish.recipient_name}")
+
+    return {
+        "message": "Wish updated successfully",
+        "id": wish.id,
+        "status": wish.status,
+        "generated_wish": wish.generated_wish,
+        "recipient_name": wish.recipient_name,
+        "scheduled_time": wish.scheduled_time.isoformat() if wish.scheduled_time else None,
+        "timezone": wish.timezone,
+        "local_time": to_local(wish.scheduled_time, wish.timezone).isoformat() if wish.scheduled_time else None
+    }
+
+@router.delete("/scheduled-wishes/{wish_id}")
+async def cancel_scheduled_wish(
+    wish_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    wish = get_pending_wish_for_user(db, wish_id, current_user.id)
+    wish.status = "cancelled"
+    wish.claimed_by = None
+    db.commit()
+
+    remove_wish_job(wish.id)
+    log_activity(db, current_user.id, "wish_cancelled", f"Cancelled {wish.occasion} wish for {wish.recipient_name}")
+    return {"message": "Wish cancelled", "id": wish.id}
+
+@router.get("/approvals")
+async def get_approval_inbox(
+    limit: int = 50,
+    after_time: Optional[str] = None,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    auto_send=0 wishes waiting for the user's approval, soonest first.
+    Keyset pagination: pass the previous page's next_cursor back as after_time/after_id.
+    """
+    limit = max(1, min(limit, 200))
+    query = db.query(ScheduledWish).filter(
+        ScheduledWish.user_id == current_user.id,
+        ScheduledWish.status == "awaiting_approval"
+    )
+    if after_time and after_id is not None:
+        try:
+            cursor_time = datetime.fromisoformat(after_time)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor: after_time must be an ISO datetime")
+        query = query.filter(or_(
+            ScheduledWish.scheduled_time > cursor_time,
+            and_(ScheduledWish.scheduled_time == cursor_time, ScheduledWish.id > after_id)
+        ))
+    wishes = query.order_by(ScheduledWish.scheduled_time, ScheduledWish.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(wishes) > limit:
+        wishes = wishes[:limit]
+        next_cursor = {"after_time": wishes[-1].scheduled_time.isoformat(), "after_id": wishes[-1].id}
+
+    return {
+        "items": [
+            {
+                "id": wish.id,
+                "recipient_name": wish.recipient_name,
+                "occasion": wish.occasion,
+                "platform": wish.platform,
+                "generated_wish": wish.generated_wish,
+                "scheduled_time": wish.scheduled_time.isoformat(),
+                "timezone": wish.timezone,
+                "local_time": to_local(wish.scheduled_time, wish.timezone).isoformat()
+            }
+            for wish in wishes
+        ],
+        "next_cursor": next_cursor
+    }
+
+class ApprovalDecisionRequest(BaseModel):
+    approve: List[int] = []
+    reject: List[int] = []
+
+@router.post("/approvals")
+async def decide_approvals(
+    request: ApprovalDecisionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Approve and/or reject many awaiting wishes at once; ids that aren't the user's awaiting wishes are ignored."""
+    now = datetime.utcnow()
+    awaiting = [
+        ScheduledWish.user_id == current_user.id,
+        ScheduledWish.status == "awaiting_approval"
+    ]
+    approved = rejected = 0
+
+    if request.approve:
+        run_at = func.coalesce(ScheduledWish.dispatch_at, ScheduledWish.scheduled_time)
+        approved_rows = db.query(ScheduledWish.id, run_at).filter(
+            ScheduledWish.id.in_(request.approve), *awaiting
+        ).all()
+        approved_ids = [row[0] for row in approved_rows]
+        if approved_ids:
+            # One statement for the whole batch; approvals that are already overdue go out now
+            approved = db.query(ScheduledWish).filter(
+                ScheduledWish.id.in_(approved_ids), *awaiting
+            ).update({
+                ScheduledWish.status: "pending",
+                ScheduledWish.claimed_by: None,
+                ScheduledWish.dispatch_at: case((run_at < now, now), else_=run_at)
+            }, synchronize_session=False)
+            db.commit()
+            enqueue_wishes([(wish_id, max(run_date, now)) for wish_id, run_date in approved_rows])
+
+    if request.reject:
+        rejected_wishes = db.query(ScheduledWish).filter(
+            ScheduledWish.id.in_(request.reject), *awaiting
+        ).all()
+        if rejected_wishes:
+            rejected = db.query(ScheduledWish).filter(
+                ScheduledWish.id.in_([wish.id for wish in rejected_wishes]), *awaiting
+            ).update({ScheduledWish.status: "rejected"}, synchronize_session=False)
+            db.commit()
+            # Rejecting one occurrence doesn't end the series
+            for wish in rejected_wishes:
+                if wish.recurrence_rule or (wish.is_recurring or 0) > 0:
+                    db.refresh(wish)
+                    continue_series(db, wish)
+
+    if approved or rejected:
+        log_activity(db, current_user.id, "wishes_reviewed", f"Approved {approved} and rejected {rejected} wishes")
+    return {"approved": approved, "rejected": rejected}
+
 @router.post("/generate-user-wish")
 async def generate_user_wish(
     request: WishRequest,
@@ -977,20 +1405,10 @@ async def generate_user_wish(
 ):
     try:
         # Generate text
-        wish_text = await generate_wish_text(request)
+        wish_text = await generate_wish_text(request, use_cache=not request.fresh)
         
         # Save to DB
-        new_wish = ScheduledWish(
-            recipient_name=request.recipient_name,
-            occasion=request.occasion,
-            tone=request.tone,
-            extra_details=request.extra_details,
-            scheduled_time=datetime.utcnow(), # Now
-            status="generated",
-            generated_wish=wish_text,
-            platform="web", # generated on web
-            user_id=current_user.id
-        )
+        new_wish = build_generated_wish(request, wish_text, current_user.id)
         db.add(new_wish)
         db.commit()
         db.refresh(new_wish)
@@ -999,6 +1417,43 @@ async def generate_user_wish(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_generated_wish(request: WishRequest, wish_text: str, user_id: int) -> ScheduledWish:
+    return ScheduledWish(
+        recipient_name=request.recipient_name,
+        occasion=request.occasion,
+        tone=request.tone,
+        extra_details=request.extra_details,
+        scheduled_time=datetime.utcnow(), # Now
+        status="generated",
+        generated_wish=wish_text,
+        platform="web", # generated on web
+        user_id=user_id
+    )
+
+def save_generated_wish(request: WishRequest, wish_text: str, user_id: int) -> int:
+    # Own session: the request's session is closed by the time a stream finishes
+    db = SessionLocal()
+    try:
+        new_wish = build_generated_wish(request, wish_text, user_id)
+        db.add(new_wish)
+        db.commit()
+        return new_wish.id
+    finally:
+        db.close()
+
+@router.post("/generate-user-wish/stream")
+async def generate_user_wish_stream(
+    request: WishRequest,
+    current_user: User = Depends(get_current_user)
+):
+    user_id = current_user.id
+
+    async def persist(wish_text: str) -> dict:
+        wish_id = await asyncio.to_thread(save_generated_wish, request, wish_text, user_id)
+        return {"id": wish_id}
+
+    return StreamingResponse(stream_wish_events(request, on_complete=persist), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/wishes/history")
 async def get_wish_history(
     db: Session = Depends(get_db),
@@ -1151,13 +1606,13 @@ async def delete_contact(
         raise HTTPException(status_code=404, detail="Contact not found")
     
     # AC #4: Remove deleted contacts from all linked events (Wishes)
-    # We delete pending wishes for this contact's email
+    # We delete pending (and awaiting approval) wishes for this contact's email
     if contact.email:
         db.query(ScheduledWish).filter(
             ScheduledWish.user_id == current_user.id,
             ScheduledWish.recipient_email == contact.email,
-            ScheduledWish.status == "pending"
-        ).delete()
+            ScheduledWish.status.in_(OPEN_STATUSES)
+        ).delete(synchronize_session=False)
 
     db.delete(contact)
     db.commit()
@@ -1373,10 +1828,10 @@ async def get_upcoming_events(
                     "contact_name": contact.name
                 })
 
-    # 2. Scheduled Wishes (Pending)
+    # 2. Scheduled Wishes (Pending or awaiting approval)
     pending_wishes = db.query(ScheduledWish).filter(
         ScheduledWish.user_id == current_user.id,
-        ScheduledWish.status == "pending",
+        ScheduledWish.status.in_(OPEN_STATUSES),
         ScheduledWish.scheduled_time >= datetime.utcnow()
     ).all()
     
@@ -1408,7 +1863,7 @@ async def get_dashboard_stats(
     # 2. Messages Stats
     messages_scheduled = db.query(ScheduledWish).filter(
         ScheduledWish.user_id == current_user.id,
-        ScheduledWish.status == "pending"
+        ScheduledWish.status.in_(OPEN_STATUSES)
     ).count()
     
     messages_sent = db.query(ScheduledWish).filter(
@@ -7,6 +7,17 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str = ""
     GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
     GROQ_MODEL: str = "llama-3.1-8b-instant"
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1000 # In-memory LRU size
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_PATH: str = "" # SQLite file shared by workers and kept across restarts; empty = memory only
+    LLM_SINGLE_FLIGHT_ENABLED: bool = True # Concurrent identical prompts share one in-flight completion
+    LLM_WORD_CONCURRENCY: int = 20 # Parallel completions per /wish-from-words request
+    LLM_WORD_TIMEOUT_SECONDS: float = 15 # Per-word deadline; a slow word doesn't hold up the rest
+    LLM_BATCH_ENABLED: bool = True # Pack many wishes into one completion (words, pre-generation)
+    LLM_BATCH_MAX_SIZE: int = 10 # Wishes per batched completion
+    LLM_BATCH_TOKEN_BUDGET: int = 4000 # Estimated prompt + reply tokens per batched completion
+    LLM_BATCH_TIMEOUT_SECONDS: float = 30
     
     # Database
     DATABASE_URL: Optional[str] = None
@@ -16,12 +27,71 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
+    SMTP_USE_TLS: bool = True
+    SMTP_POOL_SIZE: int = 5
+    SMTP_POOL_IDLE_TIMEOUT_SECONDS: int = 60 # Close pooled connections idle longer than this
+    SMTP_POOL_HEALTHCHECK_AFTER_SECONDS: int = 10 # NOOP-probe connections idle longer than this
+    SMTP_POOL_MAX_MESSAGES_PER_CONNECTION: int = 100
 
     # Social Media Settings
     TELEGRAM_BOT_TOKEN: str = ""
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
     TWILIO_FROM_WHATSPP: str = "whatsapp:+14155238886"
+    TELEGRAM_TIMEOUT_SECONDS: float = 10
+
+    # Scheduler Settings
+    SCHEDULER_ENABLED: bool = True # False = API only enqueues; run `python -m app.worker` for delivery
+    SCHEDULER_MODE: str = "jobs" # jobs = one APScheduler job per wish, dispatcher = poll and claim due rows
+    LEADER_ELECTION_ENABLED: bool = True # Only the lease holder runs jobs; other workers just enqueue
+    LEADER_LEASE_SECONDS: int = 30 # A crashed leader is replaced after at most this long
+    LEADER_RENEW_INTERVAL_SECONDS: int = 10
+    DISPATCH_INTERVAL_SECONDS: int = 10
+    DISPATCH_BATCH_SIZE: int = 50
+    DISPATCH_MAX_BATCHES_PER_TICK: int = 20
+    DISPATCH_CLAIM_TIMEOUT_SECONDS: int = 600 # Claims older than this are considered abandoned
+    WISH_ENGINE_CONCURRENCY: int = 20 # Max wishes processed at once on the async engine
+    WISH_ENGINE_MAX_PENDING: int = 200 # Admission cap on queued + running wishes
+    SHUTDOWN_DRAIN_SECONDS: int = 25 # In-flight wishes get this long to finish on shutdown (keep under the deploy grace period)
+    RECURRENCE_HORIZON_DAYS: int = 30 # Next occurrence rows are created once within this horizon
+    RECURRENCE_MATERIALIZE_INTERVAL_MINUTES: int = 60
+    DISPATCH_SPREAD_WINDOW_SECONDS: int = 0 # >0 spreads auto_send wishes randomly over this window after their time
+    RECONCILE_INTERVAL_MINUTES: int = 30 # Cancel wish jobs whose row is gone and re-add missing ones
+    CATCHUP_ENABLED: bool = True # Sweep wishes left overdue by downtime or dropped misfires
+    CATCHUP_INTERVAL_MINUTES: int = 5
+    CATCHUP_OVERDUE_AFTER_SECONDS: int = 900 # Keep >= misfire_grace_time so normal jobs are never raced
+    CATCHUP_BATCH_SIZE: int = 50
+    CATCHUP_MAX_BATCHES_PER_RUN: int = 20
+    CATCHUP_STALE_AFTER_HOURS: int = 24
+    CATCHUP_STALE_POLICY: str = "send" # send, skip or expire wishes older than CATCHUP_STALE_AFTER_HOURS
+    PREGENERATE_ENABLED: bool = True # Generate wish text ahead of the send time
+    PREGENERATE_HORIZON_HOURS: int = 24
+    PREGENERATE_INTERVAL_MINUTES: int = 15
+    PREGENERATE_BATCH_SIZE: int = 100
+
+    # Reminder Digests
+    REMINDER_DIGEST_ENABLED: bool = True
+    REMINDER_DIGEST_HOUR: int = 8 # Local hour (0-23) each user gets their daily digest
+    REMINDER_MAX_DAYS_BEFORE: int = 30 # Longest reminder_days_before honoured
+
+    # Delivery Retries
+    RETRY_MAX_ATTEMPTS: int = 5 # Attempts before a wish moves to the dead-letter table
+    RETRY_BASE_DELAY_SECONDS: int = 60
+    RETRY_MAX_DELAY_SECONDS: int = 3600
+
+    # Outbound Rate Limits (token buckets: sustained rate + burst size)
+    RATE_LIMIT_EMAIL_PER_SECOND: float = 5
+    RATE_LIMIT_EMAIL_BURST: int = 10
+    RATE_LIMIT_TRANSACTIONAL_PER_SECOND: float = 2 # Account mail (password resets), separate from wish email
+    RATE_LIMIT_TRANSACTIONAL_BURST: int = 10
+    RATE_LIMIT_TELEGRAM_PER_SECOND: float = 25 # Bot API allows ~30 msg/s
+    RATE_LIMIT_TELEGRAM_BURST: int = 25
+    RATE_LIMIT_WHATSAPP_PER_SECOND: float = 1 # Twilio default sender throughput
+    RATE_LIMIT_WHATSAPP_BURST: int = 5
+    RATE_LIMIT_SENDER_PER_SECOND: float = 2 # Per app user, per channel
+    RATE_LIMIT_SENDER_BURST: int = 20
+    RATE_LIMIT_THROTTLE_BACKOFF_SECONDS: float = 30 # Channel pause after a provider throttling response
+    RATE_LIMIT_MAX_THROTTLE_RETRIES: int = 5
 
     # Firebase Settings
     FIREBASE_STORAGE_BUCKET: str = "wishing-tool-85053.appspot.com"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship as orm_relationship
 from .database import Base
 from datetime import datetime
@@ -76,27 +76,71 @@ class ScheduledWish(Base):
     scheduled_time = Column(DateTime)
     status = Column(String(50), default="pending") # pending, sent, failed
     generated_wish = Column(Text, nullable=True)
-    platform = Column(String(50), default="email") # email, telegram, whatsapp
+    platform = Column(String(50), default="email") # email, telegram, whatsapp or a comma-separated fan-out list
     phone_number = Column(String(50), nullable=True)
     telegram_chat_id = Column(String(100), nullable=True)
-    is_recurring = Column(Integer, default=0) # 0=False, 1=True
+    is_recurring = Column(Integer, default=0) # 0=None, 1=Daily, 2=Weekly, 3=Monthly, 4=Yearly
+    recurrence_rule = Column(String(255), nullable=True) # RRULE body (FREQ=YEARLY) or CRON:<expr>
+    recurrence_anchor = Column(DateTime, nullable=True) # First occurrence of the series
+    next_occurrence_at = Column(DateTime, nullable=True, index=True) # Set until the next occurrence row is created
     
     # Event Creation Fields
     event_name = Column(String(255), nullable=True)
     event_type = Column(String(100), default="Custom Event") # Birthday, Anniversary, Festival, Custom Event
     reminder_days_before = Column(Integer, default=0) # 0, 1, 2
+    reminder_sent_at = Column(DateTime, nullable=True) # Included in a reminder digest
     auto_send = Column(Integer, default=1) # 0=Manual Approval, 1=Auto Send
     
     # Message & Template Fields
     media_url = Column(String(500), nullable=True) # URL to uploaded image/video
     template_id = Column(String(100), nullable=True) # ID of selected template
     
+    # Dispatcher Claim Fields
+    claimed_by = Column(String(100), nullable=True) # Worker token that claimed this wish
+    claimed_at = Column(DateTime, nullable=True)
+    
+    timezone = Column(String(50), default="UTC") # IANA zone the delivery time was picked in; scheduled_time is UTC
+    
+    # Retry Fields
+    attempts = Column(Integer, default=0) # Failed delivery attempts so far
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime, nullable=True) # Set once the message left us, so retries never resend
+    delivery_results = Column(Text, nullable=True) # JSON per channel: {"email": {"status": "sent", "at": ...}}
+    
+    # Load Smoothing Fields
+    dispatch_at = Column(DateTime, nullable=True) # Planned run time after spreading (>= scheduled_time)
+    dispatched_at = Column(DateTime, nullable=True) # When processing actually started
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"))
     
     owner = orm_relationship("User", back_populates="wishes")
 
+    __table_args__ = (
+        Index("ix_scheduled_wishes_status_time", "status", "scheduled_time"),
+        Index("ix_scheduled_wishes_user_status_time", "user_id", "status", "scheduled_time", "id"), # Approval inbox keyset
+    )
+
+class DeadLetterWish(Base):
+    __tablename__ = "dead_letter_wishes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    wish_id = Column(Integer, index=True) # No FK: the wish may be deleted with its owner
+    user_id = Column(Integer, index=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    requeued_at = Column(DateTime, nullable=True) # Set when an admin requeues the wish
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(100), primary_key=True) # e.g. "scheduler"
+    holder = Column(String(255), nullable=False) # host:pid of the current leader
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
 
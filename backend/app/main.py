@@ -4,7 +4,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api import endpoints
 from app.db import models
 from app.db.database import engine
-from app.services.scheduler import scheduler # Changed from start_scheduler to scheduler object
+from app.services.scheduler import start_scheduler, start_scheduler_client, drain_and_stop
+from app.core.config import settings
+from app.services.smtp_pool import smtp_pool
 import contextlib # Added import for contextlib
 # from .core.firebase import init_firebase # Added import for init_firebase
 
@@ -14,14 +16,18 @@ models.Base.metadata.create_all(bind=engine)
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        scheduler.start()
+        if settings.SCHEDULER_ENABLED:
+            start_scheduler()
+        else:
+            start_scheduler_client()
         # init_firebase() # Initialize Firebase
     except Exception as e:
         print(f"Warning: Startup failed: {e}")
     yield
     # Shutdown
     try:
-        scheduler.shutdown()
+        drain_and_stop()
+        smtp_pool.close_all()
     except Exception as e:
         print(f"Warning: Shutdown failed: {e}")
 
@@ -0,0 +1,72 @@
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.dispatcher import claim_due_wishes, submit_claimed
+from app.services.scheduler import wish_engine, remove_wish_job, retire_wish, new_claim_token
+
+STALE_POLICIES = ("send", "skip", "expire")
+
+def _retire_stale(wish_ids: list, status: str) -> int:
+    db: Session = SessionLocal()
+    try:
+        wishes = db.query(ScheduledWish).filter(ScheduledWish.id.in_(wish_ids)).all()
+        for wish in wishes:
+            retire_wish(db, wish, status, f"more than {settings.CATCHUP_STALE_AFTER_HOURS}h overdue")
+        return len(wishes)
+    finally:
+        db.close()
+
+def sweep_overdue_wishes(now: datetime = None) -> dict:
+    """
+    Drain pending wishes whose run time passed more than CATCHUP_OVERDUE_AFTER_SECONDS ago
+    (process downtime, or jobs APScheduler dropped as misfired). Rows are claimed most
+    overdue first in bounded batches, and each batch finishes before the next claim, so a
+    backlog never hits the engine and SMTP in one burst. Wishes older than
+    CATCHUP_STALE_AFTER_HOURS follow CATCHUP_STALE_POLICY: send, skip or expire.
+    """
+    now = now or datetime.utcnow()
+    policy = settings.CATCHUP_STALE_POLICY if settings.CATCHUP_STALE_POLICY in STALE_POLICIES else "send"
+    overdue_before = now - timedelta(seconds=settings.CATCHUP_OVERDUE_AFTER_SECONDS)
+    stale_before = now - timedelta(hours=settings.CATCHUP_STALE_AFTER_HOURS)
+    result = {"dispatched": 0, "skipped": 0, "expired": 0}
+
+    for _ in range(settings.CATCHUP_MAX_BATCHES_PER_RUN):
+        if wish_engine.draining:
+            break # Shutting down; leave the rest for the next worker
+        db: Session = SessionLocal()
+        try:
+            token = new_claim_token()
+            wish_ids = claim_due_wishes(db, settings.CATCHUP_BATCH_SIZE, now=now, due_before=overdue_before, token=token)
+            stale_ids = set()
+            if wish_ids and policy != "send":
+                stale_ids = {wish_id for (wish_id,) in db.query(ScheduledWish.id).filter(
+                    ScheduledWish.id.in_(wish_ids),
+                    ScheduledWish.scheduled_time < stale_before
+                )}
+        except Exception as e:
+            db.rollback()
+            print(f"Catch-up claim failed: {e}")
+            break
+        finally:
+            db.close()
+
+        if stale_ids:
+            status = "skipped" if policy == "skip" else "expired"
+            result[status] += _retire_stale(list(stale_ids), status)
+
+        due_ids = [wish_id for wish_id in wish_ids if wish_id not in stale_ids]
+        for wish_id in due_ids:
+            remove_wish_job(wish_id) # Tidy up; a job that already fired is stopped by the claim instead
+        futures = submit_claimed(due_ids, token)
+        wait(futures)
+        result["dispatched"] += len(futures)
+
+        if len(wish_ids) < settings.CATCHUP_BATCH_SIZE:
+            break
+
+    if any(result.values()):
+        print(f"Catch-up sweep: {result}")
+    return result
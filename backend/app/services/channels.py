@@ -0,0 +1,40 @@
+from typing import List, Optional
+
+# Delivery channels a wish can fan out to. ScheduledWish.platform holds one of these
+# or a comma-separated list (e.g. "email,telegram"); anything else (e.g. "web") is never delivered.
+CHANNELS = ("email", "telegram", "whatsapp")
+
+# Where each channel sends to on the wish
+DESTINATION_FIELDS = {
+    "email": "recipient_email",
+    "telegram": "telegram_chat_id",
+    "whatsapp": "phone_number",
+}
+
+def parse_platforms(value: Optional[str]) -> List[str]:
+    """Split a platform value into its channels, deduplicated and in the order given."""
+    platforms = []
+    for part in (value or "").split(","):
+        part = part.strip().lower()
+        if part and part not in platforms:
+            platforms.append(part)
+    return platforms
+
+def normalize_platform(value: Optional[str]) -> Optional[str]:
+    """Validate a /schedule platform value; raises ValueError for unknown channels."""
+    platforms = parse_platforms(value)
+    if not platforms:
+        return None
+    if platforms == ["web"]:
+        return "web"
+    unknown = [p for p in platforms if p not in CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown platform: {', '.join(unknown)}")
+    return ",".join(platforms)
+
+def channels_for_wish(wish) -> List[str]:
+    """Channels this wish fans out to: listed in its platform and with a destination set."""
+    return [
+        channel for channel in parse_platforms(wish.platform)
+        if channel in CHANNELS and getattr(wish, DESTINATION_FIELDS[channel], None)
+    ]
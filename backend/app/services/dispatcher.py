@@ -0,0 +1,129 @@
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+from sqlalchemy import select, and_, or_, func, true
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.scheduler import wish_engine, new_claim_token
+from app.services.leader import WORKER_ID
+
+# Dialects that support SELECT ... FOR UPDATE SKIP LOCKED
+SKIP_LOCKED_DIALECTS = ("mysql", "mariadb", "postgresql")
+
+def _claimable(now: datetime, due_before: datetime = None, due_after: datetime = None):
+    stale_before = now - timedelta(seconds=settings.DISPATCH_CLAIM_TIMEOUT_SECONDS)
+    run_at = func.coalesce(ScheduledWish.dispatch_at, ScheduledWish.scheduled_time)
+    return and_(
+        ScheduledWish.status == "pending",
+        ScheduledWish.scheduled_time <= now,
+        or_(ScheduledWish.dispatch_at.is_(None), ScheduledWish.dispatch_at <= now),
+        or_(ScheduledWish.claimed_by.is_(None), ScheduledWish.claimed_at < stale_before),
+        run_at <= due_before if due_before else true(),
+        run_at > due_after if due_after else true()
+    )
+
+def claim_due_wishes(db: Session, limit: int, now: datetime = None, due_before: datetime = None, due_after: datetime = None, token: str = None) -> list:
+    """
+    Atomically claim up to `limit` due pending wishes for this worker and return their ids,
+    most overdue first, grouped by timezone within the same run time. due_before/due_after
+    restrict the claim by run time (the catch-up sweeper takes rows due before its
+    cut-off, the dispatcher the rest). Pass the rows' `token` on to process_wish_async
+    so the pipeline can take over the claim.
+    MySQL/Postgres lock candidate rows with SKIP LOCKED so concurrent workers never
+    block on or double-claim the same row. SQLite has no row locks but serializes
+    writers, so a conditional UPDATE tagged with a unique claim token is equivalent.
+    """
+    now = now or datetime.utcnow()
+    token = token or new_claim_token()
+    claimable = _claimable(now, due_before, due_after)
+
+    if db.bind.dialect.name in SKIP_LOCKED_DIALECTS:
+        rows = db.query(ScheduledWish.id).filter(claimable).order_by(
+            ScheduledWish.scheduled_time, ScheduledWish.timezone
+        ).limit(limit).with_for_update(skip_locked=True).all()
+        wish_ids = [wish_id for (wish_id,) in rows]
+        if wish_ids:
+            db.query(ScheduledWish).filter(ScheduledWish.id.in_(wish_ids)).update(
+                {ScheduledWish.claimed_by: token, ScheduledWish.claimed_at: now},
+                synchronize_session=False
+            )
+        db.commit()
+        return wish_ids
+
+    candidates = select(ScheduledWish.id).where(claimable).order_by(
+        ScheduledWish.scheduled_time, ScheduledWish.timezone
+    ).limit(limit)
+    db.query(ScheduledWish).filter(
+        ScheduledWish.id.in_(candidates),
+        claimable
+    ).update(
+        {ScheduledWish.claimed_by: token, ScheduledWish.claimed_at: now},
+        synchronize_session=False
+    )
+    db.commit()
+    rows = db.query(ScheduledWish.id).filter(ScheduledWish.claimed_by == token).order_by(
+        ScheduledWish.scheduled_time, ScheduledWish.timezone
+    ).all()
+    return [wish_id for (wish_id,) in rows]
+
+def submit_claimed(wish_ids: list, token: str) -> list:
+    """
+    Submit claimed wishes to the wish engine and return their futures. If a drain starts
+    partway through, the claims on the ids that never reached the engine are released in
+    one statement so another worker can take them now rather than after the claim timeout.
+    """
+    futures = []
+    for position, wish_id in enumerate(wish_ids):
+        try:
+            futures.append(wish_engine.submit(wish_id, token))
+        except RuntimeError:
+            unsubmitted = wish_ids[position:]
+            db: Session = SessionLocal()
+            try:
+                db.query(ScheduledWish).filter(
+                    ScheduledWish.id.in_(unsubmitted),
+                    ScheduledWish.claimed_by == token
+                ).update({ScheduledWish.claimed_by: None}, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            print(f"Released {len(unsubmitted)} claimed wishes: engine is draining")
+            break
+    return futures
+
+def dispatch_due_wishes():
+    """
+    Periodic dispatcher tick: claim due wishes in batches and run each batch on the
+    wish engine. A batch is drained before the next claim so claims never sit queued
+    long enough to go stale.
+    """
+    total = 0
+    for _ in range(settings.DISPATCH_MAX_BATCHES_PER_TICK):
+        if wish_engine.draining:
+            break # Shutting down; leave the rest for the next worker
+        # Rows overdue past the catch-up cut-off belong to the catch-up sweeper and its stale policy
+        due_after = None
+        if settings.CATCHUP_ENABLED:
+            due_after = datetime.utcnow() - timedelta(seconds=settings.CATCHUP_OVERDUE_AFTER_SECONDS)
+        db: Session = SessionLocal()
+        try:
+            token = new_claim_token()
+            wish_ids = claim_due_wishes(db, settings.DISPATCH_BATCH_SIZE, due_after=due_after, token=token)
+        except Exception as e:
+            db.rollback()
+            print(f"Dispatcher claim failed: {e}")
+            break
+        finally:
+            db.close()
+
+        futures = submit_claimed(wish_ids, token)
+        wait(futures)
+        total += len(futures)
+
+        if len(wish_ids) < settings.DISPATCH_BATCH_SIZE:
+            break
+
+    if total:
+        print(f"Dispatcher {WORKER_ID} processed {total} wishes")
+    return total
@@ -1,9 +1,10 @@
 from app.core.config import settings
-import smtplib
+from app.services.smtp_pool import smtp_pool
+from app.services.rate_limiter import outbound_limiter
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-def send_email(to_email: str, subject: str, body_text: str, body_html: str = None):
+def send_email(to_email: str, subject: str, body_text: str, body_html: str = None, channel: str = "email"):
     if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
         print(f"Skipping email to {to_email} (SMTP credentials missing)")
         return False
@@ -21,11 +22,8 @@ def send_email(to_email: str, subject: str, body_text: str, body_html: str = Non
         if body_html:
             msg.attach(MIMEText(body_html, 'html'))
 
-        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        outbound_limiter.acquire_sync(channel)
+        smtp_pool.send_message(msg)
         print(f"Email sent to {to_email}")
         return True
     except Exception as e:
@@ -66,4 +64,53 @@ def send_password_reset_email(to_email: str, token: str):
     </html>
     """
     
+    # Own rate-limit channel: a wish backlog or a provider throttle on "email" mustn't delay resets
+    return send_email(to_email, subject, body_text, body_html, channel="transactional")
+
+def send_reminder_digest_email(to_email: str, full_name: str, reminders: list):
+    """
+    One email listing every upcoming wish a user asked to be reminded about.
+    `reminders` holds dicts with recipient_name, occasion, event_name, local_time and needs_approval.
+    """
+    greeting = f"Hi {full_name}," if full_name else "Hi,"
+    subject = f"Reminder: {len(reminders)} upcoming wish{'es' if len(reminders) != 1 else ''}"
+
+    lines = []
+    rows = []
+    for item in reminders:
+        when = item["local_time"].strftime("%a %d %b, %H:%M")
+        note = " (waiting for your approval)" if item["needs_approval"] else ""
+        lines.append(f"- {item['occasion']} for {item['recipient_name']} ({item['event_name']}) on {when}{note}")
+        rows.append(f"""
+                    <tr>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee;">{item['occasion']} for <strong>{item['recipient_name']}</strong></td>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee;">{when}</td>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee; color: #b45309;">{'Needs approval' if item['needs_approval'] else ''}</td>
+                    </tr>""")
+
+    body_text = f"""
+    {greeting}
+
+    These wishes are coming up:
+
+    """ + "\n    ".join(lines) + """
+
+    You can review or edit them from your dashboard.
+    """
+
+    body_html = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #666;">Upcoming wishes</h2>
+                <p>{greeting}</p>
+                <p>These wishes are coming up:</p>
+                <table style="width: 100%; border-collapse: collapse;">{''.join(rows)}
+                </table>
+                <p style="font-size: 12px; color: #999;">You can review or edit them from your dashboard.</p>
+            </div>
+        </body>
+    </html>
+    """
+
     return send_email(to_email, subject, body_text, body_html)
@@ -0,0 +1,145 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, case
+from sqlalchemy.exc import IntegrityError
+from app.db.database import SessionLocal
+from app.db.models import SchedulerLease
+
+# Identifies this process in lease and claim columns
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class LeaderElector:
+    """
+    Lease-based leader election on a database row. The holder renews the lease
+    every `renew_interval` seconds; if it stops renewing (crash, lost DB, hung
+    process) another process takes over once `lease_seconds` have passed.
+
+    Acquire and renew are one conditional UPDATE (holder is us, or the lease has
+    expired), so at most one process wins. On any DB error we step down rather
+    than risk two leaders.
+    """
+
+    def __init__(self, name: str, holder: str = WORKER_ID, lease_seconds: int = 30, renew_interval: int = 10,
+                 on_elected=None, on_demoted=None, on_renewed=None):
+        self.name = name
+        self.holder = holder
+        self.lease_seconds = lease_seconds
+        self.renew_interval = renew_interval
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.on_renewed = on_renewed
+        self.is_leader = False
+        self.elected_at = None
+        self.last_renewed_at = None
+        self.elections = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease. Returns True if this process holds it afterwards."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            updated = db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now)
+            ).update({
+                SchedulerLease.acquired_at: case((SchedulerLease.holder == self.holder, SchedulerLease.acquired_at), else_=now),
+                SchedulerLease.holder: self.holder,
+                SchedulerLease.expires_at: expires_at
+            }, synchronize_session=False)
+            db.commit()
+            if updated:
+                return True
+            if db.query(SchedulerLease.name).filter(SchedulerLease.name == self.name).first():
+                return False
+            # First election for this name
+            db.add(SchedulerLease(name=self.name, holder=self.holder, acquired_at=now, expires_at=expires_at))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback() # Another process inserted it first
+                return False
+        finally:
+            db.close()
+
+    def release(self):
+        """Expire our lease immediately so a follower can take over without waiting."""
+        db = SessionLocal()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                SchedulerLease.holder == self.holder
+            ).update({SchedulerLease.expires_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def tick(self):
+        try:
+            leader = self.try_acquire()
+        except Exception as e:
+            print(f"Leader election for {self.name} failed: {e}")
+            leader = False
+
+        if leader:
+            self.last_renewed_at = datetime.utcnow()
+        if leader and not self.is_leader:
+            self.is_leader = True
+            self.elected_at = self.last_renewed_at
+            self.elections += 1
+            print(f"{self.holder} elected {self.name} leader")
+            if self.on_elected:
+                self.on_elected()
+        elif not leader and self.is_leader:
+            self.is_leader = False
+            print(f"{self.holder} lost {self.name} leadership")
+            if self.on_demoted:
+                self.on_demoted()
+        elif leader and self.on_renewed:
+            self.on_renewed()
+
+    def start(self):
+        """Run one election round now, then keep renewing in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.tick()
+
+        def run():
+            while not self._stop.wait(self.renew_interval):
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"Leader election callback failed: {e}")
+
+        self._thread = threading.Thread(target=run, name=f"{self.name}-leader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.renew_interval + 5)
+            self._thread = None
+        if self.is_leader:
+            self.is_leader = False
+            if self.on_demoted:
+                self.on_demoted()
+            try:
+                self.release()
+            except Exception as e:
+                print(f"Failed to release {self.name} lease: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "elected_at": self.elected_at.isoformat() if self.elected_at else None,
+            "last_renewed_at": self.last_renewed_at.isoformat() if self.last_renewed_at else None,
+            "lease_seconds": self.lease_seconds,
+            "elections": self.elections
+        }
@@ -1,35 +1,252 @@
 from openai import AsyncOpenAI
+from cachetools import TTLCache
 from app.core.config import settings
+from app.services.metrics import pipeline_metrics
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import weakref
 
-# Initialize client pointing to Groq AI
-client = AsyncOpenAI(
-    base_url=settings.GROQ_BASE_URL,
-    api_key=settings.GROQ_API_KEY
-)
+# AsyncOpenAI's connection pool is bound to the event loop that first uses it,
+# so each long-lived loop (API server, wish engine) gets its own client and reuses it.
+_clients = weakref.WeakKeyDictionary()
+
+def get_client() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Initialize client pointing to Groq AI
+        client = AsyncOpenAI(
+            base_url=settings.GROQ_BASE_URL,
+            api_key=settings.GROQ_API_KEY
+        )
+        _clients[loop] = client
+    return client
 
 import time
 
 # Metrics
 LATENCY_HISTORY = []
 
-async def generate_wish_text(request):
-    start_time = time.time()
-    if not settings.GROQ_API_KEY:
-        return "Error: Groq API Key is missing. Please configure it in the backend."
+# Reply budgets per completion
+WISH_MAX_TOKENS = 150
+WORD_MAX_TOKENS = 60
+
+def is_generation_error(text: str) -> bool:
+    # generate_wish_text reports failures as text rather than raising
+    return not text or text.startswith("Error")
+
+def _normalize(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+def wish_cache_key(request) -> str:
+    """Stable key for a wish prompt: case and whitespace differences map to the same entry."""
+    parts = [
+        settings.GROQ_MODEL,
+        _normalize(request.occasion),
+        _normalize(request.tone),
+        _normalize(request.recipient_name),
+        _normalize(request.extra_details),
+        _normalize(getattr(request, "length", "short")),
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+class WishCache:
+    """
+    Generated wish text keyed by normalized prompt. An in-memory LRU with TTL sits in
+    front of an optional SQLite file, which survives restarts and is shared by every
+    process pointing at the same path.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, path: str = None):
+        self.ttl = ttl
+        self.path = path or None
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS wish_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL") # Readers in other workers don't block the writer
+        return conn
+
+    def _disk_get(self, key: str):
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT text FROM wish_cache WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Wish cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, text: str):
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO wish_cache (key, text, expires_at) VALUES (?, ?, ?)", (key, text, time.time() + self.ttl))
+                conn.execute("DELETE FROM wish_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"Wish cache write failed: {e}")
+
+    def get(self, key: str):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self.hits += 1
+                return text
+        text = self._disk_get(key) if self.path else None
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory[key] = text
+        return text
+
+    def set(self, key: str, text: str):
+        with self._lock:
+            self._memory[key] = text
+        if self.path:
+            self._disk_set(key, text)
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM wish_cache")
 
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.LLM_CACHE_ENABLED,
+                "persistent": bool(self.path),
+                "entries": len(self._memory),
+                "max_entries": self._memory.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0
+            }
+
+wish_cache = WishCache(
+    maxsize=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    path=settings.LLM_CACHE_PATH
+)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto one in-flight task, so a burst
+    of identical prompts costs one completion. Tasks belong to an event loop, so each
+    loop (API server, wish engine) keeps its own table of in-flight calls.
+    """
+
+    def __init__(self):
+        self._inflight = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def record_coalesced(self, count: int = 1):
+        with self._lock:
+            self.coalesced += count
+
+    async def do(self, key: str, factory):
+        """Await factory() for `key`, joining the call already in flight for it if there is one."""
+        if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+            return await factory()
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        task = inflight.get(key)
+        if task is None:
+            with self._lock:
+                self.calls += 1
+            task = loop.create_task(factory())
+            inflight[key] = task
+            task.add_done_callback(lambda done: inflight.pop(key, None) if inflight.get(key) is done else None)
+        else:
+            self.record_coalesced()
+        # Shielded so one caller going away (e.g. a client disconnect) doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requested = self.calls + self.coalesced
+            return {
+                "enabled": settings.LLM_SINGLE_FLIGHT_ENABLED,
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": sum(len(calls) for calls in list(self._inflight.values())),
+                "saved_rate": round(self.coalesced / requested, 3) if requested else 0
+            }
+
+wish_flight = SingleFlight()
+
+async def generate_wish_text(request, use_cache: bool = True):
+    """
+    Generate a wish, serving identical prompts from wish_cache and sharing one Groq
+    call between concurrent identical prompts. Pass use_cache=False for a fresh
+    variant (its own call, never shared); the new text still replaces the cached one.
+    """
+    key = wish_cache_key(request)
+    if settings.LLM_CACHE_ENABLED:
+        if use_cache:
+            cached = await asyncio.to_thread(wish_cache.get, key)
+            if cached is not None:
+                return cached
+        else:
+            wish_cache.record_bypass()
+
+    if not use_cache:
+        # A fresh variant must not be joined onto another caller's in-flight completion
+        return await _generate_and_cache(request, key)
+    return await wish_flight.do(key, lambda: _generate_and_cache(request, key))
+
+async def _generate_and_cache(request, key: str) -> str:
+    text = await _generate_wish_text(request)
+    if settings.LLM_CACHE_ENABLED and not is_generation_error(text):
+        await asyncio.to_thread(wish_cache.set, key, text)
+    return text
+
+def _wish_prompt(request) -> str:
     prompt = f"Write a {request.tone} {request.occasion} wish for {request.recipient_name}. "
     if request.extra_details:
         prompt += f"Details: {request.extra_details}. "
     prompt += f"Keep it {request.length}."
+    return prompt
+
+async def _generate_wish_text(request):
+    start_time = time.time()
+    if not settings.GROQ_API_KEY:
+        return "Error: Groq API Key is missing. Please configure it in the backend."
+
+    prompt = _wish_prompt(request)
 
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=settings.GROQ_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that writes personalized wishes."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=150,
+            max_tokens=WISH_MAX_TOKENS,
             temperature=0.7,
         )
         duration = (time.time() - start_time) * 1000 # ms
@@ -41,29 +258,260 @@ async def generate_wish_text(request):
         print(f"Groq AI Error: {e}")
         return f"Error generating wish with Groq AI: {str(e)}"
 
-async def generate_wish_from_words(words, mode):
+def _word_prompt(word) -> str:
+    return f"Create a creative wish or message using the word: {word}"
+
+async def stream_wish_text(request, use_cache: bool = True):
+    """
+    Streaming generate_wish_text: an async generator yielding the wish in chunks as
+    Groq produces them (stream=True). A cached prompt is yielded in one chunk. Unlike
+    generate_wish_text, failures are raised so a half-sent stream can be reported.
+    """
     if not settings.GROQ_API_KEY:
-        return ["Error: Groq API Key is missing."] * len(words)
+        raise RuntimeError("Groq API Key is missing. Please configure it in the backend.")
+
+    key = wish_cache_key(request) if settings.LLM_CACHE_ENABLED else None
+    if key and use_cache:
+        cached = await asyncio.to_thread(wish_cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+    elif key:
+        wish_cache.record_bypass()
+
+    start_time = time.time()
+    stream = await get_client().chat.completions.create(
+        model=settings.GROQ_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that writes personalized wishes."},
+            {"role": "user", "content": _wish_prompt(request)}
+        ],
+        max_tokens=WISH_MAX_TOKENS,
+        temperature=0.7,
+        stream=True,
+    )
+    parts = []
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            continue
+        if not parts:
+            pipeline_metrics.observe("llm_first_token", time.time() - start_time)
+        parts.append(delta)
+        yield delta
+
+    duration = (time.time() - start_time) * 1000 # ms
+    LATENCY_HISTORY.append({"timestamp": time.time(), "latency": duration})
+    if len(LATENCY_HISTORY) > 100: LATENCY_HISTORY.pop(0)
+    text = "".join(parts).strip()
+    if key and text:
+        await asyncio.to_thread(wish_cache.set, key, text)
 
-    results = []
-    for word in words:
-        prompt = f"Create a creative wish or message using the word: {word}"
+async def _wish_for_word(word, semaphore: asyncio.Semaphore) -> str:
+    prompt = _word_prompt(word)
+    async with semaphore:
         try:
-            response = await client.chat.completions.create(
-                model=settings.GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=60
+            response = await asyncio.wait_for(
+                get_client().chat.completions.create(
+                    model=settings.GROQ_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=WORD_MAX_TOKENS
+                ),
+                timeout=settings.LLM_WORD_TIMEOUT_SECONDS
             )
-            results.append(response.choices[0].message.content.strip())
+            return response.choices[0].message.content.strip()
+        except asyncio.TimeoutError:
+            return f"Error for {word}: timed out after {settings.LLM_WORD_TIMEOUT_SECONDS}s"
         except Exception as e:
-            results.append(f"Error for {word}: {str(e)}")
+            return f"Error for {word}: {str(e)}"
+
+async def generate_wish_from_words(words, mode):
+    """
+    One wish per word, generated concurrently (at most LLM_WORD_CONCURRENCY at once), in input order.
+    A batched call gets the same LLM_WORD_TIMEOUT_SECONDS deadline as a single word, so a slow
+    batch costs at most one extra word deadline before the per-word fallback runs.
+    """
+    if not settings.GROQ_API_KEY:
+        return ["Error: Groq API Key is missing."] * len(words)
+
+    semaphore = asyncio.Semaphore(settings.LLM_WORD_CONCURRENCY)
+    if settings.LLM_BATCH_ENABLED and len(words) > 1:
+        return await generate_batch(
+            [_word_prompt(word) for word in words],
+            lambda i: _wish_for_word(words[i], semaphore),
+            WORD_MAX_TOKENS,
+            timeout=settings.LLM_WORD_TIMEOUT_SECONDS
+        )
+    return await asyncio.gather(*(_wish_for_word(word, semaphore) for word in words))
+
+# --- Batched generation ---
+# One completion returns a JSON array of wishes, saving a round-trip and the
+# per-call prompt overhead for every item after the first.
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful assistant that writes personalized wishes. You will receive a JSON array "
+    "of requests, each with an id and a prompt. Reply with only a JSON array holding one object "
+    'per request: {"id": <id>, "text": "<the wish>"}.'
+)
+
+BATCH_METRICS = {"calls": 0, "items": 0, "parsed": 0, "fallbacks": 0}
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+def plan_batches(prompts, tokens_per_item: int, max_size: int = None, token_budget: int = None):
+    """
+    Group prompt indexes into batches of at most `max_size` whose estimated prompt
+    plus reply tokens fit `token_budget`. A prompt too big for the budget gets a batch of its own.
+    """
+    max_size = max_size or settings.LLM_BATCH_MAX_SIZE
+    token_budget = token_budget or settings.LLM_BATCH_TOKEN_BUDGET
+    base = estimate_tokens(BATCH_SYSTEM_PROMPT)
+    batches, current, used = [], [], base
+    for i, prompt in enumerate(prompts):
+        cost = estimate_tokens(prompt) + tokens_per_item + 10 # + JSON framing
+        if current and (len(current) >= max_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], base
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_response(content: str, count: int) -> dict:
+    """Map item id -> text for the well-formed entries of a batch reply; the rest are left to the fallback."""
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(content[start:end + 1]) # Tolerates ```json fences and chatter around the array
+    except ValueError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    texts = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_id, text = item.get("id"), item.get("text")
+        if not isinstance(item_id, int) or not 0 <= item_id < count or item_id in texts:
+            continue
+        if isinstance(text, str) and not is_generation_error(text.strip()):
+            texts[item_id] = text.strip()
+    return texts
+
+async def _complete_batch(prompts, tokens_per_item: int, timeout: float) -> dict:
+    start_time = time.time()
+    payload = json.dumps([{"id": i, "prompt": prompt} for i, prompt in enumerate(prompts)])
+    BATCH_METRICS["calls"] += 1
+    BATCH_METRICS["items"] += len(prompts)
+    try:
+        response = await asyncio.wait_for(
+            get_client().chat.completions.create(
+                model=settings.GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": payload}
+                ],
+                max_tokens=tokens_per_item * len(prompts) + 20 * len(prompts),
+                temperature=0.7,
+            ),
+            timeout=timeout
+        )
+    except Exception as e:
+        print(f"Groq AI batch error ({len(prompts)} items): {e!r}")
+        return {}
+    duration = (time.time() - start_time) * 1000 # ms
+    LATENCY_HISTORY.append({"timestamp": time.time(), "latency": duration})
+    if len(LATENCY_HISTORY) > 100: LATENCY_HISTORY.pop(0)
+
+    texts = parse_batch_response(response.choices[0].message.content or "", len(prompts))
+    BATCH_METRICS["parsed"] += len(texts)
+    return texts
+
+async def generate_batch(prompts, fallback, tokens_per_item: int, timeout: float = None):
+    """
+    Complete many prompts in as few calls as the batch size and token budget allow.
+    Items missing or malformed in a batch reply (or whose batch call failed or took
+    longer than `timeout`, default LLM_BATCH_TIMEOUT_SECONDS) are completed one at a
+    time via `fallback(index)`. Results keep the input order.
+    """
+    timeout = timeout or settings.LLM_BATCH_TIMEOUT_SECONDS
+    results = [None] * len(prompts)
+    batches = [batch for batch in plan_batches(prompts, tokens_per_item) if len(batch) > 1]
+    replies = await asyncio.gather(*(
+        _complete_batch([prompts[i] for i in batch], tokens_per_item, timeout) for batch in batches
+    ))
+    for batch, texts in zip(batches, replies):
+        for position, index in enumerate(batch):
+            results[index] = texts.get(position)
+
+    missing = [i for i, text in enumerate(results) if text is None]
+    if missing:
+        BATCH_METRICS["fallbacks"] += len(missing)
+        for i, text in zip(missing, await asyncio.gather(*(fallback(i) for i in missing))):
+            results[i] = text
+    return results
+
+async def generate_wish_batch(requests, use_cache: bool = True):
+    """
+    generate_wish_text() for many wish requests: cached prompts are served from
+    wish_cache and the rest are generated in batched completions.
+    """
+    if not settings.GROQ_API_KEY:
+        return ["Error: Groq API Key is missing. Please configure it in the backend."] * len(requests)
+
+    cache_enabled = settings.LLM_CACHE_ENABLED
+    keys = [wish_cache_key(request) for request in requests]
+    if cache_enabled and use_cache:
+        results = await asyncio.to_thread(lambda: [wish_cache.get(key) for key in keys])
+    else:
+        results = [None] * len(requests)
+        if cache_enabled:
+            for _ in requests:
+                wish_cache.record_bypass()
+
+    # Identical prompts in the batch are generated once
+    first_for_key = {}
+    for i, text in enumerate(results):
+        if text is None:
+            first_for_key.setdefault(keys[i], i)
+    todo = list(first_for_key.values())
+    duplicates = sum(1 for text in results if text is None) - len(todo)
+    if duplicates:
+        wish_flight.record_coalesced(duplicates)
+
+    def single(i):
+        if not use_cache:
+            return _generate_wish_text(requests[i]) # Fresh variants don't join other callers' calls
+        return wish_flight.do(keys[i], lambda: _generate_wish_text(requests[i]))
+
+    if settings.LLM_BATCH_ENABLED:
+        texts = await generate_batch(
+            [_wish_prompt(requests[i]) for i in todo],
+            lambda position: single(todo[position]),
+            WISH_MAX_TOKENS
+        )
+    else:
+        texts = await asyncio.gather(*(single(i) for i in todo))
+
+    generated = dict(zip((keys[i] for i in todo), texts))
+    fresh = [(key, text) for key, text in generated.items() if not is_generation_error(text)]
+    for i, text in enumerate(results):
+        if text is None:
+            results[i] = generated[keys[i]]
+    if cache_enabled and fresh:
+        await asyncio.to_thread(lambda: [wish_cache.set(key, text) for key, text in fresh])
     return results
 
 async def get_llm_response(prompt: str) -> str:
     if not settings.GROQ_API_KEY:
          raise Exception("Groq API Key is missing")
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=settings.GROQ_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
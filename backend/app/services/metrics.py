@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.models import ScheduledWish
+
+# Upper bounds in seconds; covers sub-second SMTP sends up to hour-long dispatch lag
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+class Histogram:
+    """
+    Thread-safe timing histogram: cumulative bucket counts for the whole process
+    lifetime plus a window of recent samples for percentiles.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 1000):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+
+    def _percentile(self, ordered, pct: float) -> float:
+        if not ordered:
+            return 0
+        return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._recent)
+            counts = list(self._counts)
+            count, total, peak = self.count, self.total, self.max
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(list(self.buckets) + ["+Inf"], counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "count": count,
+            "avg_ms": round(total * 1000 / count, 2) if count else 0,
+            "p50_ms": round(self._percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(self._percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(self._percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(peak * 1000, 2),
+            "buckets": buckets
+        }
+
+class PipelineMetrics:
+    """Per-stage timings for the wish pipeline (dispatch_lag, llm, render, smtp, total)."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        with self._lock:
+            return self._histograms.setdefault(stage, Histogram())
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).observe(max(seconds, 0.0))
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = dict(self._histograms)
+        return {stage: h.snapshot() for stage, h in sorted(stages.items())}
+
+def queue_depth(db: Session) -> dict:
+    """Wish counts by status, plus how many pending wishes are already overdue."""
+    rows = db.query(ScheduledWish.status, func.count(ScheduledWish.id)).group_by(ScheduledWish.status).all()
+    depth = {status or "unknown": count for status, count in rows}
+    depth["overdue"] = db.query(func.count(ScheduledWish.id)).filter(
+        ScheduledWish.status == "pending",
+        ScheduledWish.scheduled_time <= datetime.utcnow()
+    ).scalar()
+    return depth
+
+def due_by_timezone(db: Session, hours: int = 24) -> dict:
+    """
+    Pending wishes due in the next `hours`, per timezone and UTC hour. Local delivery
+    times put each timezone's peak in a different UTC hour; this shows those windows.
+    """
+    now = datetime.utcnow()
+    rows = db.query(ScheduledWish.timezone, ScheduledWish.scheduled_time).filter(
+        ScheduledWish.status == "pending",
+        ScheduledWish.scheduled_time > now,
+        ScheduledWish.scheduled_time <= now + timedelta(hours=hours)
+    ).all()
+    windows = {}
+    for tz_name, scheduled_time in rows:
+        hour = scheduled_time.strftime("%Y-%m-%dT%H:00")
+        zone = windows.setdefault(tz_name or "UTC", {})
+        zone[hour] = zone.get(hour, 0) + 1
+    return windows
+
+pipeline_metrics = PipelineMetrics()
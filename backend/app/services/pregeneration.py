@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.llm import generate_wish_batch, is_generation_error
+from app.services.scheduler import WishPrompt, wish_engine
+from app.services.metrics import pipeline_metrics
+
+def _store_generated_texts(texts) -> int:
+    """Store (wish_id, text) pairs in one transaction; returns how many were stored."""
+    db: Session = SessionLocal()
+    try:
+        stored = 0
+        for wish_id, text in texts:
+            # Conditional update so we never overwrite text set by the user or the send path
+            stored += db.query(ScheduledWish).filter(
+                ScheduledWish.id == wish_id,
+                ScheduledWish.status == "pending",
+                ScheduledWish.generated_wish.is_(None)
+            ).update({ScheduledWish.generated_wish: text}, synchronize_session=False)
+        db.commit()
+        return stored
+    finally:
+        db.close()
+
+async def _pregenerate_batch(rows) -> int:
+    prompts = [WishPrompt(row.occasion, row.recipient_name, row.tone, row.extra_details) for row in rows]
+    with pipeline_metrics.timer("llm"):
+        texts = await generate_wish_batch(prompts)
+
+    generated = []
+    for row, text in zip(rows, texts):
+        if is_generation_error(text):
+            print(f"Pre-generation failed for wish {row.id}: {text}")
+        else:
+            generated.append((row.id, text))
+    if not generated:
+        return 0
+    return await asyncio.to_thread(_store_generated_texts, generated)
+
+def pregenerate_upcoming_wishes(horizon_hours: int = None, batch_size: int = None) -> int:
+    """
+    Fill in generated_wish for pending wishes due within the horizon so the
+    send-time path only renders and delivers. Wishes that already carry text
+    (e.g. a preview saved via /schedule) are skipped.
+    """
+    horizon_hours = horizon_hours or settings.PREGENERATE_HORIZON_HOURS
+    batch_size = batch_size or settings.PREGENERATE_BATCH_SIZE
+    horizon = datetime.utcnow() + timedelta(hours=horizon_hours)
+
+    db: Session = SessionLocal()
+    try:
+        rows = db.query(
+            ScheduledWish.id,
+            ScheduledWish.occasion,
+            ScheduledWish.recipient_name,
+            ScheduledWish.tone,
+            ScheduledWish.extra_details
+        ).filter(
+            ScheduledWish.status == "pending",
+            ScheduledWish.generated_wish.is_(None),
+            ScheduledWish.scheduled_time <= horizon
+        ).order_by(ScheduledWish.scheduled_time).limit(batch_size).all()
+    finally:
+        db.close()
+
+    if not rows:
+        return 0
+
+    # Each engine task generates one LLM batch worth of wishes
+    chunk = settings.LLM_BATCH_MAX_SIZE if settings.LLM_BATCH_ENABLED else 1
+    futures = [
+        wish_engine.submit_to(_pregenerate_batch, rows[i:i + chunk])
+        for i in range(0, len(rows), chunk)
+    ]
+    wait(futures)
+    generated = sum(f.result() for f in futures if not f.exception())
+    print(f"Pre-generated {generated} of {len(rows)} upcoming wishes")
+    return generated
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from app.core.config import settings
+
+# SMTP reply codes providers use for "slow down / try again later"
+SMTP_THROTTLE_CODES = (421, 450, 451, 452)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() always grants a token but returns how long
+    the caller must wait before using it, so concurrent callers queue up and the
+    channel drains at exactly `rate` per second after the initial `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def penalize(self, seconds: float):
+        """Push every future reservation back by `seconds` (provider asked us to slow down)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+class ChannelMetrics:
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "avg_wait_ms": round(self.total_wait * 1000 / self.acquired, 2) if self.acquired else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "total_wait_s": round(self.total_wait, 2),
+            "throttled": self.throttled
+        }
+
+class OutboundRateLimiter:
+    """
+    Shared limiter for outbound delivery. Each send takes a token from its channel
+    bucket and, when a sender is given, from that sender's bucket on the channel.
+    """
+
+    def __init__(self, channel_limits: dict, sender_limits: dict):
+        self.channel_limits = channel_limits # channel -> (rate per second, burst)
+        self.sender_limits = sender_limits
+        self._buckets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            channel_limits={
+                "email": (settings.RATE_LIMIT_EMAIL_PER_SECOND, settings.RATE_LIMIT_EMAIL_BURST),
+                "transactional": (settings.RATE_LIMIT_TRANSACTIONAL_PER_SECOND, settings.RATE_LIMIT_TRANSACTIONAL_BURST),
+                "telegram": (settings.RATE_LIMIT_TELEGRAM_PER_SECOND, settings.RATE_LIMIT_TELEGRAM_BURST),
+                "whatsapp": (settings.RATE_LIMIT_WHATSAPP_PER_SECOND, settings.RATE_LIMIT_WHATSAPP_BURST),
+            },
+            sender_limits={
+                "email": (settings.RATE_LIMIT_SENDER_PER_SECOND, settings.RATE_LIMIT_SENDER_BURST),
+                "telegram": (settings.RATE_LIMIT_SENDER_PER_SECOND, settings.RATE_LIMIT_SENDER_BURST),
+                "whatsapp": (settings.RATE_LIMIT_SENDER_PER_SECOND, settings.RATE_LIMIT_SENDER_BURST),
+            }
+        )
+
+    def _bucket(self, key, limits):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None and limits:
+                bucket = self._buckets[key] = TokenBucket(*limits)
+            return bucket
+
+    def _metrics_for(self, channel: str) -> ChannelMetrics:
+        with self._lock:
+            return self._metrics.setdefault(channel, ChannelMetrics())
+
+    def reserve(self, channel: str, sender=None) -> float:
+        """Take a send slot and return the seconds to wait before using it."""
+        if channel not in self.channel_limits:
+            return 0.0 # e.g. "web" wishes are never delivered externally
+        wait = self._bucket(channel, self.channel_limits[channel]).reserve()
+        if sender is not None:
+            sender_bucket = self._bucket((channel, sender), self.sender_limits.get(channel))
+            if sender_bucket:
+                wait = max(wait, sender_bucket.reserve())
+        self._metrics_for(channel).record(wait)
+        return wait
+
+    async def acquire(self, channel: str, sender=None):
+        wait = self.reserve(channel, sender)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, channel: str, sender=None):
+        wait = self.reserve(channel, sender)
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self, channel: str, seconds: float = None):
+        """Record a provider throttling response and slow the whole channel down."""
+        self._metrics_for(channel).throttled += 1
+        bucket = self._bucket(channel, self.channel_limits.get(channel))
+        if bucket:
+            bucket.penalize(seconds if seconds is not None else settings.RATE_LIMIT_THROTTLE_BACKOFF_SECONDS)
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            channel: {
+                "rate_per_second": self.channel_limits.get(channel, (None, None))[0],
+                "burst": self.channel_limits.get(channel, (None, None))[1],
+                **m.as_dict()
+            }
+            for channel, m in metrics.items()
+        }
+
+def is_throttle_error(error: Exception) -> bool:
+    """True for provider responses that mean "retry later" rather than a hard failure."""
+    if getattr(error, "smtp_code", None) in SMTP_THROTTLE_CODES:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    # Twilio raises TwilioRestException with an HTTP status attribute
+    return getattr(error, "status", None) == 429
+
+outbound_limiter = OutboundRateLimiter.from_settings()
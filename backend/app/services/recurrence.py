@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrulestr
+from apscheduler.triggers.cron import CronTrigger
+from app.services.timezones import to_local, to_utc
+
+# Rules are stored as RFC 5545 RRULE bodies (e.g. "FREQ=MONTHLY;INTERVAL=3")
+# or as "CRON:<5-field crontab>" for cron-style schedules.
+PRESET_RULES = {
+    "daily": "FREQ=DAILY",
+    "weekly": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+}
+
+# Legacy is_recurring codes: 1-4 from the scheduler, 7/30/365 from older /schedule requests
+LEGACY_RULES = {
+    1: "FREQ=DAILY",
+    2: "FREQ=WEEKLY",
+    3: "FREQ=MONTHLY",
+    4: "FREQ=YEARLY",
+    7: "FREQ=WEEKLY",
+    30: "FREQ=MONTHLY",
+    365: "FREQ=YEARLY",
+}
+
+# is_recurring code kept in sync for clients that still read it (0=None, 1=Daily, 2=Weekly, 3=Monthly, 4=Yearly)
+IS_RECURRING_CODES = {
+    "FREQ=DAILY": 1,
+    "FREQ=WEEKLY": 2,
+    "FREQ=MONTHLY": 3,
+    "FREQ=YEARLY": 4,
+}
+
+SIMPLE_STEPS = {
+    "DAILY": lambda n: relativedelta(days=n),
+    "WEEKLY": lambda n: relativedelta(weeks=n),
+    "MONTHLY": lambda n: relativedelta(months=n),
+    "YEARLY": lambda n: relativedelta(years=n),
+}
+
+# Crontab numbers weekdays 0-7 from Sunday (0 and 7 are both Sunday); APScheduler
+# numbers them 0-6 from Monday and steps through its own order, so the
+# day-of-week field is expanded to explicit day names before building a trigger.
+CRON_WEEKDAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+def _crontab_weekday(token: str) -> int:
+    """0-7 for a crontab day-of-week number or name (names give 0 for Sunday)."""
+    token = token.lower()
+    if token in CRON_WEEKDAYS:
+        return CRON_WEEKDAYS.index(token)
+    if not token.isdigit() or int(token) > 7:
+        raise ValueError(f"Invalid day of week: {token}")
+    return int(token)
+
+def _crontab_day_of_week(field: str) -> str:
+    days = set()
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        if step and (not step.isdigit() or int(step) == 0):
+            raise ValueError(f"Invalid day of week step: {part}")
+        if base == "*":
+            first, last = 0, 6
+        elif "-" in base:
+            start, end = base.split("-", 1)
+            first, last = _crontab_weekday(start), _crontab_weekday(end)
+            if end.lower() == "sun":
+                last = 7 # "fri-sun" runs through Sunday
+        else:
+            first = _crontab_weekday(base)
+            last = 7 if step else first # "1/2" means "1-7/2"
+        if first > last:
+            raise ValueError(f"Invalid day of week range: {part}")
+        days.update(day % 7 for day in range(first, last + 1, int(step or 1)))
+    if len(days) == 7:
+        return "*"
+    return ",".join(CRON_WEEKDAYS[day] for day in sorted(days))
+
+def cron_trigger(expr: str) -> CronTrigger:
+    """CronTrigger (in UTC) for a standard 5-field crontab expression."""
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"Wrong number of fields in crontab expression: {expr}")
+    fields[4] = _crontab_day_of_week(fields[4])
+    return CronTrigger.from_crontab(" ".join(fields), timezone=timezone.utc)
+
+def parse_recurrence(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a /schedule recurrence value to a stored rule.
+    Accepts "none", a preset name, an RRULE (with or without the "RRULE:" prefix)
+    or "cron:<expr>". Raises ValueError for anything that doesn't parse.
+    """
+    if not value or value.strip().lower() == "none":
+        return None
+    value = value.strip()
+    if value.lower() in PRESET_RULES:
+        return PRESET_RULES[value.lower()]
+    if value.lower().startswith("cron:"):
+        expr = value[5:].strip()
+        cron_trigger(expr)
+        return f"CRON:{expr}"
+
+    rule = value.upper()
+    if rule.startswith("RRULE:"):
+        rule = rule[6:]
+    if "FREQ=" not in rule:
+        raise ValueError(f"Unsupported recurrence: {value}")
+    rrulestr(rule, dtstart=datetime(2000, 1, 1))
+    return rule
+
+def rule_for_wish(wish) -> Optional[str]:
+    return wish.recurrence_rule or LEGACY_RULES.get(wish.is_recurring or 0)
+
+def is_recurring_code(rule: Optional[str]) -> int:
+    if not rule:
+        return 0
+    return IS_RECURRING_CODES.get(rule, 1)
+
+def _simple_rule(rule: str):
+    """Return (FREQ, INTERVAL) for plain FREQ[/INTERVAL] rules, else None."""
+    parts = dict(part.split("=", 1) for part in rule.split(";") if "=" in part)
+    if set(parts) - {"FREQ", "INTERVAL"} or parts.get("FREQ") not in SIMPLE_STEPS:
+        return None
+    return parts["FREQ"], int(parts.get("INTERVAL", 1))
+
+def next_occurrence(rule: str, anchor: datetime, after: datetime) -> Optional[datetime]:
+    """
+    First occurrence of `rule` strictly after `after`, for a series starting at `anchor`.
+    Plain FREQ/INTERVAL rules are computed in O(1) from the anchor, so month ends and
+    Feb 29 clamp per occurrence (Jan 31 -> Feb 28 -> Mar 31) instead of drifting.
+    """
+    if rule.startswith("CRON:"):
+        trigger = cron_trigger(rule[5:])
+        start = (after + timedelta(seconds=1)).replace(tzinfo=timezone.utc)
+        fire_time = trigger.get_next_fire_time(None, start)
+        return fire_time.astimezone(timezone.utc).replace(tzinfo=None) if fire_time else None
+
+    simple = _simple_rule(rule)
+    if simple:
+        freq, interval = simple
+        step = SIMPLE_STEPS[freq]
+        if after < anchor:
+            return anchor
+        if freq in ("DAILY", "WEEKLY"):
+            period = (step(interval) + after) - after
+            n = int((after - anchor) / period)
+        else:
+            months = (after.year - anchor.year) * 12 + (after.month - anchor.month)
+            n = months // (interval * (12 if freq == "YEARLY" else 1))
+        candidate = anchor + step(n * interval)
+        while candidate <= after:
+            n += 1
+            candidate = anchor + step(n * interval)
+        return candidate
+
+    return rrulestr(rule, dtstart=anchor).after(after)
+
+def next_local_occurrence(rule: str, anchor: datetime, after: datetime, tz_name: Optional[str] = None) -> Optional[datetime]:
+    """
+    next_occurrence() for naive UTC `anchor`/`after`, evaluated on the wish's local
+    wall clock so a 09:00 birthday stays at 09:00 local across DST changes.
+    """
+    if not tz_name or tz_name == "UTC":
+        return next_occurrence(rule, anchor, after)
+    local_next = next_occurrence(rule, to_local(anchor, tz_name), to_local(after, tz_name))
+    return to_utc(local_next, tz_name) if local_next else None
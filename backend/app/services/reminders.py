@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, User
+from app.services.email_service import send_reminder_digest_email
+from app.services.timezones import to_local
+
+def _timezones_at_digest_hour(db: Session, now: datetime) -> list:
+    """Distinct User.timezone values (as stored, None included) whose local hour is the digest hour."""
+    stored = [tz_name for (tz_name,) in db.query(User.timezone).distinct()]
+    return [tz_name for tz_name in stored if to_local(now, tz_name).hour == settings.REMINDER_DIGEST_HOUR]
+
+def _is_due(scheduled_time: datetime, days_before: int, tz_name: str, today_local) -> bool:
+    """The reminder date is `days_before` local days ahead of the delivery date."""
+    return to_local(scheduled_time, tz_name).date() - timedelta(days=days_before) <= today_local
+
+def send_reminder_digests(now: datetime = None) -> int:
+    """
+    Hourly job. For users whose local clock is at REMINDER_DIGEST_HOUR, collect every
+    pending wish whose reminder_days_before window has started, and send each user one
+    digest email. One joined query for the whole run and one bulk update afterwards,
+    so the cost follows the number of users being reminded, not the number of wishes.
+    """
+    now = now or datetime.utcnow()
+    db: Session = SessionLocal()
+    try:
+        zones = _timezones_at_digest_hour(db, now)
+        if not zones:
+            return 0
+        zone_filter = User.timezone.in_([z for z in zones if z is not None])
+        if None in zones:
+            zone_filter = zone_filter | User.timezone.is_(None)
+
+        rows = db.query(
+            ScheduledWish.id,
+            ScheduledWish.user_id,
+            ScheduledWish.recipient_name,
+            ScheduledWish.occasion,
+            ScheduledWish.event_name,
+            ScheduledWish.scheduled_time,
+            ScheduledWish.reminder_days_before,
+            ScheduledWish.status,
+            ScheduledWish.timezone.label("wish_timezone"),
+            User.email,
+            User.full_name,
+            User.timezone.label("user_timezone")
+        ).join(User, User.id == ScheduledWish.user_id).filter(
+            zone_filter,
+            ScheduledWish.status.in_(("pending", "awaiting_approval")),
+            ScheduledWish.reminder_days_before > 0,
+            ScheduledWish.reminder_sent_at.is_(None),
+            ScheduledWish.scheduled_time > now,
+            ScheduledWish.scheduled_time <= now + timedelta(days=settings.REMINDER_MAX_DAYS_BEFORE + 1)
+        ).order_by(ScheduledWish.user_id, ScheduledWish.scheduled_time).all()
+
+        digests = {}
+        for row in rows:
+            today_local = to_local(now, row.user_timezone).date()
+            if not _is_due(row.scheduled_time, row.reminder_days_before, row.user_timezone, today_local):
+                continue
+            digest = digests.setdefault(row.user_id, {"email": row.email, "full_name": row.full_name, "ids": [], "items": []})
+            digest["ids"].append(row.id)
+            digest["items"].append({
+                "recipient_name": row.recipient_name,
+                "occasion": row.occasion,
+                "event_name": row.event_name,
+                "local_time": to_local(row.scheduled_time, row.wish_timezone or row.user_timezone),
+                "needs_approval": row.status == "awaiting_approval"
+            })
+
+        sent = 0
+        sent_ids = []
+        for digest in digests.values():
+            if send_reminder_digest_email(digest["email"], digest["full_name"], digest["items"]):
+                sent += 1
+                sent_ids.extend(digest["ids"])
+
+        if sent_ids:
+            db.query(ScheduledWish).filter(ScheduledWish.id.in_(sent_ids)).update(
+                {ScheduledWish.reminder_sent_at: now}, synchronize_session=False
+            )
+            db.commit()
+        if digests:
+            print(f"Reminder digests: {sent} of {len(digests)} sent, covering {len(sent_ids)} wishes")
+        return sent
+    finally:
+        db.close()
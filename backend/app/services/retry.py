@@ -0,0 +1,22 @@
+import random
+import smtplib
+from datetime import timedelta
+from app.core.config import settings
+
+class GenerationError(Exception):
+    """The LLM returned an error message instead of a wish."""
+
+def backoff_delay(attempt: int) -> timedelta:
+    """Exponential backoff with +/-20% jitter: base, 2*base, 4*base ... capped at RETRY_MAX_DELAY_SECONDS."""
+    delay = min(settings.RETRY_MAX_DELAY_SECONDS, settings.RETRY_BASE_DELAY_SECONDS * (2 ** max(attempt - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def is_permanent_error(error: Exception) -> bool:
+    """Errors that will fail the same way on every attempt go straight to the dead-letter table."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    smtp_code = getattr(error, "smtp_code", None)
+    if isinstance(smtp_code, int) and 500 <= smtp_code < 600:
+        return True
+    return isinstance(error, (ValueError, KeyError))
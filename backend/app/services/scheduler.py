@@ -1,22 +1,136 @@
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.base import STATE_RUNNING
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.job import Job
+from apscheduler.util import datetime_to_utc_timestamp
+from sqlalchemy import select, func, or_
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.db.models import ScheduledWish, ActivityLog
-from app.services.llm import generate_wish_text
-from datetime import datetime, timedelta
+from app.db.database import SessionLocal, engine
+from app.db.models import ScheduledWish, ActivityLog, DeadLetterWish
+from app.services.llm import generate_wish_text, is_generation_error
+from datetime import datetime, timedelta, timezone
+from collections import deque
 import asyncio
+import json
+import pickle
+import random
+import time
+import uuid
 
-scheduler = BackgroundScheduler(job_defaults={'misfire_grace_time': 15*60})
+# Wish jobs live in the database so they survive deploys and crashes.
+# Housekeeping jobs go to the "memory" store and are re-registered on every start.
+wish_jobstore = SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")
+
+scheduler = BackgroundScheduler(
+    jobstores={'default': wish_jobstore, 'memory': MemoryJobStore()},
+    job_defaults={'misfire_grace_time': 15*60},
+    timezone=timezone.utc # run_date values are naive UTC, like scheduled_time
+)
+
+def job_id_for_wish(wish_id: int) -> str:
+    return f"wish_{wish_id}"
+
+# Recent scheduled-vs-actual lag samples in seconds
+DISPATCH_LAG_HISTORY = deque(maxlen=500)
+
+def spread_dispatch_time(scheduled_time: datetime, auto_send: int = 1) -> datetime:
+    """
+    Planned run time for a wish. With DISPATCH_SPREAD_WINDOW_SECONDS set, auto_send
+    wishes get a random offset inside the window so round-time bursts (00:00, 09:00)
+    are spread out instead of all firing in the same second.
+    """
+    window = settings.DISPATCH_SPREAD_WINDOW_SECONDS
+    if not window or not auto_send or scheduled_time is None:
+        return scheduled_time
+    return scheduled_time + timedelta(seconds=random.uniform(0, window))
+
+def enqueue_wish(wish_id: int, run_date):
+    """Queue a pending wish for delivery at run_date according to SCHEDULER_MODE."""
+    if settings.SCHEDULER_MODE == "dispatcher":
+        # The pending row is the queue entry; the dispatcher claims it once due
+        return
+    if not scheduler.running:
+        # Before start() replace_existing only applies at start; drop the queued copy now
+        remove_wish_job(wish_id)
+    scheduler.add_job(
+        process_scheduled_wish,
+        'date',
+        run_date=run_date,
+        args=[wish_id],
+        id=job_id_for_wish(wish_id),
+        replace_existing=True
+    )
+
+def _wish_job(wish_id: int, run_date) -> Job:
+    """The Job scheduler.add_job() would build for enqueue_wish(wish_id, run_date)."""
+    trigger = DateTrigger(run_date=run_date, timezone=scheduler.timezone)
+    return Job(
+        scheduler,
+        id=job_id_for_wish(wish_id),
+        func=process_scheduled_wish,
+        trigger=trigger,
+        executor="default",
+        args=(wish_id,),
+        kwargs={},
+        name=None,
+        next_run_time=trigger.get_next_fire_time(None, datetime.now(scheduler.timezone)),
+        **scheduler._job_defaults
+    )
+
+def enqueue_wishes(items):
+    """
+    Queue many (wish_id, run_date) pairs. In dispatcher mode the pending rows are
+    already the queue, so this costs nothing; in jobs mode a started scheduler gets
+    all the jobs written to the jobstore table in one transaction (replacing any
+    existing copies) instead of one add_job() round trip per wish.
+    """
+    if settings.SCHEDULER_MODE == "dispatcher" or not items:
+        return
+    if not scheduler.running:
+        # Before start() jobs are only queued in memory and written by start() itself
+        for wish_id, run_date in items:
+            enqueue_wish(wish_id, run_date)
+        return
+    jobs = [_wish_job(wish_id, run_date) for wish_id, run_date in items]
+    table = wish_jobstore.jobs_t
+    with engine.begin() as conn:
+        table.create(conn, checkfirst=True)
+        conn.execute(table.delete().where(table.c.id.in_([job.id for job in jobs])))
+        conn.execute(table.insert(), [
+            {
+                "id": job.id,
+                "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+                "job_state": pickle.dumps(job.__getstate__(), wish_jobstore.pickle_protocol)
+            }
+            for job in jobs
+        ])
+    scheduler.wakeup() # Re-read the jobstore so the new jobs aren't missed
+
+def remove_wish_job(wish_id: int):
+    """Drop the APScheduler job for a wish, if it has one."""
+    try:
+        scheduler.remove_job(job_id_for_wish(wish_id))
+    except JobLookupError:
+        pass
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings
 from app.services.email_templates import create_email_message
-from app.services.email_templates import create_email_message
-# from app.services.telegram_service import send_telegram_message
-# from app.services.whatsapp_service import send_whatsapp_message
+from app.services.wish_engine import WishEngine
+from app.services.smtp_pool import smtp_pool
+from app.services.rate_limiter import outbound_limiter, is_throttle_error
+from app.services.recurrence import rule_for_wish, next_local_occurrence
+from app.services.retry import GenerationError, backoff_delay, is_permanent_error
+from app.services.metrics import pipeline_metrics
+from app.services.leader import LeaderElector, WORKER_ID
+from app.services.telegram_service import send_telegram_message
+from app.services.whatsapp_service import send_whatsapp_message
+from app.services.channels import channels_for_wish
 
 def send_email(to_email: str, subject: str, body: str):
     if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
@@ -33,55 +147,58 @@ def send_email(to_email: str, subject: str, body: str):
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
 
-        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        smtp_pool.send_message(msg)
         print(f"Email sent to {to_email}")
     except Exception as e:
         print(f"Failed to send email: {e}")
 
-def process_scheduled_wish(wish_id: int):
-    db: Session = SessionLocal()
-    wish = None # Initialize wish to None
-    try:
-        wish = db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
-        if not wish or wish.status != "pending":
-            return
+class WishPrompt:
+    """Adapts a ScheduledWish to the request shape expected by generate_wish_text."""
+    def __init__(self, occasion, recipient_name, tone, extra_details, length="short"):
+        self.occasion = occasion
+        self.recipient_name = recipient_name
+        self.tone = tone
+        self.extra_details = extra_details
+        self.length = length
 
-        print(f"Processing scheduled wish for {wish.recipient_name}...")
-        
-        # Create a mock request object for the generator
-        class MockRequest:
-            def __init__(self, occasion, recipient_name, tone, extra_details, length="short"):
-                self.occasion = occasion
-                self.recipient_name = recipient_name
-                self.tone = tone
-                self.extra_details = extra_details
-                self.length = length
-
-        req = MockRequest(wish.occasion, wish.recipient_name, wish.tone, wish.extra_details)
-        
-        # Run async generation in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        generated_text = loop.run_until_complete(generate_wish_text(req))
-        loop.close()
-
-        wish.generated_wish = generated_text
-        wish.status = "sent"
-        
-        
-        # Route based on platform
-        # if wish.platform == "telegram" and wish.telegram_chat_id:
-        #     send_telegram_message(wish.telegram_chat_id, generated_text)
-            
-        # elif wish.platform == "whatsapp" and wish.phone_number:
-        #     send_whatsapp_message(wish.phone_number, generated_text)
-            
-        if wish.platform == "email" and wish.recipient_email:
-            # Generate the email message (HTML + Image)
+def new_claim_token() -> str:
+    return f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+
+def _claim_pending_wish(db: Session, wish_id: int, token: str, expected_claim: str = None):
+    """
+    Atomically claim a pending wish for this run and load it; None if it isn't pending
+    or another run holds a live claim. Every path (APScheduler job, dispatcher, catch-up)
+    goes through this, so a job that fired late and a sweep that picked up the same row
+    can't both send it. `expected_claim` is the batch token a dispatcher/sweep claimed it under.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.DISPATCH_CLAIM_TIMEOUT_SECONDS)
+    claim_filters = [ScheduledWish.claimed_by.is_(None), ScheduledWish.claimed_at < stale_before]
+    if expected_claim:
+        claim_filters.append(ScheduledWish.claimed_by == expected_claim)
+    claimed = db.query(ScheduledWish).filter(
+        ScheduledWish.id == wish_id,
+        ScheduledWish.status == "pending",
+        or_(*claim_filters)
+    ).update({ScheduledWish.claimed_by: token, ScheduledWish.claimed_at: now}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+
+def _deliver_wish(wish: ScheduledWish, generated_text: str, channel: str = "email"):
+    # Blocking send on one channel; callers hold the channel's rate-limit slot
+    if channel == "telegram":
+        with pipeline_metrics.timer("telegram"):
+            send_telegram_message(wish.telegram_chat_id, generated_text, rate_limited=True)
+
+    elif channel == "whatsapp":
+        with pipeline_metrics.timer("whatsapp"):
+            send_whatsapp_message(wish.phone_number, generated_text, rate_limited=True)
+
+    elif channel == "email" and wish.recipient_email:
+        # Generate the email message (HTML + Image)
+        with pipeline_metrics.timer("render"):
             msg = create_email_message(
                 to_email=wish.recipient_email,
                 occasion=wish.occasion,
@@ -90,99 +207,597 @@ def process_scheduled_wish(wish_id: int):
                 sender_email=settings.SMTP_USER
             )
 
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(msg)
-            
+        with pipeline_metrics.timer("smtp"):
+            smtp_pool.send_message(msg)
+
+def _checkpoint_wish(db: Session, wish: ScheduledWish, **fields):
+    for name, value in fields.items():
+        setattr(wish, name, value)
+    db.commit()
+
+def _complete_wish(db: Session, wish: ScheduledWish, generated_text: str):
+    wish.generated_wish = generated_text
+    wish.status = "sent"
+    db.commit()
+    
+    # Log Success Activity
+    try:
+        log = ActivityLog(
+            user_id=wish.user_id,
+            action="wish_sent",
+            details=f"Sent {wish.occasion} wish to {wish.recipient_name}",
+            created_at=datetime.utcnow()
+        )
+        db.add(log)
         db.commit()
-        
+    except Exception as log_err:
+        print(f"Failed to log success activity: {log_err}")
+
+    print(f"SUCCESS: Wish generated and 'sent' to {wish.recipient_name}: \n{generated_text}")
+
+    # --- Recurrence: only the next occurrence is materialized ---
+    _schedule_next_occurrence(db, wish)
+
+def _schedule_next_occurrence(db: Session, wish: ScheduledWish):
+    """
+    Record when the series continues. The next row itself is only created once it
+    falls inside RECURRENCE_HORIZON_DAYS, either right away or by the periodic
+    materializer, so yearly series don't hold a pending row for a whole year.
+    """
+    rule = rule_for_wish(wish)
+    if not rule or not wish.scheduled_time or wish.next_occurrence_at:
+        return
+    try:
+        anchor = wish.recurrence_anchor or wish.scheduled_time
+        next_date = next_local_occurrence(rule, anchor, wish.scheduled_time, wish.timezone)
+        if not next_date:
+            return
+        # A requeued dead letter may already have continued its series
+        already_created = db.query(ScheduledWish.id).filter(
+            ScheduledWish.user_id == wish.user_id,
+            ScheduledWish.recurrence_anchor == anchor,
+            ScheduledWish.scheduled_time == next_date
+        ).first()
+        if already_created:
+            return
+        wish.next_occurrence_at = next_date
         db.commit()
-        
-        # Log Success Activity
-        try:
-            log = ActivityLog(
-                user_id=wish.user_id,
-                action="wish_sent",
-                details=f"Sent {wish.occasion} wish to {wish.recipient_name}",
-                created_at=datetime.utcnow()
-            )
-            db.add(log)
-            db.commit()
-        except Exception as log_err:
-            print(f"Failed to log success activity: {log_err}")
+        print(f"Recurrence: next occurrence of wish {wish.id} on {next_date}")
+
+        if next_date <= datetime.utcnow() + timedelta(days=settings.RECURRENCE_HORIZON_DAYS):
+            _materialize_next_occurrence(db, wish)
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to schedule recurring wish: {e}")
+
+def continue_series(db: Session, wish: ScheduledWish):
+    """For a recurring wish that ended without being sent (e.g. rejected): schedule the next occurrence."""
+    _schedule_next_occurrence(db, wish)
+
+def _materialize_next_occurrence(db: Session, parent: ScheduledWish):
+    next_date = parent.next_occurrence_at
+    # Hand the series over atomically so concurrent materializers create it only once
+    claimed = db.query(ScheduledWish).filter(
+        ScheduledWish.id == parent.id,
+        ScheduledWish.next_occurrence_at.isnot(None)
+    ).update({ScheduledWish.next_occurrence_at: None}, synchronize_session=False)
+    if claimed != 1:
+        db.rollback()
+        return None
 
-        print(f"SUCCESS: Wish generated and 'sent' to {wish.recipient_name}: \n{generated_text}")
+    new_wish = ScheduledWish(
+        recipient_name=parent.recipient_name,
+        recipient_email=parent.recipient_email,
+        occasion=parent.occasion,
+        tone=parent.tone,
+        extra_details=parent.extra_details,
+        scheduled_time=next_date,
+        dispatch_at=spread_dispatch_time(next_date, parent.auto_send),
+        status="pending" if parent.auto_send != 0 else "awaiting_approval",
+        platform=parent.platform,
+        phone_number=parent.phone_number,
+        telegram_chat_id=parent.telegram_chat_id,
+        is_recurring=parent.is_recurring,
+        recurrence_rule=rule_for_wish(parent),
+        recurrence_anchor=parent.recurrence_anchor or parent.scheduled_time,
+        timezone=parent.timezone,
+        event_name=parent.event_name,
+        event_type=parent.event_type,
+        reminder_days_before=parent.reminder_days_before,
+        auto_send=parent.auto_send,
+        media_url=parent.media_url,
+        template_id=parent.template_id,
+        user_id=parent.user_id
+    )
+    db.add(new_wish)
+    db.commit()
+    db.refresh(new_wish)
 
-        # --- Recursion Logic ---
-        # --- Recursion Logic ---
-        # 0=None, 1=Daily, 2=Weekly, 3=Monthly, 4=Yearly
-        if wish.is_recurring and wish.is_recurring > 0:
+    if new_wish.status == "pending":
+        enqueue_wish(new_wish.id, new_wish.dispatch_at)
+    print(f"Created recurring wish ID: {new_wish.id}")
+    return new_wish
+
+def materialize_upcoming_occurrences() -> int:
+    """Periodic job: create the next occurrence for every series that has entered the horizon."""
+    horizon = datetime.utcnow() + timedelta(days=settings.RECURRENCE_HORIZON_DAYS)
+    db: Session = SessionLocal()
+    created = 0
+    try:
+        parents = db.query(ScheduledWish).filter(
+            ScheduledWish.next_occurrence_at.isnot(None),
+            ScheduledWish.next_occurrence_at <= horizon
+        ).all()
+        for parent in parents:
             try:
-                from dateutil.relativedelta import relativedelta
-                original_date = wish.scheduled_time
-                next_date = None
-
-                if wish.is_recurring == 1: # Daily
-                    next_date = original_date + timedelta(days=1)
-                elif wish.is_recurring == 2: # Weekly
-                    next_date = original_date + timedelta(weeks=1)
-                elif wish.is_recurring == 3: # Monthly
-                    next_date = original_date + relativedelta(months=1)
-                elif wish.is_recurring == 4: # Yearly
-                    next_date = original_date + relativedelta(years=1)
-
-                if next_date:
-                    print(f"Recursion: Scheduling next wish for {next_date}")
-                    
-                    new_wish = ScheduledWish(
-                        recipient_name=wish.recipient_name,
-                        recipient_email=wish.recipient_email,
-                        occasion=wish.occasion,
-                        tone=wish.tone,
-                        extra_details=wish.extra_details,
-                        scheduled_time=next_date,
-                        status="pending",
-                        platform=wish.platform,
-                        phone_number=wish.phone_number,
-                        telegram_chat_id=wish.telegram_chat_id,
-                        is_recurring=wish.is_recurring, # Keep recursing
-                        user_id=wish.user_id
-                    )
-                    db.add(new_wish)
-                    db.commit()
-                    db.refresh(new_wish)
-                    
-                    scheduler.add_job(
-                        process_scheduled_wish, 
-                        'date', 
-                        run_date=next_date, 
-                        args=[new_wish.id]
-                    )
-                    print(f"Created recurring wish ID: {new_wish.id}")
+                if _materialize_next_occurrence(db, parent):
+                    created += 1
             except Exception as e:
-                print(f"Failed to schedule recurring wish: {e}")
-        # -----------------------
+                db.rollback()
+                print(f"Failed to materialize occurrence after wish {parent.id}: {e}")
+    finally:
+        db.close()
+    if created:
+        print(f"Materialized {created} recurring wishes")
+    return created
 
+def _release_wish(wish_id: int, token: str):
+    """Make an interrupted wish due again right away (fresh session: the pipeline's may be mid-commit)."""
+    db: Session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        released = db.query(ScheduledWish).filter(
+            ScheduledWish.id == wish_id,
+            ScheduledWish.status == "pending",
+            ScheduledWish.claimed_by == token
+        ).update({ScheduledWish.claimed_by: None, ScheduledWish.dispatch_at: now}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    if released:
+        enqueue_wish(wish_id, now)
+
+def _fail_wish(db: Session, wish: ScheduledWish, error: Exception):
+    """
+    Transient failures are retried with exponential backoff by re-queueing the row
+    (no worker thread sleeps). Permanent failures, or running out of attempts,
+    mark the wish failed and record it in the dead-letter table.
+    """
+    dispatched_at = wish.dispatched_at
+    db.rollback()
+    wish.dispatched_at = dispatched_at
+    wish.attempts = (wish.attempts or 0) + 1
+    wish.last_error = str(error)[:1000]
+    wish.claimed_by = None
+
+    if not is_permanent_error(error) and wish.attempts < settings.RETRY_MAX_ATTEMPTS:
+        retry_at = datetime.utcnow() + backoff_delay(wish.attempts)
+        wish.status = "pending"
+        wish.dispatch_at = retry_at
+        db.commit()
+        enqueue_wish(wish.id, retry_at)
+        print(f"Retrying wish {wish.id} at {retry_at} (attempt {wish.attempts} of {settings.RETRY_MAX_ATTEMPTS})")
+        return
+
+    wish.status = "failed"
+    db.add(DeadLetterWish(
+        wish_id=wish.id,
+        user_id=wish.user_id,
+        attempts=wish.attempts,
+        last_error=wish.last_error,
+        failed_at=datetime.utcnow()
+    ))
+    # Log Failure Activity
+    try:
+        log = ActivityLog(
+            user_id=wish.user_id,
+            action="wish_failed",
+            details=f"Failed to send wish to {wish.recipient_name}: {str(error)[:100]}",
+            created_at=datetime.utcnow()
+        )
+        db.add(log)
+    except Exception:
+        pass
+    db.commit()
+
+    # A failed occurrence must not end the series
+    _schedule_next_occurrence(db, wish)
+
+def retire_wish(db: Session, wish: ScheduledWish, status: str, reason: str):
+    """Close a pending wish without sending it ("skipped" or "expired"); its series carries on."""
+    wish.status = status
+    wish.claimed_by = None
+    if status == "expired":
+        db.add(ActivityLog(
+            user_id=wish.user_id,
+            action="wish_expired",
+            details=f"Wish to {wish.recipient_name} expired: {reason}",
+            created_at=datetime.utcnow()
+        ))
+    db.commit()
+    remove_wish_job(wish.id)
+    _schedule_next_occurrence(db, wish)
+
+async def _deliver_rate_limited(wish: ScheduledWish, generated_text: str, channel: str = None):
+    """
+    Wait for a send slot on the channel, then deliver. Provider throttling
+    responses pause the channel and retry instead of failing the wish.
+    """
+    channel = channel or wish.platform
+    for attempt in range(settings.RATE_LIMIT_MAX_THROTTLE_RETRIES + 1):
+        await outbound_limiter.acquire(channel, sender=wish.user_id)
+        try:
+            await asyncio.to_thread(_deliver_wish, wish, generated_text, channel)
+            return
+        except Exception as e:
+            if not is_throttle_error(e) or attempt == settings.RATE_LIMIT_MAX_THROTTLE_RETRIES:
+                raise
+            print(f"{channel} provider throttled wish {wish.id}, backing off: {e}")
+            outbound_limiter.throttled(channel)
+
+async def _fan_out(db: Session, wish: ScheduledWish, generated_text: str):
+    """
+    Deliver to every channel of the wish concurrently, each through its own sender and
+    rate limit. Results are checkpointed per channel, so a retry only resends the
+    channels that failed. Raises the first failure once every channel has finished.
+    """
+    results = json.loads(wish.delivery_results or "{}")
+    channels = [c for c in channels_for_wish(wish) if results.get(c, {}).get("status") != "sent"]
+    outcomes = await asyncio.gather(
+        *(_deliver_rate_limited(wish, generated_text, channel) for channel in channels),
+        return_exceptions=True
+    )
+
+    failures = []
+    for channel, outcome in zip(channels, outcomes):
+        if isinstance(outcome, BaseException):
+            failures.append(outcome)
+            results[channel] = {"status": "failed", "error": str(outcome)[:500], "at": datetime.utcnow().isoformat()}
+        else:
+            results[channel] = {"status": "sent", "at": datetime.utcnow().isoformat()}
+
+    fields = {"delivery_results": json.dumps(results)} if channels else {}
+    if not failures:
+        fields["delivered_at"] = datetime.utcnow()
+    await asyncio.to_thread(_checkpoint_wish, db, wish, **fields)
+    if failures:
+        # Retry on a transient failure even if another channel failed permanently
+        raise next((e for e in failures if not is_permanent_error(e)), failures[0])
+
+async def process_wish_async(wish_id: int, expected_claim: str = None):
+    """
+    Wish pipeline: claim + load -> LLM generation (unless pre-generated) -> render + deliver -> persist.
+    Runs on the wish engine loop; blocking stages are pushed to its thread pool
+    so many wishes can await the LLM concurrently.
+    """
+    # Commits happen on worker threads; without expiry, attribute reads back on the
+    # loop thread don't turn into blocking SELECTs that stall every other wish
+    db: Session = SessionLocal(expire_on_commit=False)
+    wish = None
+    token = new_claim_token()
+    started = time.perf_counter()
+    try:
+        wish = await asyncio.to_thread(_claim_pending_wish, db, wish_id, token, expected_claim)
+        if not wish:
+            return
+
+        print(f"Processing scheduled wish for {wish.recipient_name}...")
+        wish.dispatched_at = datetime.utcnow()
+        if wish.scheduled_time:
+            lag = (wish.dispatched_at - wish.scheduled_time).total_seconds()
+            DISPATCH_LAG_HISTORY.append(lag)
+            pipeline_metrics.observe("dispatch_lag", lag)
+
+        if wish.generated_wish:
+            # Pre-generated at /schedule time, by the pre-generation stage or by an earlier attempt
+            generated_text = wish.generated_wish
+        else:
+            req = WishPrompt(wish.occasion, wish.recipient_name, wish.tone, wish.extra_details)
+            with pipeline_metrics.timer("llm"):
+                generated_text = await generate_wish_text(req)
+            if is_generation_error(generated_text):
+                raise GenerationError(generated_text)
+            # Checkpoint so a retry reuses this text instead of generating a new one
+            await asyncio.to_thread(_checkpoint_wish, db, wish, generated_wish=generated_text)
+
+        if wish.delivered_at:
+            print(f"Wish {wish_id} was already delivered on a previous attempt, skipping send")
+        else:
+            delivery = asyncio.ensure_future(_fan_out(db, wish, generated_text))
+            try:
+                await asyncio.shield(delivery)
+            except asyncio.CancelledError:
+                # Drain deadline hit mid-send: finish the send rather than risk repeating it later
+                await delivery
+        await asyncio.to_thread(_complete_wish, db, wish, generated_text)
+        pipeline_metrics.observe("total", time.perf_counter() - started)
+
+    except asyncio.CancelledError:
+        # Shutdown drain: generated text is already checkpointed; hand the wish back
+        print(f"Wish {wish_id} interrupted by shutdown, releasing it for the next worker")
+        if wish:
+            await asyncio.to_thread(_release_wish, wish_id, token)
+        raise
     except Exception as e:
         print(f"FAILED to process wish {wish_id}: {e}")
         if wish:
-            wish.status = "failed"
-            # Log Failure Activity
-            try:
-                log = ActivityLog(
-                    user_id=wish.user_id,
-                    action="wish_failed",
-                    details=f"Failed to send wish to {wish.recipient_name}: {str(e)[:100]}",
-                    created_at=datetime.utcnow()
-                )
-                db.add(log)
-            except Exception:
-                pass
-            db.commit()
+            await asyncio.to_thread(_fail_wish, db, wish, e)
     finally:
         db.close()
 
+wish_engine = WishEngine(
+    process_wish_async,
+    concurrency=settings.WISH_ENGINE_CONCURRENCY,
+    max_pending=settings.WISH_ENGINE_MAX_PENDING
+)
+
+def process_scheduled_wish(wish_id: int):
+    """
+    APScheduler entry point: hand the wish to the engine. Returns immediately unless
+    the engine is at its admission cap, in which case this worker thread waits.
+    """
+    return wish_engine.submit(wish_id)
+
+def _pending_wish_run_times():
+    db: Session = SessionLocal()
+    try:
+        return db.query(ScheduledWish.id, func.coalesce(ScheduledWish.dispatch_at, ScheduledWish.scheduled_time)).filter(
+            ScheduledWish.status == "pending",
+            ScheduledWish.scheduled_time.isnot(None)
+        ).all()
+    finally:
+        db.close()
+
+def _stored_wish_job_ids() -> set:
+    with engine.connect() as conn:
+        wish_jobstore.jobs_t.create(conn, checkfirst=True)
+        conn.commit()
+        stored_ids = set(conn.execute(select(wish_jobstore.jobs_t.c.id)).scalars())
+    if not scheduler.running:
+        # Jobs added before start() are still queued in memory
+        stored_ids.update(job.id for job in scheduler.get_jobs())
+    return {job_id for job_id in stored_ids if job_id.startswith("wish_")}
+
+def _add_missing_jobs(pending, stored_ids: set) -> int:
+    cutoff = None
+    if settings.CATCHUP_ENABLED:
+        # Long-overdue wishes are drained by the catch-up sweeper instead of firing in one burst
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.CATCHUP_OVERDUE_AFTER_SECONDS)
+    missing = [
+        (wish_id, run_date) for wish_id, run_date in pending
+        if job_id_for_wish(wish_id) not in stored_ids and (cutoff is None or run_date > cutoff)
+    ]
+    for wish_id, run_date in missing:
+        enqueue_wish(wish_id, run_date)
+    return len(missing)
+
+def rehydrate_pending_wishes():
+    """
+    Re-register jobs for pending wishes that are missing from the job store.
+    Uses one query for pending rows and one for stored job ids, so boot cost
+    scales with the number of missing jobs rather than all pending wishes.
+    """
+    stored_ids = _stored_wish_job_ids()
+    pending = _pending_wish_run_times()
+    added = _add_missing_jobs(pending, stored_ids)
+    print(f"Rehydrated {added} of {len(pending)} pending wishes")
+    return added
+
+def reconcile_wish_jobs() -> dict:
+    """
+    Diff wish jobs against pending rows: cancel jobs whose wish was deleted or is no
+    longer pending (they would only wake up to find nothing to do) and re-add jobs
+    missing for pending wishes. One query each for rows and job ids.
+    """
+    if settings.SCHEDULER_MODE == "dispatcher":
+        return {"orphans_removed": 0, "missing_added": 0, "jobs": 0} # No per-wish jobs
+
+    # Job ids first: a wish scheduled between the two reads then shows up as pending
+    # rather than as a job with no row, which would be deleted as an orphan
+    stored_ids = _stored_wish_job_ids()
+    pending = _pending_wish_run_times()
+    live_ids = {job_id_for_wish(wish_id) for wish_id, _ in pending}
+    orphans = stored_ids - live_ids
+
+    if orphans:
+        # Bulk delete from the jobstore table; also works while the scheduler is stopped
+        with engine.connect() as conn:
+            conn.execute(wish_jobstore.jobs_t.delete().where(wish_jobstore.jobs_t.c.id.in_(orphans)))
+            conn.commit()
+        if not scheduler.running:
+            for job_id in orphans:
+                try:
+                    scheduler.remove_job(job_id)
+                except JobLookupError:
+                    pass
+
+    added = _add_missing_jobs(pending, stored_ids)
+    result = {"orphans_removed": len(orphans), "missing_added": added, "jobs": len(stored_ids) - len(orphans) + added}
+    if orphans or added:
+        print(f"Reconciled wish jobs: {result}")
+    return result
+
+def start_dispatcher():
+    """Replace per-wish jobs with a single polling job that claims due rows in batches."""
+    from app.services.dispatcher import dispatch_due_wishes
+
+    # Per-wish jobs left over from "jobs" mode would race the dispatcher.
+    # The rows remain the source of truth, so dropping them loses nothing.
+    with engine.connect() as conn:
+        wish_jobstore.jobs_t.create(conn, checkfirst=True)
+        conn.execute(wish_jobstore.jobs_t.delete())
+        conn.commit()
+
+    scheduler.add_job(
+        dispatch_due_wishes,
+        'interval',
+        seconds=settings.DISPATCH_INTERVAL_SECONDS,
+        id="wish_dispatcher",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def start_pregenerator():
+    from app.services.pregeneration import pregenerate_upcoming_wishes
+
+    scheduler.add_job(
+        pregenerate_upcoming_wishes,
+        'interval',
+        minutes=settings.PREGENERATE_INTERVAL_MINUTES,
+        next_run_time=datetime.now(timezone.utc),
+        id="wish_pregenerator",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def start_catchup_sweeper():
+    from app.services.catchup import sweep_overdue_wishes
+
+    scheduler.add_job(
+        sweep_overdue_wishes,
+        'interval',
+        minutes=settings.CATCHUP_INTERVAL_MINUTES,
+        next_run_time=datetime.now(timezone.utc), # Also runs as soon as the scheduler (or a new leader) starts
+        id="catchup_sweeper",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def start_reconciler():
+    scheduler.add_job(
+        reconcile_wish_jobs,
+        'interval',
+        minutes=settings.RECONCILE_INTERVAL_MINUTES,
+        id="job_reconciler",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def start_reminder_digests():
+    from app.services.reminders import send_reminder_digests
+
+    scheduler.add_job(
+        send_reminder_digests,
+        'cron',
+        minute=0, # Hourly; each run covers the timezones at REMINDER_DIGEST_HOUR
+        id="reminder_digest",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def start_materializer():
+    scheduler.add_job(
+        materialize_upcoming_occurrences,
+        'interval',
+        minutes=settings.RECURRENCE_MATERIALIZE_INTERVAL_MINUTES,
+        next_run_time=datetime.now(timezone.utc),
+        id="recurrence_materializer",
+        jobstore="memory",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def _on_elected():
+    if settings.SCHEDULER_MODE != "dispatcher":
+        try:
+            # Jobs may have been missed while no process was leader
+            rehydrate_pending_wishes()
+        except Exception as e:
+            print(f"Warning: Failed to rehydrate wish jobs: {e}")
+    scheduler.resume()
+
+def _on_renewed():
+    # Followers write jobs straight to the shared jobstore; wake up so the leader sees them
+    scheduler.wakeup()
+
+leader_elector = LeaderElector(
+    "scheduler",
+    lease_seconds=settings.LEADER_LEASE_SECONDS,
+    renew_interval=settings.LEADER_RENEW_INTERVAL_SECONDS,
+    on_elected=_on_elected,
+    on_demoted=scheduler.pause,
+    on_renewed=_on_renewed
+)
+
 def start_scheduler():
-    scheduler.start()
-    print("Scheduler started...")
+    """
+    Start the scheduler in this process. With LEADER_ELECTION_ENABLED every worker
+    starts it paused, so add_job() still persists wish jobs to the shared jobstore,
+    and only the worker holding the lease resumes it and actually runs jobs.
+    """
+    try:
+        start_materializer()
+    except Exception as e:
+        print(f"Warning: Failed to start recurrence materializer: {e}")
+    try:
+        if settings.REMINDER_DIGEST_ENABLED:
+            start_reminder_digests()
+    except Exception as e:
+        print(f"Warning: Failed to start reminder digests: {e}")
+    try:
+        if settings.CATCHUP_ENABLED:
+            start_catchup_sweeper()
+    except Exception as e:
+        print(f"Warning: Failed to start catch-up sweeper: {e}")
+    try:
+        if settings.PREGENERATE_ENABLED:
+            start_pregenerator()
+    except Exception as e:
+        print(f"Warning: Failed to start pre-generation: {e}")
+    try:
+        if settings.SCHEDULER_MODE == "dispatcher":
+            start_dispatcher()
+        else:
+            start_reconciler()
+            if not settings.LEADER_ELECTION_ENABLED:
+                rehydrate_pending_wishes()
+    except Exception as e:
+        print(f"Warning: Failed to prepare scheduler jobs: {e}")
+
+    if settings.LEADER_ELECTION_ENABLED:
+        scheduler.start(paused=True)
+        leader_elector.start()
+        print(f"Scheduler started ({'leader' if leader_elector.is_leader else 'follower'})...")
+    else:
+        scheduler.start()
+        print("Scheduler started...")
+
+def start_scheduler_client():
+    """
+    For processes that only enqueue wishes (the API with SCHEDULER_ENABLED off).
+    In jobs mode the scheduler is started paused so add_job() persists to the shared
+    jobstore; it never runs jobs or takes part in leader election.
+    """
+    if settings.SCHEDULER_MODE != "dispatcher":
+        scheduler.start(paused=True)
+    print("Scheduler disabled in this process; wishes are delivered by the worker")
+
+def drain_and_stop(timeout: float = None) -> dict:
+    """
+    Shutdown for rolling deploys: pause the scheduler so no job fires and the dispatcher
+    claims nothing new, give in-flight wishes `timeout` seconds (SHUTDOWN_DRAIN_SECONDS)
+    to finish, cancel the rest (they keep their generated text and are released for
+    the next worker), then release leadership and stop the scheduler.
+    """
+    if scheduler.state == STATE_RUNNING:
+        scheduler.pause()
+    result = wish_engine.drain(settings.SHUTDOWN_DRAIN_SECONDS if timeout is None else timeout)
+    # The drain already bounded the wait for in-flight work; don't block again on job threads
+    stop_scheduler(wait=False)
+    return result
+
+def stop_scheduler(wait: bool = True):
+    leader_elector.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=wait)
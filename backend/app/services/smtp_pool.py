@@ -0,0 +1,155 @@
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.core.config import settings
+
+class PooledSMTPConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between messages so the
+    connect + STARTTLS + login handshake is paid once per connection rather
+    than once per email.
+
+    - At most `max_size` connections exist at a time; callers block for a free one.
+    - Connections idle longer than `idle_timeout` are closed instead of reused.
+    - Connections idle longer than `healthcheck_after` are probed with NOOP before reuse.
+    - A connection is retired after `max_messages` sends (many providers cap this).
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 use_tls: bool = True, max_size: int = 5, idle_timeout: float = 60,
+                 healthcheck_after: float = 10, max_messages: int = 100, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.healthcheck_after = healthcheck_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+        # Metrics
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.messages_sent = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+            max_size=settings.SMTP_POOL_SIZE,
+            idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+            healthcheck_after=settings.SMTP_POOL_HEALTHCHECK_AFTER_SECONDS,
+            max_messages=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION
+        )
+
+    def _connect(self) -> PooledSMTPConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connections_opened += 1
+        return PooledSMTPConnection(server)
+
+    def _is_reusable(self, conn: PooledSMTPConnection) -> bool:
+        idle_for = time.time() - conn.last_used
+        if idle_for > self.idle_timeout or conn.messages_sent >= self.max_messages:
+            return False
+        if idle_for > self.healthcheck_after:
+            try:
+                return conn.server.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _checkout(self) -> PooledSMTPConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_reusable(conn):
+                self.connections_reused += 1
+                return conn
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool unless the block raised."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.last_used = time.time()
+            with self._lock:
+                self._idle.append(conn)
+        except Exception:
+            if conn:
+                conn.close()
+            raise
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg):
+        # A pooled connection may have been dropped by the server since its last use;
+        # retry once on a fresh connection in that case.
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    conn.server.send_message(msg)
+                    conn.messages_sent += 1
+                    self.messages_sent += 1
+                    return
+            except smtplib.SMTPServerDisconnected:
+                if attempt == 1:
+                    raise
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "idle_connections": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "messages_sent": self.messages_sent
+        }
+
+smtp_pool = SMTPConnectionPool.from_settings()
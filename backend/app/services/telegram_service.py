@@ -1,9 +1,15 @@
-
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from app.core.config import settings
+from app.services.rate_limiter import outbound_limiter
+
+# One pooled session for the process; sends from the engine's threads reuse its keep-alive connections
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=settings.WISH_ENGINE_CONCURRENCY))
 
-def send_telegram_message(chat_id: str, text: str):
+def send_telegram_message(chat_id: str, text: str, rate_limited: bool = False):
+    """Send a Telegram message. Pass rate_limited=True when the caller already holds a send slot."""
     token = settings.TELEGRAM_BOT_TOKEN
     if not token:
         # Mock/Debug mode
@@ -16,7 +22,10 @@ def send_telegram_message(chat_id: str, text: str):
         "text": text
     }
     try:
-        response = requests.post(url, json=payload)
+        if not rate_limited:
+            # Telegram also limits messages per chat, so the chat is the sender key
+            outbound_limiter.acquire_sync("telegram", sender=chat_id)
+        response = _session.post(url, json=payload, timeout=settings.TELEGRAM_TIMEOUT_SECONDS)
         response.raise_for_status()
         print(f"Telegram sent to {chat_id}")
         return True
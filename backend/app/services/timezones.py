@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+
+def is_valid_timezone(name: Optional[str]) -> bool:
+    if not name:
+        return False
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """IANA zone for `name`, falling back to UTC for empty or unknown names."""
+    return ZoneInfo(name) if is_valid_timezone(name) else ZoneInfo(DEFAULT_TIMEZONE)
+
+def to_utc(value: datetime, tz_name: Optional[str]) -> datetime:
+    """
+    Convert a delivery time to the naive UTC the database stores. Aware values keep
+    their own offset; naive values are local wall-clock time in `tz_name`.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=get_zone(tz_name))
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def to_local(value: datetime, tz_name: Optional[str]) -> datetime:
+    """Naive UTC from the database -> naive local wall-clock time in `tz_name`."""
+    return value.replace(tzinfo=timezone.utc).astimezone(get_zone(tz_name)).replace(tzinfo=None)
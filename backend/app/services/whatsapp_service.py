@@ -1,9 +1,16 @@
-
 import os
+from functools import lru_cache
 from twilio.rest import Client
 from app.core.config import settings
+from app.services.rate_limiter import outbound_limiter
+
+@lru_cache(maxsize=4)
+def get_twilio_client(sid: str, token: str) -> Client:
+    """One Twilio client per account, so its HTTP session and connections are reused across messages."""
+    return Client(sid, token)
 
-def send_whatsapp_message(to_number: str, text: str):
+def send_whatsapp_message(to_number: str, text: str, rate_limited: bool = False):
+    """Send a WhatsApp message via Twilio. Pass rate_limited=True when the caller already holds a send slot."""
     sid = settings.TWILIO_ACCOUNT_SID
     token = settings.TWILIO_AUTH_TOKEN
     from_number = settings.TWILIO_FROM_WHATSPP
@@ -14,11 +21,13 @@ def send_whatsapp_message(to_number: str, text: str):
         return True
 
     try:
-        client = Client(sid, token)
+        client = get_twilio_client(sid, token)
         # Ensure numbers have whatsapp: prefix
         if not to_number.startswith("whatsapp:"):
             to_number = f"whatsapp:{to_number}"
         
+        if not rate_limited:
+            outbound_limiter.acquire_sync("whatsapp")
         message = client.messages.create(
             from_=from_number,
             body=text,
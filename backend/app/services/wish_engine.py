@@ -0,0 +1,213 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class WishEngine:
+    """
+    Runs wish processing coroutines on one long-lived event loop in a background thread.
+    Async clients (e.g. AsyncOpenAI) created on this loop keep their connection pools
+    across wishes, and a semaphore bounds how many wishes are in flight at once.
+    Blocking steps (DB, rendering, SMTP) should be awaited via asyncio.to_thread, which
+    uses a thread pool sized to the engine's concurrency.
+
+    Admission control: at most `max_pending` submissions may be queued or running.
+    submit() blocks the calling thread (an APScheduler worker or the dispatcher) until
+    a slot frees up, so a same-second burst is admitted at the pace the engine drains it.
+
+    drain() is the shutdown path: it refuses new submissions, gives in-flight work a
+    deadline to finish and then cancels what is left, so handlers can checkpoint.
+    """
+
+    def __init__(self, handler, concurrency: int = 10, max_pending: int = None, name: str = "wish-engine"):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending or concurrency * 10
+        self.name = name
+        self._admission = threading.BoundedSemaphore(self.max_pending)
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self.draining = False
+        self._tasks = set() # Handler tasks; drain() cancels only these, not helpers they spawned
+        self._futures = set() # Caller-side futures of submitted work, failed by drain() if abandoned
+
+        # Metrics
+        self.started_at = None
+        self.pending = 0
+        self.in_flight = 0
+        self.admission_waits = 0
+        self.admission_wait_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self._completions = deque(maxlen=1000) # Completion timestamps for throughput
+
+    def configure(self, concurrency: int = None, max_pending: int = None):
+        """Override the sizing chosen at import time (e.g. from worker CLI flags). Only before start()."""
+        if self.running:
+            raise RuntimeError(f"{self.name} is already running")
+        if concurrency:
+            self.concurrency = concurrency
+        if max_pending or concurrency:
+            self.max_pending = max_pending or self.concurrency * 10
+            self._admission = threading.BoundedSemaphore(self.max_pending)
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self.draining = False
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name))
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self.started_at = time.time()
+            print(f"{self.name} started with concurrency {self.concurrency}")
+
+    def submit(self, *args):
+        """Schedule handler(*args) on the engine loop. Returns a concurrent.futures.Future."""
+        return self.submit_to(self.handler, *args)
+
+    def submit_to(self, handler, *args):
+        """Run another coroutine function on the engine, sharing its loop and concurrency cap."""
+        if self.draining:
+            raise RuntimeError(f"{self.name} is draining and not accepting work")
+        if not self.running:
+            self.start()
+        if not self._admission.acquire(blocking=False):
+            wait_start = time.time()
+            self._admission.acquire()
+            self.admission_waits += 1
+            self.admission_wait_seconds += time.time() - wait_start
+            if self.draining:
+                # Drain started while we waited for a slot
+                self._admission.release()
+                raise RuntimeError(f"{self.name} is draining and not accepting work")
+        with self._pending_lock:
+            self.pending += 1
+            future = asyncio.run_coroutine_threadsafe(self._run(handler, *args), self._loop)
+            self._futures.add(future)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._pending_lock:
+            self.pending -= 1
+            self._futures.discard(future)
+        self._admission.release()
+
+    def _fail_abandoned(self) -> int:
+        """Fail futures whose task outlived the cleanup window, so callers waiting on them don't hang."""
+        with self._pending_lock:
+            futures = [f for f in self._futures if not f.done()]
+        for future in futures:
+            try:
+                future.set_exception(RuntimeError(f"{self.name} stopped before this work finished"))
+            except concurrent.futures.InvalidStateError:
+                pass # Finished in the meantime
+        return len(futures)
+
+    async def _run(self, handler, *args):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await self._run_limited(handler, *args)
+        finally:
+            self._tasks.discard(task)
+
+    async def _run_limited(self, handler, *args):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                result = await handler(*args)
+                self.completed += 1
+                return result
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self._completions.append(time.time())
+
+    async def _cancel_all(self) -> int:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    def _wait_idle(self, deadline: float) -> bool:
+        while self.pending and time.time() < deadline:
+            time.sleep(0.05)
+        return not self.pending
+
+    def drain(self, timeout: float = 30, cleanup_timeout: float = 10) -> dict:
+        """
+        Stop accepting work, wait up to `timeout` seconds for in-flight handlers, then
+        cancel the rest and give them `cleanup_timeout` seconds to checkpoint before
+        the loop stops.
+        """
+        self.draining = True
+        in_flight = self.pending
+        if not self.running:
+            return {"in_flight": 0, "finished": 0, "cancelled": 0, "abandoned": 0}
+
+        started = time.time()
+        idle = self._wait_idle(started + timeout)
+        finished = in_flight - self.pending
+        cancelled = 0
+        if not idle:
+            cancelled = asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result(cleanup_timeout)
+            self._wait_idle(time.time() + cleanup_timeout)
+        abandoned = self._fail_abandoned()
+        self.stop(cleanup_timeout)
+        result = {"in_flight": in_flight, "finished": finished, "cancelled": cancelled, "abandoned": abandoned}
+        print(f"{self.name} drained in {round(time.time() - started, 1)}s: {result}")
+        return result
+
+    def stop(self, timeout: float = 30):
+        with self._start_lock:
+            if not self.running:
+                return
+            loop = self._loop
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout)
+            loop.close()
+            self._loop = None
+            self._thread = None
+            print(f"{self.name} stopped")
+
+    def stats(self, window_seconds: int = 60) -> dict:
+        now = time.time()
+        recent = sum(1 for ts in self._completions if ts >= now - window_seconds)
+        return {
+            "running": self.running,
+            "draining": self.draining,
+            "concurrency": self.concurrency,
+            "max_pending": self.max_pending,
+            "queued": max(self.pending - self.in_flight, 0),
+            "in_flight": self.in_flight,
+            "admission_waits": self.admission_waits,
+            "admission_wait_seconds": round(self.admission_wait_seconds, 2),
+            "completed": self.completed,
+            "failed": self.failed,
+            "throughput_per_min": round(recent * 60 / window_seconds, 2),
+            "uptime_seconds": round(now - self.started_at) if self.started_at else 0
+        }
@@ -0,0 +1,44 @@
+"""
+Standalone wish delivery worker: scheduler, LLM generation and delivery without the API.
+
+    python -m app.worker [--concurrency N] [--max-pending N]
+
+Run the API with SCHEDULER_ENABLED=false so request handling and delivery scale
+independently. Several workers can run at once; leader election (or row claims in
+dispatcher mode) keeps each wish delivered exactly once.
+"""
+import argparse
+import signal
+import threading
+from app.db import models
+from app.db.database import engine
+from app.services.scheduler import start_scheduler, drain_and_stop, wish_engine
+from app.services.smtp_pool import smtp_pool
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the wish delivery worker")
+    parser.add_argument("--concurrency", type=int, help="Wishes processed at once (default: WISH_ENGINE_CONCURRENCY)")
+    parser.add_argument("--max-pending", type=int, help="Wishes queued or running (default: WISH_ENGINE_MAX_PENDING)")
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=engine)
+    wish_engine.configure(concurrency=args.concurrency, max_pending=args.max_pending)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    start_scheduler()
+    print(f"Wish worker running (concurrency {wish_engine.concurrency}, max pending {wish_engine.max_pending})")
+    while not stop.wait(1):
+        pass
+
+    print("Wish worker shutting down...")
+    try:
+        drain_and_stop()
+        smtp_pool.close_all()
+    except Exception as e:
+        print(f"Warning: Shutdown failed: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import pytest
+import uuid
+from unittest.mock import patch, PropertyMock
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import scheduler as scheduler_service
+
+client = TestClient(app)
+
+def get_auth_headers():
+    email = f"approval_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Approval User", "terms_accepted": 1
+    })
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def schedule(headers, days=2, **overrides):
+    payload = {
+        "recipient_name": "Approval Recipient", "recipient_email": "approval@test.com",
+        "occasion": "Birthday", "tone": "warm", "event_name": "Approval Event",
+        "scheduled_time": (datetime.utcnow() + timedelta(days=days)).replace(microsecond=0).isoformat(),
+        "generated_wish": "Happy Birthday!",
+        "auto_send": 0
+    }
+    payload.update(overrides)
+    response = client.post("/api/schedule", json=payload, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def get_job(wish_id):
+    return scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(wish_id))
+
+def test_manual_wish_waits_for_approval():
+    headers = get_auth_headers()
+    created = schedule(headers)
+
+    assert created["status"] == "awaiting_approval"
+    assert get_wish(created["id"]).status == "awaiting_approval"
+    assert get_job(created["id"]) is None
+
+    auto = schedule(headers, auto_send=1)
+    assert auto["status"] == "pending"
+    assert get_job(auto["id"]) is not None
+
+def test_inbox_keyset_pagination():
+    headers = get_auth_headers()
+    ids = [schedule(headers, days=day)["id"] for day in (3, 1, 2)]
+
+    first = client.get("/api/approvals?limit=2", headers=headers).json()
+    assert [item["id"] for item in first["items"]] == [ids[1], ids[2]]
+    assert first["next_cursor"]["after_id"] == ids[2]
+
+    second = client.get("/api/approvals", params={"limit": 2, **first["next_cursor"]}, headers=headers).json()
+    assert [item["id"] for item in second["items"]] == [ids[0]]
+    assert second["next_cursor"] is None
+
+def test_inbox_rejects_bad_cursor():
+    headers = get_auth_headers()
+    response = client.get("/api/approvals", params={"after_time": "garbage", "after_id": 1}, headers=headers)
+    assert response.status_code == 400
+
+def test_batch_approve_and_reject():
+    headers = get_auth_headers()
+    approve_ids = [schedule(headers, days=day)["id"] for day in (1, 2)]
+    reject_id = schedule(headers)["id"]
+
+    response = client.post("/api/approvals", json={"approve": approve_ids, "reject": [reject_id]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"approved": 2, "rejected": 1}
+
+    for wish_id in approve_ids:
+        assert get_wish(wish_id).status == "pending"
+        assert get_job(wish_id) is not None
+    assert get_wish(reject_id).status == "rejected"
+    assert get_job(reject_id) is None
+    assert client.get("/api/approvals", headers=headers).json()["items"] == []
+
+def test_batch_approve_writes_jobs_in_bulk():
+    headers = get_auth_headers()
+    wishes = [schedule(headers, days=day) for day in (1, 2, 3)]
+
+    # As in a started (paused) API process: jobs go straight to the jobstore table
+    with patch.object(type(scheduler_service.scheduler), "running", new_callable=PropertyMock, return_value=True), \
+         patch.object(scheduler_service.scheduler, "wakeup") as mock_wakeup, \
+         patch.object(scheduler_service.scheduler, "add_job") as mock_add_job:
+        response = client.post("/api/approvals", json={"approve": [wish["id"] for wish in wishes]}, headers=headers)
+    assert response.json()["approved"] == 3
+    mock_add_job.assert_not_called()
+    mock_wakeup.assert_called_once()
+
+    try:
+        for wish in wishes:
+            job = scheduler_service.wish_jobstore.lookup_job(scheduler_service.job_id_for_wish(wish["id"]))
+            assert job.args == (wish["id"],)
+            assert job.trigger.run_date.replace(tzinfo=None) == get_wish(wish["id"]).dispatch_at
+    finally:
+        for wish in wishes:
+            scheduler_service.wish_jobstore.remove_job(scheduler_service.job_id_for_wish(wish["id"]))
+
+def test_overdue_approval_dispatches_now():
+    headers = get_auth_headers()
+    wish_id = schedule(headers, days=-1)["id"]
+
+    client.post("/api/approvals", json={"approve": [wish_id]}, headers=headers)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.dispatch_at >= datetime.utcnow() - timedelta(minutes=1)
+
+def test_rejecting_recurring_wish_keeps_the_series():
+    headers = get_auth_headers()
+    wish_id = schedule(headers, recurrence="yearly")["id"]
+
+    client.post("/api/approvals", json={"reject": [wish_id]}, headers=headers)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "rejected"
+    assert wish.next_occurrence_at == wish.scheduled_time.replace(year=wish.scheduled_time.year + 1)
+
+def test_cannot_approve_other_users_wishes():
+    owner = get_auth_headers()
+    wish_id = schedule(owner)["id"]
+
+    response = client.post("/api/approvals", json={"approve": [wish_id]}, headers=get_auth_headers())
+    assert response.json() == {"approved": 0, "rejected": 0}
+    assert get_wish(wish_id).status == "awaiting_approval"
+
+def test_turning_auto_send_off_moves_wish_to_inbox():
+    headers = get_auth_headers()
+    wish_id = schedule(headers, auto_send=1)["id"]
+
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"auto_send": 0}, headers=headers)
+    assert response.json()["status"] == "awaiting_approval"
+    assert get_job(wish_id) is None
+
+def test_deleting_contact_removes_awaiting_wishes():
+    headers = get_auth_headers()
+    contact_id = client.post("/api/contacts", json={
+        "name": "Approval Contact", "email": "approval@test.com", "relationship": "Friend"
+    }, headers=headers).json()["id"]
+    wish_id = schedule(headers)["id"]
+
+    client.delete(f"/api/contacts/{contact_id}", headers=headers)
+
+    assert get_wish(wish_id) is None
+    response = client.post("/api/approvals", json={"approve": [wish_id]}, headers=headers)
+    assert response.json()["approved"] == 0
+
+def test_awaiting_wishes_count_as_upcoming():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)["id"]
+
+    events = client.get("/api/events/upcoming", headers=headers).json()
+    assert any(event.get("wish_id") == wish_id for event in events)
+    assert client.get("/api/dashboard/stats", headers=headers).json()["messages_scheduled"] == 1
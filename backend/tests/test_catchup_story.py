@@ -0,0 +1,170 @@
+import pytest
+import threading
+import time
+from unittest.mock import patch, AsyncMock
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from app.main import app
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, ActivityLog
+from app.services import catchup
+from app.services import dispatcher
+from app.services import scheduler as scheduler_service
+
+def create_wish(minutes_from_now, recurrence_rule=None):
+    db = SessionLocal()
+    try:
+        scheduled_time = datetime.utcnow() + timedelta(minutes=minutes_from_now)
+        wish = ScheduledWish(
+            recipient_name="Catch-up Recipient",
+            recipient_email="catchup@test.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=scheduled_time,
+            status="pending",
+            recurrence_rule=recurrence_rule,
+            recurrence_anchor=scheduled_time if recurrence_rule else None
+        )
+        db.add(wish)
+        db.commit()
+        db.refresh(wish)
+        return wish.id
+    finally:
+        db.close()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def completed_future(*args):
+    future = Future()
+    future.set_result(None)
+    return future
+
+@pytest.fixture
+def clean_queue():
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.status == "pending").update({"status": "archived"})
+    db.commit()
+    db.close()
+    yield
+
+def test_sweeper_drains_overdue_most_late_first(clean_queue):
+    late_id = create_wish(-120)
+    later_id = create_wish(-600)
+    recent_id = create_wish(-1)
+
+    with patch("app.services.catchup.wish_engine.submit", side_effect=completed_future) as mock_submit:
+        result = catchup.sweep_overdue_wishes()
+
+    submitted = [call.args[0] for call in mock_submit.call_args_list]
+    assert submitted == [later_id, late_id]
+    assert recent_id not in submitted
+    assert result["dispatched"] == 2
+
+def test_sweeper_drains_in_bounded_batches(clean_queue):
+    ids = [create_wish(-60 - i) for i in range(5)]
+
+    with patch.object(settings, "CATCHUP_BATCH_SIZE", 2), \
+         patch("app.services.catchup.wait") as mock_wait, \
+         patch("app.services.catchup.wish_engine.submit", side_effect=completed_future):
+        result = catchup.sweep_overdue_wishes()
+
+    assert result["dispatched"] == 5
+    assert [len(call.args[0]) for call in mock_wait.call_args_list] == [2, 2, 1]
+
+def test_stale_policy_expire(clean_queue):
+    stale_id = create_wish(-60 * 48)
+    recurring_id = create_wish(-60 * 48, recurrence_rule="FREQ=YEARLY")
+    overdue_id = create_wish(-60)
+
+    with patch.object(settings, "CATCHUP_STALE_POLICY", "expire"), \
+         patch("app.services.catchup.wish_engine.submit", side_effect=completed_future) as mock_submit:
+        result = catchup.sweep_overdue_wishes()
+
+    assert [call.args[0] for call in mock_submit.call_args_list] == [overdue_id]
+    assert result["expired"] == 2
+    assert get_wish(stale_id).status == "expired"
+    # An expired occurrence must not end the series
+    assert get_wish(recurring_id).next_occurrence_at is not None
+
+    db = SessionLocal()
+    try:
+        assert db.query(ActivityLog).filter(ActivityLog.action == "wish_expired").count() >= 2
+    finally:
+        db.close()
+
+def test_stale_policy_skip(clean_queue):
+    stale_id = create_wish(-60 * 48)
+
+    with patch.object(settings, "CATCHUP_STALE_POLICY", "skip"), \
+         patch("app.services.catchup.wish_engine.submit", side_effect=completed_future) as mock_submit:
+        result = catchup.sweep_overdue_wishes()
+
+    mock_submit.assert_not_called()
+    assert result["skipped"] == 1
+    assert get_wish(stale_id).status == "skipped"
+
+def test_dispatcher_leaves_overdue_rows_to_sweeper(clean_queue):
+    overdue_id = create_wish(-120)
+    due_id = create_wish(-1)
+
+    with patch("app.services.dispatcher.wish_engine.submit", side_effect=completed_future) as mock_submit:
+        dispatcher.dispatch_due_wishes()
+
+    assert [call.args[0] for call in mock_submit.call_args_list] == [due_id]
+
+def test_rehydrate_skips_long_overdue_wishes(clean_queue):
+    overdue_id = create_wish(-120)
+    upcoming_id = create_wish(60)
+
+    with patch("app.services.scheduler.enqueue_wish") as mock_enqueue:
+        scheduler_service.rehydrate_pending_wishes()
+
+    enqueued = [call.args[0] for call in mock_enqueue.call_args_list]
+    assert upcoming_id in enqueued
+    assert overdue_id not in enqueued
+
+def test_late_job_and_sweep_send_a_wish_once(clean_queue):
+    wish_id = create_wish(-30)
+    sends = []
+
+    def slow_send(wish, text, channel="email"):
+        sends.append(channel)
+        time.sleep(0.3)
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=slow_send), \
+         patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = "Happy Birthday!"
+        # The sweep claims the row while its APScheduler job is still queued behind the admission cap
+        sweep = threading.Thread(target=catchup.sweep_overdue_wishes)
+        sweep.start()
+        time.sleep(0.1)
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+        sweep.join(timeout=10)
+
+    assert sends == ["email"]
+    assert get_wish(wish_id).status == "sent"
+
+def test_sweep_skips_wish_a_job_is_already_sending(clean_queue):
+    wish_id = create_wish(-30)
+    sends = []
+
+    def slow_send(wish, text, channel="email"):
+        sends.append(channel)
+        time.sleep(0.3)
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=slow_send), \
+         patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = "Happy Birthday!"
+        job = scheduler_service.process_scheduled_wish(wish_id)
+        time.sleep(0.1)
+        result = catchup.sweep_overdue_wishes()
+        job.result(timeout=10)
+
+    assert result["dispatched"] == 0
+    assert sends == ["email"]
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import patch
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from app.main import app
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import dispatcher
+from app.services import scheduler as scheduler_service
+
+def create_wish(minutes_from_now, status="pending", claimed_by=None, claimed_at=None):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Dispatch Recipient",
+            recipient_email="dispatch@test.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() + timedelta(minutes=minutes_from_now),
+            status=status,
+            claimed_by=claimed_by,
+            claimed_at=claimed_at
+        )
+        db.add(wish)
+        db.commit()
+        db.refresh(wish)
+        return wish.id
+    finally:
+        db.close()
+
+@pytest.fixture
+def clean_queue():
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.status == "pending").update({"status": "archived"})
+    db.commit()
+    db.close()
+    yield
+
+def test_claim_only_due_unclaimed_wishes(clean_queue):
+    due_id = create_wish(-5)
+    future_id = create_wish(60)
+    claimed_id = create_wish(-5, claimed_by="other-worker", claimed_at=datetime.utcnow())
+
+    db = SessionLocal()
+    try:
+        claimed = dispatcher.claim_due_wishes(db, limit=10)
+    finally:
+        db.close()
+
+    assert due_id in claimed
+    assert future_id not in claimed
+    assert claimed_id not in claimed
+
+def test_claim_is_exclusive_between_workers(clean_queue):
+    ids = [create_wish(-i) for i in range(1, 6)]
+
+    db = SessionLocal()
+    try:
+        first = dispatcher.claim_due_wishes(db, limit=3)
+        second = dispatcher.claim_due_wishes(db, limit=10)
+        third = dispatcher.claim_due_wishes(db, limit=10)
+    finally:
+        db.close()
+
+    assert len(first) == 3
+    assert set(first).isdisjoint(second)
+    assert set(first) | set(second) == set(ids)
+    assert third == []
+
+def test_stale_claims_are_reclaimed(clean_queue):
+    stale_at = datetime.utcnow() - timedelta(seconds=settings.DISPATCH_CLAIM_TIMEOUT_SECONDS + 60)
+    stale_id = create_wish(-5, claimed_by="dead-worker", claimed_at=stale_at)
+
+    db = SessionLocal()
+    try:
+        claimed = dispatcher.claim_due_wishes(db, limit=10)
+    finally:
+        db.close()
+
+    assert claimed == [stale_id]
+
+def completed_future(*args):
+    future = Future()
+    future.set_result(None)
+    return future
+
+def test_dispatch_processes_claimed_batches(clean_queue):
+    ids = [create_wish(-i) for i in range(1, 4)]
+    with patch.object(dispatcher.wish_engine, "submit", side_effect=completed_future) as mock_submit, \
+         patch.object(settings, "DISPATCH_BATCH_SIZE", 2):
+        total = dispatcher.dispatch_due_wishes()
+
+    assert total == 3
+    assert sorted(call.args[0] for call in mock_submit.call_args_list) == sorted(ids)
+
+def test_enqueue_skips_job_in_dispatcher_mode():
+    with patch.object(settings, "SCHEDULER_MODE", "dispatcher"), \
+         patch.object(scheduler_service.scheduler, "add_job") as mock_add_job:
+        scheduler_service.enqueue_wish(123, datetime.utcnow())
+    mock_add_job.assert_not_called()
@@ -0,0 +1,116 @@
+import pytest
+import uuid
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import scheduler as scheduler_service
+
+client = TestClient(app)
+
+def get_auth_headers():
+    email = f"edit_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Edit User", "terms_accepted": 1
+    })
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def schedule(headers, **overrides):
+    payload = {
+        "recipient_name": "Edit Recipient", "recipient_email": "edit@test.com",
+        "occasion": "Birthday", "tone": "warm", "event_name": "Edit Event",
+        "scheduled_time": (datetime.utcnow() + timedelta(days=2)).replace(microsecond=0).isoformat(),
+        "generated_wish": "Happy Birthday!"
+    }
+    payload.update(overrides)
+    response = client.post("/api/schedule", json=payload, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def get_job(wish_id):
+    return scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(wish_id))
+
+def test_reschedule_moves_the_job():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+    new_time = (datetime.utcnow() + timedelta(days=5)).replace(microsecond=0)
+
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"scheduled_time": new_time.isoformat()}, headers=headers)
+    assert response.status_code == 200
+
+    assert get_wish(wish_id).scheduled_time == new_time
+    assert get_job(wish_id).trigger.run_date.replace(tzinfo=None) == new_time
+    job_ids = [job.id for job in scheduler_service.scheduler.get_jobs()]
+    assert job_ids.count(scheduler_service.job_id_for_wish(wish_id)) == 1
+
+def test_prompt_change_clears_pregenerated_text():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"tone": "funny"}, headers=headers)
+    assert response.status_code == 200
+    wish = get_wish(wish_id)
+    assert wish.tone == "funny"
+    assert wish.generated_wish is None
+
+def test_patch_validates_input():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"scheduled_time": "tomorrow"}, headers=headers)
+    assert response.status_code == 422
+
+def test_patch_rejects_null_prompt_fields():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+    for field in ("recipient_name", "occasion", "tone", "event_name", "platform"):
+        response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={field: None}, headers=headers)
+        assert response.status_code == 422, field
+    wish = get_wish(wish_id)
+    assert (wish.recipient_name, wish.occasion) == ("Edit Recipient", "Birthday")
+
+def test_reschedule_resets_the_reminder():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).update({"reminder_sent_at": datetime.utcnow()})
+    db.commit()
+    db.close()
+
+    new_time = (datetime.utcnow() + timedelta(days=9)).replace(microsecond=0)
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"scheduled_time": new_time.isoformat()}, headers=headers)
+    assert response.status_code == 200
+    assert get_wish(wish_id).reminder_sent_at is None
+
+def test_cancel_removes_the_job():
+    headers = get_auth_headers()
+    wish_id = schedule(headers)
+    assert get_job(wish_id) is not None
+
+    response = client.delete(f"/api/scheduled-wishes/{wish_id}", headers=headers)
+    assert response.status_code == 200
+    assert get_wish(wish_id).status == "cancelled"
+    assert get_job(wish_id) is None
+
+    # Already cancelled
+    response = client.delete(f"/api/scheduled-wishes/{wish_id}", headers=headers)
+    assert response.status_code == 409
+
+def test_cannot_touch_another_users_wish():
+    owner = get_auth_headers()
+    wish_id = schedule(owner)
+    other = get_auth_headers()
+
+    assert client.patch(f"/api/scheduled-wishes/{wish_id}", json={"tone": "funny"}, headers=other).status_code == 404
+    assert client.delete(f"/api/scheduled-wishes/{wish_id}", headers=other).status_code == 404
+    assert get_wish(wish_id).status == "pending"
@@ -0,0 +1,119 @@
+import json
+import time
+import threading
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import scheduler as scheduler_service
+from app.services import whatsapp_service
+from app.services.channels import channels_for_wish, normalize_platform
+
+def create_wish(platform="email,telegram,whatsapp", **fields):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Fan Out Recipient",
+            recipient_email="fanout@example.com",
+            telegram_chat_id="12345",
+            phone_number="+15550001111",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+            status="pending",
+            platform=platform,
+            generated_wish="Happy Birthday!",
+            **fields
+        )
+        db.add(wish)
+        db.commit()
+        return wish.id
+    finally:
+        db.close()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def test_platform_lists_are_normalized():
+    assert normalize_platform("Email, telegram,email") == "email,telegram"
+    assert normalize_platform("web") == "web"
+    try:
+        normalize_platform("email,fax")
+        assert False, "unknown channel accepted"
+    except ValueError:
+        pass
+
+def test_channels_without_destination_are_skipped():
+    class FakeWish:
+        platform = "email,telegram,whatsapp"
+        recipient_email = "a@b.com"
+        telegram_chat_id = None
+        phone_number = "+15550001111"
+
+    assert channels_for_wish(FakeWish()) == ["email", "whatsapp"]
+
+def test_channels_are_sent_concurrently():
+    wish_id = create_wish()
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "channels": []}
+
+    def slow_send(wish, text, channel="email"):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["channels"].append(channel)
+        time.sleep(0.2)
+        with lock:
+            state["active"] -= 1
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=slow_send):
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    assert sorted(state["channels"]) == ["email", "telegram", "whatsapp"]
+    assert state["peak"] == 3
+    wish = get_wish(wish_id)
+    assert wish.status == "sent"
+    results = json.loads(wish.delivery_results)
+    assert {channel: r["status"] for channel, r in results.items()} == {"email": "sent", "telegram": "sent", "whatsapp": "sent"}
+
+def test_retry_only_resends_failed_channels():
+    wish_id = create_wish()
+    calls = []
+
+    def telegram_down(wish, text, channel="email"):
+        calls.append(channel)
+        if channel == "telegram":
+            raise ConnectionError("telegram unreachable")
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=telegram_down), \
+         patch("app.services.scheduler.enqueue_wish"):
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.delivered_at is None
+    results = json.loads(wish.delivery_results)
+    assert results["telegram"]["status"] == "failed"
+    assert "unreachable" in results["telegram"]["error"]
+    assert results["email"]["status"] == "sent"
+
+    with patch("app.services.scheduler._deliver_wish") as mock_deliver:
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    assert [c.args[2] for c in mock_deliver.call_args_list] == ["telegram"]
+    wish = get_wish(wish_id)
+    assert wish.status == "sent"
+    assert json.loads(wish.delivery_results)["telegram"]["status"] == "sent"
+
+def test_twilio_client_is_reused():
+    whatsapp_service.get_twilio_client.cache_clear()
+    with patch.object(whatsapp_service, "Client") as mock_client:
+        whatsapp_service.get_twilio_client("sid", "token")
+        whatsapp_service.get_twilio_client("sid", "token")
+    whatsapp_service.get_twilio_client.cache_clear()
+    mock_client.assert_called_once_with("sid", "token")
@@ -0,0 +1,157 @@
+import pytest
+import asyncio
+import time
+from unittest.mock import patch, AsyncMock
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.wish_engine import WishEngine
+from app.services import scheduler as scheduler_service
+
+def test_drain_waits_for_in_flight_work():
+    done = []
+
+    async def handler(n):
+        await asyncio.sleep(0.1)
+        done.append(n)
+
+    engine = WishEngine(handler, concurrency=2, name="test-engine")
+    futures = [engine.submit(i) for i in range(2)]
+    result = engine.drain(timeout=5)
+
+    assert sorted(done) == [0, 1]
+    assert all(f.done() for f in futures)
+    assert result["finished"] == 2
+    assert result["cancelled"] == 0
+    assert not engine.running
+
+def test_drain_rejects_new_work():
+    async def handler():
+        return None
+
+    engine = WishEngine(handler, concurrency=1, name="test-engine")
+    engine.start()
+    engine.drain(timeout=1)
+    with pytest.raises(RuntimeError):
+        engine.submit()
+
+def test_drain_cancels_after_deadline():
+    cleaned_up = []
+
+    async def handler():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cleaned_up.append(True)
+            raise
+
+    engine = WishEngine(handler, concurrency=1, name="test-engine")
+    engine.submit()
+    time.sleep(0.05)
+    result = engine.drain(timeout=0.2)
+
+    assert result["cancelled"] == 1
+    assert result["abandoned"] == 0
+    assert cleaned_up == [True]
+
+def test_abandoned_work_fails_its_future():
+    async def handler():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            await asyncio.shield(asyncio.sleep(5)) # Cleanup that outlives the cleanup window
+
+    engine = WishEngine(handler, concurrency=1, name="test-engine")
+    future = engine.submit()
+    time.sleep(0.05)
+    result = engine.drain(timeout=0.2, cleanup_timeout=0.5)
+
+    assert result["abandoned"] == 1
+    assert future.done()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=0)
+    assert engine.pending == 0
+
+def create_wish():
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Drain Recipient",
+            recipient_email="drain@test.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+            status="pending",
+            platform="email",
+            claimed_by="worker-a:1"
+        )
+        db.add(wish)
+        db.commit()
+        return wish.id
+    finally:
+        db.close()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def test_interrupted_wish_keeps_text_and_is_released():
+    wish_id = create_wish()
+    engine = WishEngine(scheduler_service.process_wish_async, concurrency=1, name="test-engine")
+
+    async def slow_delivery(wish, text):
+        await asyncio.sleep(30)
+
+    with patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm, \
+         patch("app.services.scheduler.outbound_limiter.acquire", side_effect=slow_delivery), \
+         patch("app.services.scheduler.enqueue_wish") as mock_enqueue:
+        mock_llm.return_value = "Generated before shutdown"
+        engine.submit(wish_id, "worker-a:1") # Claimed by a dispatcher batch
+        time.sleep(0.5)
+        engine.drain(timeout=0.2)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.generated_wish == "Generated before shutdown"
+    assert wish.claimed_by is None
+    mock_enqueue.assert_called_once()
+
+def test_send_in_progress_is_finished_not_abandoned():
+    wish_id = create_wish()
+    engine = WishEngine(scheduler_service.process_wish_async, concurrency=1, name="test-engine")
+
+    def slow_send(wish, text, channel="email"):
+        time.sleep(0.5)
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=slow_send) as mock_deliver:
+        db = SessionLocal()
+        db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).update({"generated_wish": "Ready"})
+        db.commit()
+        db.close()
+        engine.submit(wish_id, "worker-a:1") # Claimed by a dispatcher batch
+        time.sleep(0.2)
+        engine.drain(timeout=0.05)
+
+    mock_deliver.assert_called_once()
+    wish = get_wish(wish_id)
+    assert wish.status == "sent"
+    assert wish.delivered_at is not None
+
+def test_drain_mid_batch_releases_unsubmitted_claims():
+    from concurrent.futures import Future
+    from app.services import dispatcher
+
+    wish_ids = [create_wish() for _ in range(3)]
+    submitted = Future()
+    submitted.set_result(None)
+
+    with patch.object(dispatcher.wish_engine, "submit", side_effect=[submitted, RuntimeError("draining"), RuntimeError("draining")]):
+        futures = dispatcher.submit_claimed(wish_ids, "worker-a:1")
+
+    assert futures == [submitted]
+    assert get_wish(wish_ids[0]).claimed_by == "worker-a:1"
+    assert [get_wish(wish_id).claimed_by for wish_id in wish_ids[1:]] == [None, None]
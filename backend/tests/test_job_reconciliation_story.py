@@ -0,0 +1,107 @@
+import pytest
+import uuid
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, User
+from app.services import scheduler as scheduler_service
+
+client = TestClient(app)
+
+def get_admin_headers():
+    email = f"reconcile_admin_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Reconcile Admin", "terms_accepted": 1
+    })
+    db = SessionLocal()
+    db.query(User).filter(User.email == email).update({"role": "admin"})
+    db.commit()
+    db.close()
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def create_wish(status="pending"):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Reconcile Recipient",
+            recipient_email="reconcile@test.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() + timedelta(days=1),
+            status=status
+        )
+        db.add(wish)
+        db.commit()
+        db.refresh(wish)
+        return wish.id
+    finally:
+        db.close()
+
+def delete_wish(wish_id):
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).delete()
+    db.commit()
+    db.close()
+
+def job_exists(wish_id):
+    return scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(wish_id)) is not None
+
+def test_reconcile_removes_orphans_and_adds_missing():
+    missing_id = create_wish()
+    deleted_id = create_wish()
+    scheduler_service.enqueue_wish(deleted_id, datetime.utcnow() + timedelta(days=1))
+    delete_wish(deleted_id)
+
+    result = scheduler_service.reconcile_wish_jobs()
+
+    assert not job_exists(deleted_id)
+    assert job_exists(missing_id)
+    assert result["orphans_removed"] >= 1
+    assert result["missing_added"] >= 1
+
+def test_reconcile_cancels_jobs_for_finished_wishes():
+    wish_id = create_wish()
+    scheduler_service.enqueue_wish(wish_id, datetime.utcnow() + timedelta(days=1))
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).update({"status": "sent"})
+    db.commit()
+    db.close()
+
+    scheduler_service.reconcile_wish_jobs()
+    assert not job_exists(wish_id)
+
+def test_reconcile_is_a_no_op_when_in_sync():
+    scheduler_service.reconcile_wish_jobs()
+    result = scheduler_service.reconcile_wish_jobs()
+    assert result["orphans_removed"] == 0
+    assert result["missing_added"] == 0
+
+def test_admin_can_trigger_reconcile():
+    headers = get_admin_headers()
+    response = client.post("/api/admin/scheduler/reconcile", headers=headers)
+    assert response.status_code == 200
+    assert "orphans_removed" in response.json()
+
+def test_dispatcher_mode_has_nothing_to_reconcile():
+    with patch("app.services.scheduler.settings.SCHEDULER_MODE", "dispatcher"):
+        assert scheduler_service.reconcile_wish_jobs() == {"orphans_removed": 0, "missing_added": 0, "jobs": 0}
+
+def test_wish_scheduled_during_reconcile_keeps_its_job():
+    new_ids = []
+    read_job_ids = scheduler_service._stored_wish_job_ids
+
+    def schedule_then_read():
+        # /schedule on another API worker commits a wish and its job mid-reconcile
+        wish_id = create_wish()
+        scheduler_service.enqueue_wish(wish_id, datetime.utcnow() + timedelta(days=1))
+        new_ids.append(wish_id)
+        return read_job_ids()
+
+    with patch.object(scheduler_service, "_stored_wish_job_ids", side_effect=schedule_then_read):
+        scheduler_service.reconcile_wish_jobs()
+
+    assert job_exists(new_ids[0])
@@ -0,0 +1,77 @@
+import pytest
+import uuid
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+from app.db.database import SessionLocal
+from app.db.models import SchedulerLease
+from app.services.leader import LeaderElector
+
+def make_elector(name, holder):
+    return LeaderElector(
+        name,
+        holder=holder,
+        lease_seconds=30,
+        renew_interval=1,
+        on_elected=MagicMock(),
+        on_demoted=MagicMock(),
+        on_renewed=MagicMock()
+    )
+
+def expire_lease(name):
+    db = SessionLocal()
+    db.query(SchedulerLease).filter(SchedulerLease.name == name).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    db.close()
+
+@pytest.fixture
+def lease_name():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+def test_only_one_process_becomes_leader(lease_name):
+    first = make_elector(lease_name, "host-a:1")
+    second = make_elector(lease_name, "host-b:2")
+
+    first.tick()
+    second.tick()
+
+    assert first.is_leader
+    assert not second.is_leader
+    first.on_elected.assert_called_once()
+    second.on_elected.assert_not_called()
+
+def test_leader_renews_its_lease(lease_name):
+    leader = make_elector(lease_name, "host-a:1")
+    leader.tick()
+    leader.tick()
+
+    assert leader.is_leader
+    leader.on_elected.assert_called_once()
+    leader.on_renewed.assert_called_once()
+
+def test_follower_takes_over_expired_lease(lease_name):
+    first = make_elector(lease_name, "host-a:1")
+    second = make_elector(lease_name, "host-b:2")
+    first.tick()
+
+    # The leader stopped renewing (crashed or hung)
+    expire_lease(lease_name)
+    second.tick()
+    assert second.is_leader
+    second.on_elected.assert_called_once()
+
+    # When the old leader wakes up it must step down
+    first.tick()
+    assert not first.is_leader
+    first.on_demoted.assert_called_once()
+
+def test_release_hands_over_immediately(lease_name):
+    first = make_elector(lease_name, "host-a:1")
+    second = make_elector(lease_name, "host-b:2")
+    first.tick()
+
+    first.stop()
+    first.on_demoted.assert_called_once()
+    second.tick()
+    assert second.is_leader
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services import llm
+from app.services.llm import WishCache, plan_batches, parse_batch_response
+
+class Prompt:
+    def __init__(self, recipient_name, occasion="Birthday", tone="warm", extra_details=None, length="short"):
+        self.recipient_name = recipient_name
+        self.occasion = occasion
+        self.tone = tone
+        self.extra_details = extra_details
+        self.length = length
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def batch_client(reply):
+    """Fake client answering each batch call with reply(requests)."""
+    calls = []
+
+    async def create(model, messages, max_tokens, temperature):
+        requests = json.loads(messages[1]["content"])
+        calls.append(requests)
+        return completion(reply(requests))
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client, calls
+
+def run_batch(requests, client, **overrides):
+    settings = {"GROQ_API_KEY": "test-key", "LLM_BATCH_ENABLED": True, "LLM_BATCH_MAX_SIZE": 10, "LLM_BATCH_TOKEN_BUDGET": 4000, **overrides}
+    with patch.object(llm, "get_client", return_value=client), \
+         patch.object(llm, "wish_cache", WishCache(maxsize=100, ttl=60)), \
+         patch.multiple(llm.settings, **settings):
+        return asyncio.run(llm.generate_wish_batch(requests))
+
+def test_batches_respect_size_and_token_budget():
+    assert plan_batches(["p"] * 25, tokens_per_item=10, max_size=10, token_budget=10000) == [
+        list(range(10)), list(range(10, 20)), list(range(20, 25))
+    ]
+    # Each item costs ~161 tokens, so only a few fit a 700-token budget
+    batches = plan_batches(["p"] * 6, tokens_per_item=150, max_size=10, token_budget=700)
+    assert all(len(batch) < 6 for batch in batches)
+    assert sum(batches, []) == list(range(6))
+
+def test_parse_tolerates_fences_and_drops_bad_entries():
+    content = '```json\n[{"id": 0, "text": "Hi A"}, {"id": 1, "text": ""}, {"id": 7, "text": "stray"}, "junk", {"id": 2}]\n```'
+    assert parse_batch_response(content, 3) == {0: "Hi A"}
+    assert parse_batch_response("Sorry, I can't do that", 3) == {}
+
+def test_many_wishes_use_one_completion():
+    client, calls = batch_client(lambda reqs: json.dumps([{"id": r["id"], "text": f"Wish {r['id']}"} for r in reqs]))
+    requests = [Prompt(f"Friend {i}") for i in range(5)]
+
+    with patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as single:
+        results = run_batch(requests, client)
+
+    assert results == [f"Wish {i}" for i in range(5)]
+    assert len(calls) == 1
+    single.assert_not_awaited()
+
+def test_malformed_entries_fall_back_to_single_calls():
+    # Reply misses id 1 and returns id 2 in a wrong shape
+    client, calls = batch_client(lambda reqs: json.dumps([{"id": 0, "text": "Batch wish"}, {"id": 2, "wish": "oops"}]))
+    requests = [Prompt("A"), Prompt("B"), Prompt("C")]
+
+    with patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as single:
+        single.side_effect = lambda request: f"Single wish for {request.recipient_name}"
+        results = run_batch(requests, client)
+
+    assert results == ["Batch wish", "Single wish for B", "Single wish for C"]
+    assert single.await_count == 2
+
+def test_batch_size_splits_calls():
+    client, calls = batch_client(lambda reqs: json.dumps([{"id": r["id"], "text": "ok"} for r in reqs]))
+    with patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as single:
+        single.return_value = "ok"
+        run_batch([Prompt(f"Friend {i}") for i in range(7)], client, LLM_BATCH_MAX_SIZE=3)
+
+    assert [len(call) for call in calls] == [3, 3]
+    assert single.await_count == 1 # A batch of one is just a normal call
+
+def test_words_are_batched():
+    client, calls = batch_client(lambda reqs: json.dumps([{"id": r["id"], "text": f"Word wish {r['id']}"} for r in reqs]))
+    with patch.object(llm, "get_client", return_value=client), \
+         patch.multiple(llm.settings, GROQ_API_KEY="test-key", LLM_BATCH_ENABLED=True):
+        results = asyncio.run(llm.generate_wish_from_words(["sun", "moon", "star"], "creative"))
+
+    assert results == ["Word wish 0", "Word wish 1", "Word wish 2"]
+    assert len(calls) == 1
+
+def test_slow_word_batch_falls_back_within_the_word_deadline():
+    async def create(model, messages, max_tokens, temperature=None):
+        if messages[0]["role"] == "system":
+            await asyncio.sleep(5) # Batch call hangs
+        return completion(f"Single wish: {messages[-1]['content'][:10]}")
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    settings = {"GROQ_API_KEY": "test-key", "LLM_BATCH_ENABLED": True,
+                "LLM_WORD_TIMEOUT_SECONDS": 0.2, "LLM_BATCH_TIMEOUT_SECONDS": 30}
+    with patch.object(llm, "get_client", return_value=client), patch.multiple(llm.settings, **settings):
+        start = time.monotonic()
+        results = asyncio.run(llm.generate_wish_from_words(["sun", "moon"], "creative"))
+        elapsed = time.monotonic() - start
+
+    assert all(result.startswith("Single wish") for result in results)
+    assert elapsed < 1
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import llm
+from app.services.llm import WishCache, wish_cache_key
+
+client = TestClient(app)
+
+class Prompt:
+    def __init__(self, recipient_name="Alice", occasion="Birthday", tone="warm", extra_details=None, length="short"):
+        self.recipient_name = recipient_name
+        self.occasion = occasion
+        self.tone = tone
+        self.extra_details = extra_details
+        self.length = length
+
+def test_keys_ignore_case_and_whitespace():
+    assert wish_cache_key(Prompt("Alice", "Birthday", "warm", "loves  tea")) == \
+        wish_cache_key(Prompt(" alice ", "BIRTHDAY", "Warm", "Loves tea"))
+    assert wish_cache_key(Prompt("Alice")) != wish_cache_key(Prompt("Bob"))
+    assert wish_cache_key(Prompt(length="short")) != wish_cache_key(Prompt(length="long"))
+
+def test_lru_evicts_least_recently_used():
+    cache = WishCache(maxsize=2, ttl=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = WishCache(maxsize=10, ttl=1, path=str(tmp_path / "cache.sqlite3"))
+    cache.set("a", "A")
+    assert cache.get("a") == "A"
+    time.sleep(1.1)
+    assert cache.get("a") is None
+
+def test_disk_store_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    WishCache(maxsize=10, ttl=60, path=path).set("a", "A")
+
+    restarted = WishCache(maxsize=10, ttl=60, path=path)
+    assert restarted.get("a") == "A"
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["persistent"] is True
+
+def test_generate_serves_repeats_from_cache():
+    cache = WishCache(maxsize=10, ttl=60)
+    with patch.object(llm, "wish_cache", cache), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = "Happy Birthday Alice!"
+        first = asyncio.run(llm.generate_wish_text(Prompt("Alice")))
+        second = asyncio.run(llm.generate_wish_text(Prompt("ALICE ")))
+
+    assert first == second == "Happy Birthday Alice!"
+    assert mock_generate.await_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_bypass_generates_fresh_variant():
+    cache = WishCache(maxsize=10, ttl=60)
+    with patch.object(llm, "wish_cache", cache), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = ["First variant", "Second variant"]
+        asyncio.run(llm.generate_wish_text(Prompt()))
+        fresh = asyncio.run(llm.generate_wish_text(Prompt(), use_cache=False))
+        again = asyncio.run(llm.generate_wish_text(Prompt()))
+
+    assert fresh == "Second variant"
+    assert again == "Second variant"
+    assert cache.stats()["bypassed"] == 1
+
+def test_errors_are_not_cached():
+    cache = WishCache(maxsize=10, ttl=60)
+    with patch.object(llm, "wish_cache", cache), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = ["Error generating wish with Groq AI: timeout", "Happy Birthday!"]
+        asyncio.run(llm.generate_wish_text(Prompt()))
+        text = asyncio.run(llm.generate_wish_text(Prompt()))
+
+    assert text == "Happy Birthday!"
+    assert mock_generate.await_count == 2
+
+def test_generate_endpoint_honours_fresh_flag():
+    with patch("app.api.endpoints.generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = "Fresh wish"
+        response = client.post("/api/generate", json={"occasion": "Birthday", "recipient_name": "Alice", "fresh": True})
+    assert response.status_code == 200
+    assert mock_generate.await_args.kwargs["use_cache"] is False
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import scheduler as scheduler_service
+import uuid
+
+client = TestClient(app)
+
+def get_auth_headers():
+    email = f"smoothing_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Smoothing User", "terms_accepted": 1
+    })
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_spread_disabled_by_default():
+    scheduled = datetime(2030, 1, 1, 0, 0)
+    assert scheduler_service.spread_dispatch_time(scheduled, auto_send=1) == scheduled
+
+def test_spread_stays_inside_window_for_auto_send():
+    scheduled = datetime(2030, 1, 1, 0, 0)
+    with patch.object(settings, "DISPATCH_SPREAD_WINDOW_SECONDS", 600):
+        times = [scheduler_service.spread_dispatch_time(scheduled, auto_send=1) for _ in range(50)]
+        manual = scheduler_service.spread_dispatch_time(scheduled, auto_send=0)
+
+    assert all(scheduled <= t <= scheduled + timedelta(seconds=600) for t in times)
+    assert len(set(times)) > 1
+    assert manual == scheduled
+
+def test_schedule_endpoint_records_dispatch_time():
+    headers = get_auth_headers()
+    scheduled = (datetime.utcnow() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+    with patch.object(settings, "DISPATCH_SPREAD_WINDOW_SECONDS", 300):
+        response = client.post("/api/schedule", json={
+            "recipient_name": "Burst Recipient", "recipient_email": "burst@test.com",
+            "occasion": "Birthday", "tone": "warm", "event_name": "Burst",
+            "scheduled_time": scheduled.isoformat()
+        }, headers=headers)
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        wish = db.query(ScheduledWish).filter(ScheduledWish.id == response.json()["id"]).first()
+        assert scheduled <= wish.dispatch_at <= scheduled + timedelta(seconds=300)
+    finally:
+        db.close()
+
+    job = scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(wish.id))
+    assert job.trigger.run_date.replace(tzinfo=None) == wish.dispatch_at
+
+def test_processing_records_lag():
+    db = SessionLocal()
+    wish = ScheduledWish(
+        recipient_name="Lag Recipient", occasion="Birthday", tone="warm",
+        scheduled_time=datetime.utcnow() - timedelta(seconds=30),
+        status="pending", platform="web", generated_wish="Hello"
+    )
+    db.add(wish)
+    db.commit()
+    wish_id = wish.id
+    db.close()
+
+    scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    db = SessionLocal()
+    try:
+        saved = db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+        assert saved.dispatched_at is not None
+        assert (saved.dispatched_at - saved.scheduled_time).total_seconds() >= 30
+    finally:
+        db.close()
+    assert scheduler_service.DISPATCH_LAG_HISTORY[-1] >= 30
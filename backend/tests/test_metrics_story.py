@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, User
+from app.services import scheduler as scheduler_service
+from app.services.metrics import Histogram, pipeline_metrics
+import uuid
+
+client = TestClient(app)
+
+def get_admin_headers():
+    email = f"metrics_admin_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Metrics Admin", "terms_accepted": 1
+    })
+    db = SessionLocal()
+    db.query(User).filter(User.email == email).update({"role": "admin"})
+    db.commit()
+    db.close()
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_histogram_buckets_and_percentiles():
+    h = Histogram(buckets=(0.1, 1))
+    for seconds in (0.05, 0.5, 0.5, 5):
+        h.observe(seconds)
+    snap = h.snapshot()
+    assert snap["count"] == 4
+    assert snap["buckets"] == {"0.1": 1, "1": 3, "+Inf": 4}
+    assert snap["p50_ms"] == 500.0
+    assert snap["max_ms"] == 5000.0
+
+def test_pipeline_records_stage_timings():
+    db = SessionLocal()
+    wish = ScheduledWish(
+        recipient_name="Metrics Recipient",
+        recipient_email="metrics@example.com",
+        occasion="Birthday",
+        tone="warm",
+        scheduled_time=datetime.utcnow() - timedelta(seconds=30),
+        status="pending",
+        platform="email"
+    )
+    db.add(wish)
+    db.commit()
+    wish_id = wish.id
+    db.close()
+
+    before = {stage: pipeline_metrics.histogram(stage).count for stage in ("llm", "render", "smtp", "dispatch_lag", "total")}
+    with patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm, \
+         patch("app.services.scheduler.smtp_pool.send_message"):
+        mock_llm.return_value = "Happy Birthday!"
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    for stage, count in before.items():
+        assert pipeline_metrics.histogram(stage).count == count + 1
+    assert pipeline_metrics.snapshot()["dispatch_lag"]["max_ms"] >= 30000
+
+def test_metrics_endpoint_reports_queue_depth():
+    headers = get_admin_headers()
+    response = client.get("/api/admin/metrics", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert "pending" in data["queue_depth"] or "sent" in data["queue_depth"]
+    assert "overdue" in data["queue_depth"]
+    assert "engine" in data and "stages" in data
+
+    system = client.get("/api/admin/system", headers=headers).json()
+    assert "queue_depth" in system and "stages" in system
+
+def test_metrics_endpoint_requires_admin():
+    response = client.get("/api/admin/metrics")
+    assert response.status_code == 401
@@ -0,0 +1,44 @@
+import pytest
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import scheduler as scheduler_service
+
+def create_wish(status="pending", days_ahead=1):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Persistent Recipient",
+            recipient_email="persist@test.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() + timedelta(days=days_ahead),
+            status=status
+        )
+        db.add(wish)
+        db.commit()
+        db.refresh(wish)
+        return wish.id
+    finally:
+        db.close()
+
+def test_job_id_is_deterministic():
+    assert scheduler_service.job_id_for_wish(42) == "wish_42"
+
+def test_rehydrate_registers_missing_pending_wishes():
+    pending_id = create_wish()
+    sent_id = create_wish(status="sent")
+
+    scheduler_service.rehydrate_pending_wishes()
+
+    assert scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(pending_id)) is not None
+    assert scheduler_service.scheduler.get_job(scheduler_service.job_id_for_wish(sent_id)) is None
+
+def test_rehydrate_is_idempotent():
+    pending_id = create_wish()
+    scheduler_service.rehydrate_pending_wishes()
+    scheduler_service.rehydrate_pending_wishes()
+
+    job_ids = [job.id for job in scheduler_service.scheduler.get_jobs()]
+    assert job_ids.count(scheduler_service.job_id_for_wish(pending_id)) == 1
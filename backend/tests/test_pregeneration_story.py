@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import pregeneration
+from app.services import scheduler as scheduler_service
+
+def create_wish(hours_from_now, generated_wish=None, platform="web"):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Pregen Recipient",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() + timedelta(hours=hours_from_now),
+            status="pending",
+            platform=platform,
+            generated_wish=generated_wish
+        )
+        db.add(wish)
+        db.commit()
+        db.refresh(wish)
+        return wish.id
+    finally:
+        db.close()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+@pytest.fixture
+def clean_queue():
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.status == "pending").update({"status": "archived"})
+    db.commit()
+    db.close()
+    yield
+
+def test_pregenerates_wishes_within_horizon(clean_queue):
+    soon_id = create_wish(2)
+    later_id = create_wish(48)
+    preview_id = create_wish(3, generated_wish="User approved preview")
+
+    with patch("app.services.pregeneration.generate_wish_batch", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = lambda prompts: ["Pre-generated birthday wish"] * len(prompts)
+        generated = pregeneration.pregenerate_upcoming_wishes(horizon_hours=24)
+
+    assert generated == 1
+    assert mock_llm.await_count == 1
+    assert len(mock_llm.await_args.args[0]) == 1
+    assert get_wish(soon_id).generated_wish == "Pre-generated birthday wish"
+    assert get_wish(later_id).generated_wish is None
+    assert get_wish(preview_id).generated_wish == "User approved preview"
+
+def test_generation_errors_are_not_stored(clean_queue):
+    wish_id = create_wish(1)
+
+    with patch("app.services.pregeneration.generate_wish_batch", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = lambda prompts: ["Error generating wish with Groq AI: timeout"] * len(prompts)
+        generated = pregeneration.pregenerate_upcoming_wishes(horizon_hours=24)
+
+    assert generated == 0
+    assert get_wish(wish_id).generated_wish is None
+
+def test_send_path_uses_pregenerated_text(clean_queue):
+    wish_id = create_wish(-0.1, generated_wish="Ready to send")
+
+    with patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm:
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    mock_llm.assert_not_awaited()
+    wish = get_wish(wish_id)
+    assert wish.status == "sent"
+    assert wish.generated_wish == "Ready to send"
@@ -0,0 +1,97 @@
+import pytest
+import asyncio
+import smtplib
+import time
+from unittest.mock import patch
+from app.services.rate_limiter import TokenBucket, OutboundRateLimiter, is_throttle_error
+
+def make_limiter(rate=10, burst=2, sender_rate=100, sender_burst=100):
+    return OutboundRateLimiter(
+        channel_limits={"email": (rate, burst)},
+        sender_limits={"email": (sender_rate, sender_burst)}
+    )
+
+def test_bucket_allows_burst_then_spaces_out():
+    bucket = TokenBucket(rate=10, burst=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+def test_penalize_delays_next_reservation():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.penalize(1)
+    assert bucket.reserve() == pytest.approx(1.1, abs=0.02)
+
+def test_per_sender_limit_applies_independently():
+    limiter = make_limiter(rate=100, burst=100, sender_rate=1, sender_burst=1)
+    assert limiter.reserve("email", sender=1) == 0
+    assert limiter.reserve("email", sender=1) == pytest.approx(1, abs=0.02)
+    assert limiter.reserve("email", sender=2) == 0
+
+def test_unconfigured_channel_is_not_limited():
+    limiter = make_limiter()
+    assert limiter.reserve("web") == 0
+    assert "web" not in limiter.stats()
+
+def test_async_acquire_drains_at_configured_rate():
+    limiter = make_limiter(rate=20, burst=1)
+
+    async def send_all():
+        await asyncio.gather(*(limiter.acquire("email") for _ in range(5)))
+
+    start = time.monotonic()
+    asyncio.run(send_all())
+    elapsed = time.monotonic() - start
+
+    assert elapsed == pytest.approx(0.2, abs=0.08)
+    stats = limiter.stats()["email"]
+    assert stats["acquired"] == 5
+    assert stats["waited"] == 4
+    assert stats["max_wait_ms"] == pytest.approx(200, abs=20)
+
+def test_throttle_errors_are_detected():
+    assert is_throttle_error(smtplib.SMTPResponseException(421, b"Too many connections"))
+    assert is_throttle_error(smtplib.SMTPSenderRefused(451, b"Try later", "a@b.com"))
+    assert not is_throttle_error(smtplib.SMTPResponseException(550, b"No such user"))
+    assert not is_throttle_error(ValueError("boom"))
+
+def test_scheduler_retries_throttled_delivery():
+    from app.services import scheduler as scheduler_service
+
+    class FakeWish:
+        id = 1
+        platform = "email"
+        user_id = 1
+
+    attempts = []
+
+    def flaky_deliver(wish, text, channel="email"):
+        attempts.append(text)
+        if len(attempts) == 1:
+            raise smtplib.SMTPResponseException(421, b"Slow down")
+
+    limiter = make_limiter(rate=1000, burst=10)
+    with patch.object(scheduler_service, "_deliver_wish", side_effect=flaky_deliver), \
+         patch.object(scheduler_service, "outbound_limiter", limiter), \
+         patch.object(scheduler_service.settings, "RATE_LIMIT_THROTTLE_BACKOFF_SECONDS", 0.01):
+        asyncio.run(scheduler_service._deliver_rate_limited(FakeWish(), "Hello"))
+
+    assert len(attempts) == 2
+    assert limiter.stats()["email"]["throttled"] == 1
+
+def test_password_reset_is_not_stalled_by_wish_throttling():
+    from app.services import email_service
+
+    limiter = OutboundRateLimiter.from_settings()
+    limiter.throttled("email", 30) # Wish backlog got the provider to push back
+    with patch.object(email_service, "outbound_limiter", limiter), \
+         patch.object(email_service.smtp_pool, "send_message") as mock_send, \
+         patch.multiple(email_service.settings, SMTP_USER="app@example.com", SMTP_PASSWORD="secret"):
+        started = time.monotonic()
+        assert email_service.send_password_reset_email("user@example.com", "token")
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1
+    mock_send.assert_called_once()
+    assert limiter.stats()["transactional"]["acquired"] == 1
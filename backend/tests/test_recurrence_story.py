@@ -0,0 +1,158 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.recurrence import parse_recurrence, next_occurrence, rule_for_wish
+from app.services import scheduler as scheduler_service
+import uuid
+
+client = TestClient(app)
+
+def get_auth_headers():
+    email = f"recurrence_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Recurrence User", "terms_accepted": 1
+    })
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_parse_presets_rrules_and_cron():
+    assert parse_recurrence("none") is None
+    assert parse_recurrence("Yearly") == "FREQ=YEARLY"
+    assert parse_recurrence("RRULE:FREQ=MONTHLY;INTERVAL=3") == "FREQ=MONTHLY;INTERVAL=3"
+    assert parse_recurrence("cron:0 9 * * 1") == "CRON:0 9 * * 1"
+    with pytest.raises(ValueError):
+        parse_recurrence("fortnightly-ish")
+
+def test_monthly_cadence_clamps_without_drift():
+    anchor = datetime(2025, 1, 31, 9, 0)
+    feb = next_occurrence("FREQ=MONTHLY", anchor, after=anchor)
+    mar = next_occurrence("FREQ=MONTHLY", anchor, after=feb)
+    assert feb == datetime(2025, 2, 28, 9, 0)
+    assert mar == datetime(2025, 3, 31, 9, 0)
+
+def test_yearly_leap_day_birthday():
+    anchor = datetime(2024, 2, 29, 8, 0)
+    assert next_occurrence("FREQ=YEARLY", anchor, after=anchor) == datetime(2025, 2, 28, 8, 0)
+    assert next_occurrence("FREQ=YEARLY", anchor, after=datetime(2027, 6, 1)) == datetime(2028, 2, 29, 8, 0)
+
+def test_next_occurrence_jumps_far_ahead_directly():
+    anchor = datetime(2000, 1, 1, 12, 0)
+    assert next_occurrence("FREQ=DAILY", anchor, after=datetime(2030, 5, 5, 13, 0)) == datetime(2030, 5, 6, 12, 0)
+    assert next_occurrence("FREQ=WEEKLY;INTERVAL=2", anchor, after=anchor) == datetime(2000, 1, 15, 12, 0)
+
+def test_complex_rrule_and_cron_rules():
+    anchor = datetime(2025, 1, 1, 10, 0)
+    # Last Friday of every month
+    assert next_occurrence("FREQ=MONTHLY;BYDAY=-1FR", anchor, after=anchor) == datetime(2025, 1, 31, 10, 0)
+    # Mondays at 09:00
+    assert next_occurrence("CRON:0 9 * * mon", anchor, after=anchor) == datetime(2025, 1, 6, 9, 0)
+
+def test_cron_weekday_numbers_follow_crontab():
+    monday = datetime(2024, 3, 4, 10, 0)
+    assert next_occurrence("CRON:0 9 * * 1", monday, after=monday) == datetime(2024, 3, 11, 9, 0)
+    # 0 and 7 are both Sunday
+    assert next_occurrence("CRON:0 9 * * 0", monday, after=monday) == datetime(2024, 3, 10, 9, 0)
+    assert parse_recurrence("cron:0 9 * * 7") == "CRON:0 9 * * 7"
+    assert next_occurrence("CRON:0 9 * * 7", monday, after=monday) == datetime(2024, 3, 10, 9, 0)
+    # Weekdays, and a step counted from Sunday (Sun, Tue, Thu, Sat)
+    assert next_occurrence("CRON:0 9 * * 1-5", monday, after=datetime(2024, 3, 8, 10, 0)) == datetime(2024, 3, 11, 9, 0)
+    assert next_occurrence("CRON:0 9 * * */2", monday, after=monday) == datetime(2024, 3, 5, 9, 0)
+    assert next_occurrence("CRON:0 9 * * 5-7", monday, after=datetime(2024, 3, 9, 10, 0)) == datetime(2024, 3, 10, 9, 0)
+    with pytest.raises(ValueError):
+        parse_recurrence("cron:0 9 * * 8")
+
+def test_legacy_is_recurring_codes_map_to_rules():
+    class Legacy:
+        recurrence_rule = None
+        is_recurring = 30
+    assert rule_for_wish(Legacy()) == "FREQ=MONTHLY"
+
+def test_schedule_endpoint_stores_rule():
+    headers = get_auth_headers()
+    response = client.post("/api/schedule", json={
+        "recipient_name": "Recurring Recipient", "recipient_email": "rec@test.com",
+        "occasion": "Birthday", "tone": "warm", "event_name": "Monthly",
+        "scheduled_time": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+        "recurrence": "monthly"
+    }, headers=headers)
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        wish = db.query(ScheduledWish).filter(ScheduledWish.id == response.json()["id"]).first()
+        assert wish.recurrence_rule == "FREQ=MONTHLY"
+        assert wish.is_recurring == 3
+        assert wish.recurrence_anchor == wish.scheduled_time
+    finally:
+        db.close()
+
+def test_schedule_endpoint_rejects_bad_rule():
+    headers = get_auth_headers()
+    response = client.post("/api/schedule", json={
+        "recipient_name": "Recurring Recipient", "occasion": "Birthday", "tone": "warm",
+        "event_name": "Bad", "scheduled_time": datetime.utcnow().isoformat(),
+        "recurrence": "every blue moon"
+    }, headers=headers)
+    assert response.status_code == 422
+
+def create_recurring_wish(scheduled_time, rule):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Series Recipient", occasion="Birthday", tone="warm",
+            scheduled_time=scheduled_time, status="pending", platform="web",
+            generated_wish="Happy day", recurrence_rule=rule, recurrence_anchor=scheduled_time,
+            is_recurring=4
+        )
+        db.add(wish)
+        db.commit()
+        return wish.id
+    finally:
+        db.close()
+
+def test_next_occurrence_outside_horizon_is_deferred():
+    wish_id = create_recurring_wish(datetime.utcnow() - timedelta(minutes=1), "FREQ=YEARLY")
+    scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    db = SessionLocal()
+    try:
+        parent = db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+        assert parent.status == "sent"
+        assert parent.next_occurrence_at is not None
+        children = db.query(ScheduledWish).filter(ScheduledWish.recurrence_anchor == parent.recurrence_anchor, ScheduledWish.id != wish_id).count()
+        assert children == 0
+    finally:
+        db.close()
+
+    # Once the horizon reaches it, the materializer creates exactly one row
+    with patch.object(scheduler_service.settings, "RECURRENCE_HORIZON_DAYS", 400):
+        scheduler_service.materialize_upcoming_occurrences()
+        scheduler_service.materialize_upcoming_occurrences()
+
+    db = SessionLocal()
+    try:
+        children = db.query(ScheduledWish).filter(ScheduledWish.recurrence_anchor == parent.recurrence_anchor, ScheduledWish.id != wish_id).all()
+        assert len(children) == 1
+        assert children[0].status == "pending"
+        assert children[0].recurrence_rule == "FREQ=YEARLY"
+        assert children[0].generated_wish is None
+    finally:
+        db.close()
+
+def test_next_occurrence_inside_horizon_is_created_immediately():
+    wish_id = create_recurring_wish(datetime.utcnow() - timedelta(minutes=1), "FREQ=DAILY")
+    scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    db = SessionLocal()
+    try:
+        parent = db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+        assert parent.next_occurrence_at is None
+        child = db.query(ScheduledWish).filter(ScheduledWish.recurrence_anchor == parent.recurrence_anchor, ScheduledWish.id != wish_id).one()
+        assert child.scheduled_time == parent.scheduled_time + timedelta(days=1)
+    finally:
+        db.close()
@@ -0,0 +1,92 @@
+import pytest
+import uuid
+from unittest.mock import patch
+from datetime import datetime
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, User
+from app.services import reminders
+
+# 08:00 on 10 Jan 2031 in Tokyo
+TOKYO_DIGEST_TIME = datetime(2031, 1, 9, 23, 0)
+
+def create_user(timezone):
+    db = SessionLocal()
+    try:
+        user = User(email=f"digest_{uuid.uuid4()}@example.com", full_name="Digest User", timezone=timezone)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user.id, user.email
+    finally:
+        db.close()
+
+def create_wish(user_id, scheduled_time, reminder_days_before, auto_send=1, recipient="Digest Recipient"):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            user_id=user_id,
+            recipient_name=recipient,
+            occasion="Birthday",
+            tone="warm",
+            event_name="Birthday",
+            scheduled_time=scheduled_time,
+            timezone="Asia/Tokyo",
+            status="pending" if auto_send else "awaiting_approval",
+            reminder_days_before=reminder_days_before,
+            auto_send=auto_send
+        )
+        db.add(wish)
+        db.commit()
+        return wish.id
+    finally:
+        db.close()
+
+def digests_for(mock_send, email):
+    return [call.args for call in mock_send.call_args_list if call.args[0] == email]
+
+def test_one_digest_per_user_with_due_reminders():
+    user_id, email = create_user("Asia/Tokyo")
+    create_wish(user_id, datetime(2031, 1, 12, 1, 0), 2, recipient="Due Friend")                # 12 Jan local, remind 10 Jan
+    create_wish(user_id, datetime(2031, 1, 13, 1, 0), 2, recipient="Later Friend")              # remind 11 Jan
+    create_wish(user_id, datetime(2031, 1, 11, 1, 0), 1, auto_send=0, recipient="Approval Friend")
+
+    with patch("app.services.reminders.send_reminder_digest_email", return_value=True) as mock_send:
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+
+    calls = digests_for(mock_send, email)
+    assert len(calls) == 1
+    items = calls[0][2]
+    assert [item["recipient_name"] for item in items] == ["Approval Friend", "Due Friend"]
+    assert items[0]["needs_approval"] is True
+    assert items[1]["local_time"] == datetime(2031, 1, 12, 10, 0)
+
+def test_reminders_are_not_repeated():
+    user_id, email = create_user("Asia/Tokyo")
+    create_wish(user_id, datetime(2031, 1, 12, 1, 0), 2)
+
+    with patch("app.services.reminders.send_reminder_digest_email", return_value=True) as mock_send:
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+
+    assert len(digests_for(mock_send, email)) == 1
+
+def test_users_outside_digest_hour_are_skipped():
+    user_id, email = create_user("Europe/London") # 23:00 local
+    create_wish(user_id, datetime(2031, 1, 11, 1, 0), 2)
+
+    with patch("app.services.reminders.send_reminder_digest_email", return_value=True) as mock_send:
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+
+    assert digests_for(mock_send, email) == []
+
+def test_failed_digest_is_retried_next_run():
+    user_id, email = create_user("Asia/Tokyo")
+    create_wish(user_id, datetime(2031, 1, 12, 1, 0), 2)
+
+    with patch("app.services.reminders.send_reminder_digest_email", return_value=False):
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+    with patch("app.services.reminders.send_reminder_digest_email", return_value=True) as mock_send:
+        reminders.send_reminder_digests(now=TOKYO_DIGEST_TIME)
+
+    assert len(digests_for(mock_send, email)) == 1
@@ -0,0 +1,142 @@
+import pytest
+import smtplib
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, DeadLetterWish, User
+from app.services import scheduler as scheduler_service
+from app.services.retry import backoff_delay, is_permanent_error
+import uuid
+
+client = TestClient(app)
+
+def get_admin_headers():
+    email = f"retry_admin_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Retry Admin", "terms_accepted": 1
+    })
+    db = SessionLocal()
+    db.query(User).filter(User.email == email).update({"role": "admin"})
+    db.commit()
+    db.close()
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def create_wish(platform="email", attempts=0):
+    db = SessionLocal()
+    try:
+        wish = ScheduledWish(
+            recipient_name="Retry Recipient",
+            recipient_email="retry@example.com",
+            occasion="Birthday",
+            tone="warm",
+            scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+            status="pending",
+            platform=platform,
+            generated_wish="Happy Birthday!",
+            attempts=attempts
+        )
+        db.add(wish)
+        db.commit()
+        return wish.id
+    finally:
+        db.close()
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def test_backoff_grows_exponentially_and_caps():
+    assert timedelta(seconds=48) <= backoff_delay(1) <= timedelta(seconds=72)
+    assert timedelta(seconds=192) <= backoff_delay(3) <= timedelta(seconds=288)
+    assert backoff_delay(50) <= timedelta(seconds=settings.RETRY_MAX_DELAY_SECONDS * 1.2)
+
+def test_permanent_errors_are_classified():
+    assert is_permanent_error(smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"No such user")}))
+    assert not is_permanent_error(smtplib.SMTPResponseException(451, b"Try again later"))
+    assert not is_permanent_error(ConnectionError("reset"))
+
+def test_transient_failure_is_rescheduled():
+    wish_id = create_wish()
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=ConnectionError("reset")), \
+         patch("app.services.scheduler.enqueue_wish") as mock_enqueue:
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.attempts == 1
+    assert "reset" in wish.last_error
+    assert wish.dispatch_at > datetime.utcnow()
+    mock_enqueue.assert_called_once_with(wish_id, wish.dispatch_at)
+
+def test_exhausted_retries_go_to_dead_letter():
+    wish_id = create_wish(attempts=settings.RETRY_MAX_ATTEMPTS - 1)
+
+    with patch("app.services.scheduler._deliver_wish", side_effect=ConnectionError("reset")):
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    assert get_wish(wish_id).status == "failed"
+    db = SessionLocal()
+    try:
+        letter = db.query(DeadLetterWish).filter(DeadLetterWish.wish_id == wish_id).first()
+        assert letter.attempts == settings.RETRY_MAX_ATTEMPTS
+    finally:
+        db.close()
+
+def test_delivered_wish_is_not_resent_on_retry():
+    wish_id = create_wish()
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).update({"delivered_at": datetime.utcnow()})
+    db.commit()
+    db.close()
+
+    with patch("app.services.scheduler._deliver_wish") as mock_deliver:
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    mock_deliver.assert_not_called()
+    assert get_wish(wish_id).status == "sent"
+
+def test_generation_error_is_retried_not_sent():
+    wish_id = create_wish(platform="web")
+    db = SessionLocal()
+    db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).update({"generated_wish": None})
+    db.commit()
+    db.close()
+
+    with patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm, \
+         patch("app.services.scheduler.enqueue_wish"):
+        mock_llm.return_value = "Error generating wish with Groq AI: timeout"
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.generated_wish is None
+
+def test_admin_requeues_dead_letters():
+    wish_id = create_wish(attempts=settings.RETRY_MAX_ATTEMPTS - 1)
+    with patch("app.services.scheduler._deliver_wish", side_effect=ConnectionError("reset")):
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    headers = get_admin_headers()
+    letters = client.get("/api/admin/dead-letters", headers=headers).json()
+    letter = next(l for l in letters if l["wish_id"] == wish_id)
+
+    with patch("app.api.endpoints.enqueue_wish") as mock_enqueue:
+        response = client.post("/api/admin/dead-letters/requeue", json={"ids": [letter["id"]]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["requeued"] == 1
+    mock_enqueue.assert_called_once()
+
+    wish = get_wish(wish_id)
+    assert wish.status == "pending"
+    assert wish.attempts == 0
+    letters = client.get("/api/admin/dead-letters", headers=headers).json()
+    assert all(l["wish_id"] != wish_id for l in letters)
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import patch, AsyncMock
+from app.services import llm
+from app.services.llm import SingleFlight, WishCache
+
+class Prompt:
+    def __init__(self, recipient_name="Alice", occasion="Birthday", tone="warm", extra_details=None, length="short"):
+        self.recipient_name = recipient_name
+        self.occasion = occasion
+        self.tone = tone
+        self.extra_details = extra_details
+        self.length = length
+
+async def slow_generate(request):
+    await asyncio.sleep(0.1)
+    return f"Wish for {request.recipient_name}"
+
+def run_concurrently(prompts, **kwargs):
+    async def main():
+        return await asyncio.gather(*(llm.generate_wish_text(p, **kwargs) for p in prompts))
+    return asyncio.run(main())
+
+def test_identical_prompts_share_one_call():
+    flight = SingleFlight()
+    with patch.object(llm, "wish_flight", flight), \
+         patch.object(llm, "wish_cache", WishCache(maxsize=10, ttl=60)), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_generate
+        results = run_concurrently([Prompt("Alice"), Prompt(" alice"), Prompt("ALICE"), Prompt("Bob")])
+
+    assert results == ["Wish for Alice"] * 3 + ["Wish for Bob"]
+    assert mock_generate.await_count == 2
+    stats = flight.stats()
+    assert stats["calls"] == 2
+    assert stats["coalesced"] == 2
+    assert stats["in_flight"] == 0
+
+def test_coalescing_works_without_cache():
+    flight = SingleFlight()
+    with patch.object(llm, "wish_flight", flight), \
+         patch.object(llm.settings, "LLM_CACHE_ENABLED", False), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_generate
+        run_concurrently([Prompt()] * 5)
+        run_concurrently([Prompt()] * 2) # Sequential bursts each make their own call
+
+    assert mock_generate.await_count == 2
+    assert flight.stats()["coalesced"] == 5
+
+def test_disabled_single_flight_calls_every_time():
+    with patch.object(llm, "wish_flight", SingleFlight()), \
+         patch.multiple(llm.settings, LLM_CACHE_ENABLED=False, LLM_SINGLE_FLIGHT_ENABLED=False), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_generate
+        run_concurrently([Prompt()] * 3)
+
+    assert mock_generate.await_count == 3
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do("key", work))
+        patient = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()) == "done"
+    assert len(calls) == 1
+
+def test_batch_generates_duplicates_once():
+    flight = SingleFlight()
+    with patch.object(llm, "wish_flight", flight), \
+         patch.object(llm, "wish_cache", WishCache(maxsize=10, ttl=60)), \
+         patch.multiple(llm.settings, GROQ_API_KEY="test-key", LLM_BATCH_ENABLED=False), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_generate
+        results = asyncio.run(llm.generate_wish_batch([Prompt("Alice"), Prompt("Bob"), Prompt("alice ")]))
+
+    assert results == ["Wish for Alice", "Wish for Bob", "Wish for Alice"]
+    assert mock_generate.await_count == 2
+    assert flight.stats()["coalesced"] == 1
+
+def test_fresh_requests_get_their_own_call():
+    flight = SingleFlight()
+    with patch.object(llm, "wish_flight", flight), \
+         patch.object(llm, "wish_cache", WishCache(maxsize=10, ttl=60)), \
+         patch.object(llm, "_generate_wish_text", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_generate
+
+        async def main():
+            return await asyncio.gather(
+                llm.generate_wish_text(Prompt()),
+                llm.generate_wish_text(Prompt(), use_cache=False),
+                llm.generate_wish_text(Prompt(), use_cache=False)
+            )
+        asyncio.run(main())
+
+    assert mock_generate.await_count == 3
+    assert flight.stats()["coalesced"] == 0
@@ -0,0 +1,115 @@
+import pytest
+import socketserver
+import threading
+from unittest.mock import patch
+from email.mime.text import MIMEText
+from app.core.config import settings
+from app.services.smtp_pool import SMTPConnectionPool
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal plaintext SMTP server: enough of RFC 5321 for smtplib.send_message."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in ready")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ")[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                self.server.messages += 1
+                self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.connections = 0
+        self.messages = 0
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_pool(server, **kwargs):
+    return SMTPConnectionPool("127.0.0.1", server.server_address[1], use_tls=False, **kwargs)
+
+def make_message(n=0):
+    msg = MIMEText(f"Hello {n}")
+    msg["From"] = "sender@test.com"
+    msg["To"] = "recipient@test.com"
+    msg["Subject"] = "Pool test"
+    return msg
+
+def test_pool_reuses_connection(smtp_server):
+    pool = make_pool(smtp_server)
+    for n in range(5):
+        pool.send_message(make_message(n))
+    pool.close_all()
+
+    assert smtp_server.messages == 5
+    assert smtp_server.connections == 1
+    assert pool.stats()["connections_reused"] == 4
+
+def test_pool_retires_connection_after_max_messages(smtp_server):
+    pool = make_pool(smtp_server, max_messages=2)
+    for n in range(5):
+        pool.send_message(make_message(n))
+    pool.close_all()
+
+    assert smtp_server.messages == 5
+    assert smtp_server.connections == 3
+
+def test_pool_drops_idle_connections(smtp_server):
+    pool = make_pool(smtp_server, idle_timeout=0)
+    pool.send_message(make_message(1))
+    pool.send_message(make_message(2))
+    pool.close_all()
+
+    assert smtp_server.connections == 2
+
+def test_pool_recovers_from_dropped_connection(smtp_server):
+    pool = make_pool(smtp_server, healthcheck_after=0)
+    pool.send_message(make_message(1))
+    # Simulate the server hanging up on the idle connection
+    pool._idle[0].server.sock.close()
+    pool.send_message(make_message(2))
+    pool.close_all()
+
+    assert smtp_server.messages == 2
+
+def test_password_reset_email_uses_pool(smtp_server):
+    from app.services import email_service
+    pool = make_pool(smtp_server)
+    with patch.object(email_service, "smtp_pool", pool), \
+         patch.object(settings, "SMTP_USER", "sender@test.com"), \
+         patch.object(settings, "SMTP_PASSWORD", "secret"):
+        assert email_service.send_password_reset_email("user@test.com", "token-1")
+        assert email_service.send_password_reset_email("user@test.com", "token-2")
+    pool.close_all()
+
+    assert smtp_server.messages == 2
+    assert smtp_server.connections == 1
@@ -0,0 +1,100 @@
+import os
+import pytest
+import subprocess
+import sys
+import uuid
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish, User
+from app.services.timezones import to_utc, to_local
+from app.services.recurrence import next_local_occurrence
+
+client = TestClient(app)
+
+def get_auth_headers(timezone=None):
+    email = f"tz_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Timezone User", "terms_accepted": 1
+    })
+    if timezone:
+        db = SessionLocal()
+        db.query(User).filter(User.email == email).update({"timezone": timezone})
+        db.commit()
+        db.close()
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def schedule(headers, scheduled_time, **extra):
+    payload = {
+        "recipient_name": "TZ Recipient", "recipient_email": "tz@test.com",
+        "occasion": "Birthday", "tone": "warm", "event_name": "TZ Event",
+        "scheduled_time": scheduled_time
+    }
+    payload.update(extra)
+    return client.post("/api/schedule", json=payload, headers=headers)
+
+def get_wish(wish_id):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+    finally:
+        db.close()
+
+def test_local_time_converted_with_users_timezone():
+    headers = get_auth_headers("Asia/Kolkata")
+    response = schedule(headers, "2030-03-10T09:00:00")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["timezone"] == "Asia/Kolkata"
+    assert data["local_time"] == "2030-03-10T09:00:00"
+
+    wish = get_wish(data["id"])
+    assert wish.scheduled_time == datetime(2030, 3, 10, 3, 30)
+
+def test_request_timezone_overrides_user_default():
+    headers = get_auth_headers("Asia/Kolkata")
+    response = schedule(headers, "2030-07-01T09:00:00", timezone="America/New_York")
+    assert get_wish(response.json()["id"]).scheduled_time == datetime(2030, 7, 1, 13, 0)
+
+def test_explicit_offset_is_respected():
+    headers = get_auth_headers()
+    response = schedule(headers, "2030-07-01T09:00:00+02:00")
+    assert get_wish(response.json()["id"]).scheduled_time == datetime(2030, 7, 1, 7, 0)
+
+def test_unknown_timezone_rejected():
+    headers = get_auth_headers()
+    response = schedule(headers, "2030-07-01T09:00:00", timezone="Mars/Olympus")
+    assert response.status_code == 422
+
+def test_changing_timezone_keeps_local_time():
+    headers = get_auth_headers()
+    wish_id = schedule(headers, "2030-07-01T09:00:00", timezone="Europe/London").json()["id"]
+
+    response = client.patch(f"/api/scheduled-wishes/{wish_id}", json={"timezone": "Asia/Tokyo"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["local_time"] == "2030-07-01T09:00:00"
+    assert get_wish(wish_id).scheduled_time == datetime(2030, 7, 1, 0, 0)
+
+def test_recurrence_keeps_local_time_across_dst():
+    # 09:00 in New York is 14:00 UTC in winter and 13:00 UTC in summer
+    anchor = to_utc(datetime(2030, 1, 15, 9, 0), "America/New_York")
+    next_date = next_local_occurrence("FREQ=MONTHLY", anchor, datetime(2030, 6, 20), "America/New_York")
+    assert next_date == datetime(2030, 7, 15, 13, 0)
+    assert to_local(next_date, "America/New_York") == datetime(2030, 7, 15, 9, 0)
+
+def test_jobs_run_at_utc_on_a_non_utc_host():
+    # APScheduler resolves the host zone once, so check it in a fresh interpreter
+    script = (
+        "from datetime import datetime\n"
+        "from app.services import scheduler as s\n"
+        "s.enqueue_wish(1, datetime(2030, 1, 1, 12, 0))\n"
+        "print(s.scheduler.get_job(s.job_id_for_wish(1)).trigger.run_date.isoformat())\n"
+    )
+    env = {**os.environ, "TZ": "Asia/Kolkata"}
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], env=env, cwd=backend, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "2030-01-01T12:00:00+00:00"
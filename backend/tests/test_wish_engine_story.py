@@ -0,0 +1,129 @@
+import pytest
+import asyncio
+import threading
+from unittest.mock import patch, AsyncMock
+from datetime import datetime, timedelta
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services.wish_engine import WishEngine
+from app.services import scheduler as scheduler_service
+
+def test_engine_bounds_concurrency():
+    state = {"active": 0, "peak": 0}
+
+    async def handler(n):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.05)
+        state["active"] -= 1
+        return n * 2
+
+    engine = WishEngine(handler, concurrency=3, name="test-engine")
+    try:
+        futures = [engine.submit(i) for i in range(10)]
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        engine.stop()
+
+    assert results == [i * 2 for i in range(10)]
+    assert state["peak"] == 3
+    stats = engine.stats()
+    assert stats["concurrency"] == 3
+    assert stats["completed"] == 10
+    assert stats["in_flight"] == 0
+    assert stats["throughput_per_min"] > 0
+
+def test_engine_counts_failures():
+    async def handler():
+        raise ValueError("boom")
+
+    engine = WishEngine(handler, concurrency=1, name="test-engine")
+    try:
+        with pytest.raises(ValueError):
+            engine.submit().result(timeout=5)
+    finally:
+        engine.stop()
+    assert engine.stats()["failed"] == 1
+
+def test_scheduled_wish_processed_on_engine():
+    db = SessionLocal()
+    wish = ScheduledWish(
+        recipient_name="Engine Recipient",
+        occasion="Birthday",
+        tone="warm",
+        scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+        status="pending",
+        platform="web"
+    )
+    db.add(wish)
+    db.commit()
+    wish_id = wish.id
+    db.close()
+
+    with patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = "Happy Birthday from the engine!"
+        scheduler_service.process_scheduled_wish(wish_id).result(timeout=10)
+
+    db = SessionLocal()
+    try:
+        saved = db.query(ScheduledWish).filter(ScheduledWish.id == wish_id).first()
+        assert saved.status == "sent"
+        assert saved.generated_wish == "Happy Birthday from the engine!"
+    finally:
+        db.close()
+
+def test_engine_admission_caps_pending_work():
+    async def handler(n):
+        await asyncio.sleep(0.05)
+        return n
+
+    engine = WishEngine(handler, concurrency=1, max_pending=2, name="test-engine")
+    try:
+        futures = [engine.submit(i) for i in range(4)]
+        assert engine.pending <= 2
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        engine.stop()
+
+    assert results == [0, 1, 2, 3]
+    stats = engine.stats()
+    assert stats["max_pending"] == 2
+    assert stats["admission_waits"] == 2
+
+def test_pipeline_runs_no_queries_on_the_loop_thread():
+    from sqlalchemy import event
+    from app.db.database import engine as db_engine
+
+    db = SessionLocal()
+    wish = ScheduledWish(
+        recipient_name="Loop Recipient",
+        recipient_email="loop@test.com",
+        occasion="Birthday",
+        tone="warm",
+        scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+        status="pending",
+        platform="email"
+    )
+    db.add(wish)
+    db.commit()
+    wish_id = wish.id
+    db.close()
+
+    threads = []
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+
+    engine = WishEngine(scheduler_service.process_wish_async, concurrency=1, name="loop-check-engine")
+    event.listen(db_engine, "before_cursor_execute", record_thread)
+    try:
+        with patch("app.services.scheduler._deliver_wish"), \
+             patch("app.services.scheduler.generate_wish_text", new_callable=AsyncMock) as mock_llm:
+            mock_llm.return_value = "Happy Birthday!"
+            engine.submit(wish_id).result(timeout=10)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record_thread)
+        engine.stop()
+
+    assert threads
+    assert "loop-check-engine" not in threads # Only its to_thread workers ("loop-check-engine_N") touch the DB
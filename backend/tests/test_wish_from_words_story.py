@@ -0,0 +1,52 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from app.services import llm
+
+def fake_client(delays, state):
+    async def create(model, messages, max_tokens):
+        word = messages[0]["content"].rsplit(" ", 1)[-1]
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delays.get(word, 0.1))
+        finally:
+            state["active"] -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"Wish about {word}"))])
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client
+
+def run(words, delays=None, concurrency=20, timeout=5):
+    state = {"active": 0, "peak": 0}
+    with patch.object(llm, "get_client", return_value=fake_client(delays or {}, state)), \
+         patch.object(llm.settings, "GROQ_API_KEY", "test-key"), \
+         patch.object(llm.settings, "LLM_BATCH_ENABLED", False), \
+         patch.object(llm.settings, "LLM_WORD_CONCURRENCY", concurrency), \
+         patch.object(llm.settings, "LLM_WORD_TIMEOUT_SECONDS", timeout):
+        started = time.perf_counter()
+        results = asyncio.run(llm.generate_wish_from_words(words, "creative"))
+    return results, time.perf_counter() - started, state
+
+def test_words_are_generated_concurrently():
+    words = [f"word{i}" for i in range(20)]
+    results, elapsed, _ = run(words)
+
+    assert results == [f"Wish about {w}" for w in words]
+    assert elapsed < 1.0 # One round-trip (0.1s), not twenty
+
+def test_order_is_preserved_when_replies_arrive_out_of_order():
+    results, _, _ = run(["slow", "fast"], delays={"slow": 0.3, "fast": 0.01})
+    assert results == ["Wish about slow", "Wish about fast"]
+
+def test_concurrency_is_bounded():
+    _, _, state = run([f"word{i}" for i in range(10)], concurrency=3)
+    assert state["peak"] == 3
+
+def test_slow_word_times_out_alone():
+    results, elapsed, _ = run(["stuck", "fine"], delays={"stuck": 5}, timeout=0.2)
+    assert results[0].startswith("Error for stuck: timed out")
+    assert results[1] == "Wish about fine"
+    assert elapsed < 1.0
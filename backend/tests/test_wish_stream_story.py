@@ -0,0 +1,112 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import ScheduledWish
+from app.services import llm
+from app.services.llm import WishCache
+
+client = TestClient(app)
+
+WISH = {"occasion": "Birthday", "recipient_name": "Stream Friend", "tone": "warm"}
+
+def get_auth_headers():
+    email = f"stream_{uuid.uuid4()}@example.com"
+    password = "StrongPassword123!"
+    client.post("/api/register", json={
+        "email": email, "password": password, "full_name": "Stream User", "terms_accepted": 1
+    })
+    token = client.post("/api/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event = "message"
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[6:])))
+    return events
+
+def fake_stream(*tokens, fail=False):
+    async def stream(request, use_cache=True):
+        for token in tokens:
+            yield token
+        if fail:
+            raise RuntimeError("connection dropped")
+    return stream
+
+def test_generate_stream_relays_tokens():
+    with patch("app.api.endpoints.stream_wish_text", side_effect=fake_stream("Happy ", "Birthday", "!")):
+        response = client.post("/api/generate/stream", json=WISH)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [data["token"] for event, data in events if event == "message"] == ["Happy ", "Birthday", "!"]
+    assert events[-1] == ("done", {"wish": "Happy Birthday!"})
+
+def test_user_stream_persists_final_text():
+    headers = get_auth_headers()
+    with patch("app.api.endpoints.stream_wish_text", side_effect=fake_stream("Many ", "happy returns")):
+        response = client.post("/api/generate-user-wish/stream", json=WISH, headers=headers)
+
+    event, done = parse_events(response.text)[-1]
+    assert event == "done"
+    db = SessionLocal()
+    try:
+        saved = db.query(ScheduledWish).filter(ScheduledWish.id == done["id"]).first()
+        assert saved.generated_wish == "Many happy returns"
+        assert saved.status == "generated"
+    finally:
+        db.close()
+
+def test_failed_stream_reports_error_and_saves_nothing():
+    headers = get_auth_headers()
+    with patch("app.api.endpoints.stream_wish_text", side_effect=fake_stream("Half a ", fail=True)), \
+         patch("app.api.endpoints.save_generated_wish") as mock_save:
+        response = client.post("/api/generate-user-wish/stream", json=WISH, headers=headers)
+
+    assert parse_events(response.text)[-1] == ("error", {"detail": "connection dropped"})
+    mock_save.assert_not_called()
+
+def test_user_stream_requires_auth():
+    assert client.post("/api/generate-user-wish/stream", json=WISH).status_code == 401
+
+def test_llm_stream_uses_stream_api_and_caches_result():
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        for text in ("Hello", None, " there")
+    ]
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        return stream()
+
+    fake_client = MagicMock()
+    fake_client.chat.completions.create = create
+    cache = WishCache(maxsize=10, ttl=60)
+
+    async def collect():
+        return [token async for token in llm.stream_wish_text(SimpleNamespace(length="short", extra_details=None, **WISH))]
+
+    with patch.object(llm, "get_client", return_value=fake_client), \
+         patch.object(llm, "wish_cache", cache), \
+         patch.multiple(llm.settings, GROQ_API_KEY="test-key", LLM_CACHE_ENABLED=True):
+        first = asyncio.run(collect())
+        second = asyncio.run(collect())
+
+    assert first == ["Hello", " there"]
+    assert calls[0]["stream"] is True
+    assert second == ["Hello there"] # Served from the cache in one chunk
+    assert len(calls) == 1
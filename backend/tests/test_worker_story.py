@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import patch
+from app.services.wish_engine import WishEngine
+from app import worker
+
+async def handler():
+    return None
+
+def test_engine_configure_before_start():
+    engine = WishEngine(handler, concurrency=2, name="test-engine")
+    engine.configure(concurrency=8)
+    assert engine.concurrency == 8
+    assert engine.max_pending == 80
+
+    engine.configure(max_pending=5)
+    assert engine.max_pending == 5
+
+def test_engine_configure_rejected_while_running():
+    engine = WishEngine(handler, concurrency=2, name="test-engine")
+    engine.start()
+    try:
+        with pytest.raises(RuntimeError):
+            engine.configure(concurrency=4)
+    finally:
+        engine.stop()
+
+def test_worker_runs_scheduler_until_stopped():
+    class StopImmediately:
+        def wait(self, timeout=None):
+            return True
+        def set(self):
+            pass
+
+    with patch("app.worker.start_scheduler") as mock_start, \
+         patch("app.worker.drain_and_stop") as mock_stop, \
+         patch("app.worker.wish_engine") as mock_engine, \
+         patch("app.worker.signal.signal"), \
+         patch("app.worker.threading.Event", StopImmediately):
+        worker.main(["--concurrency", "4"])
+
+    mock_engine.configure.assert_called_once_with(concurrency=4, max_pending=None)
+    mock_start.assert_called_once()
+    mock_stop.assert_called_once()
+
+def test_api_can_start_with_scheduler_disabled():
+    from app.main import app, lifespan
+    import asyncio
+
+    async def run_lifespan():
+        async with lifespan(app):
+            pass
+
+    with patch("app.main.settings.SCHEDULER_ENABLED", False), \
+         patch("app.main.start_scheduler") as mock_start, \
+         patch("app.main.start_scheduler_client") as mock_client, \
+         patch("app.main.drain_and_stop"), \
+         patch("app.main.smtp_pool"):
+        asyncio.run(run_lifespan())
+
+    mock_start.assert_not_called()
+    mock_client.assert_called_once()